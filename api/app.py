@@ -2,38 +2,54 @@
 import os
 import secrets
 
-import redis
+import click
 from dotenv import load_dotenv
 from flask import Flask, jsonify
 from flask_jwt_extended import JWTManager
-from flask_migrate import Migrate
-from flask_smorest import Api
-from rq import Queue
 
-from api.auth.blocklist import BLOCKLIST
+from api.auth.blocklist import create_blocklist
+from api.auth.passwords import PasswordHasher
+from api.cache import ResponseCache
 from api.db import db
+from api.json_provider import OrjsonProvider
+from api.metrics import init_metrics
+from api.models import include_object
+from api.openapi import Api
+from api.pool import build_engine_options
 from api.resources.healthcheck import blp as HealthCheckBlueprint
 from api.resources.item import blp as ItemBlueprint
+from api.resources.job import blp as JobBlueprint
 from api.resources.store import blp as StoreBlueprint
 from api.resources.tag import blp as TagBlueprint
 from api.resources.user import blp as UserBlueprint
+from api.seed import seed_command
+from api.services import queue_service, redis_service
+from api.summary import rebuild_summaries_command
+from api.timing import init_timing
 
 
-def create_app(db_url: str | None = None, jwt_secret: str | None = None) -> Api:
+def create_app(
+    db_url: str | None = None,
+    jwt_secret: str | None = None,
+    engine_options: dict | None = None,
+) -> Api:
     """Create a Flask app and register the API.
 
     Args:
         db_url (str | None, optional): Database URL. Defaults to None.
         jwt_secret (str | None, optional): JWT secret key. Defaults to None.
+        engine_options (dict | None, optional): SQLAlchemy engine options
+            overriding the ones built from the environment. Defaults to None.
 
     Returns:
         Api: The API.
     """
     app = Flask(__name__)
 
-    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-    redis_connection = redis.from_url(redis_url)
-    app.queue = Queue("emails", connection=redis_connection)  # type: ignore
+    # clients are created on first use, in the worker process using them
+    redis_connection = redis_service(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    app.queue = queue_service("emails", redis_connection)  # type: ignore
+    app.jobs = queue_service("jobs", redis_connection)  # type: ignore
     app.config["PROPAGATE_EXCEPTIONS"] = True
     app.config["API_TITLE"] = "Stores REST API"
     app.config["API_VERSION"] = "v1"
@@ -43,23 +59,100 @@ def create_app(db_url: str | None = None, jwt_secret: str | None = None) -> Api:
     app.config[
         "OPENAPI_SWAGGER_UI_URL"
     ] = "https://cdn.jsdelivr.net/npm/swagger-ui-dist/"
+    app.config["OPENAPI_SPEC_FILE"] = os.getenv("OPENAPI_SPEC_FILE") or None
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["SQLALCHEMY_DATABASE_URI"] = db_url or os.getenv(
         "DATABASE_URL", "sqlite:///data.db"
     )
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = build_engine_options(
+        app.config["SQLALCHEMY_DATABASE_URI"], engine_options
+    )
+    # asyncio engine of the ASGI read path, derived from the database URL
+    app.config["ASYNC_DATABASE_URL"] = os.getenv("ASYNC_DATABASE_URL") or None
+    app.config["PAGINATION_DEFAULT_PAGE_SIZE"] = int(
+        os.getenv("PAGINATION_DEFAULT_PAGE_SIZE", "50")
+    )
+    app.config["PAGINATION_MAX_PAGE_SIZE"] = int(
+        os.getenv("PAGINATION_MAX_PAGE_SIZE", "500")
+    )
+    app.config["BULK_INSERT_CHUNK_SIZE"] = int(
+        os.getenv("BULK_INSERT_CHUNK_SIZE", "1000")
+    )
+    app.config["BULK_INSERT_MAX_ITEMS"] = int(
+        os.getenv("BULK_INSERT_MAX_ITEMS", "50000")
+    )
+    app.config["EXPORT_YIELD_PER"] = int(os.getenv("EXPORT_YIELD_PER", "1000"))
+    app.config["STORE_DELETE_ASYNC_THRESHOLD"] = int(
+        os.getenv("STORE_DELETE_ASYNC_THRESHOLD", "10000")
+    )
+    app.config["STORE_DELETE_CHUNK_SIZE"] = int(
+        os.getenv("STORE_DELETE_CHUNK_SIZE", "5000")
+    )
+    app.config["STORE_SUMMARY_ROLLUP"] = os.getenv(
+        "STORE_SUMMARY_ROLLUP", "false"
+    ).lower() in ("1", "true", "yes")
+    app.config["STORE_SUMMARY_TOP_TAGS"] = int(os.getenv("STORE_SUMMARY_TOP_TAGS", "5"))
+    app.config["METRICS_ENABLED"] = os.getenv("METRICS_ENABLED", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    app.config["SERVER_TIMING_ENABLED"] = os.getenv(
+        "SERVER_TIMING_ENABLED", "false"
+    ).lower() in ("1", "true", "yes")
+    app.config["FAST_SERIALIZATION_ENABLED"] = os.getenv(
+        "FAST_SERIALIZATION_ENABLED", "false"
+    ).lower() in ("1", "true", "yes")
+    if app.config["FAST_SERIALIZATION_ENABLED"]:
+        app.json = OrjsonProvider(app)
+    app.config["RESPONSE_CACHE_ENABLED"] = os.getenv(
+        "RESPONSE_CACHE_ENABLED", "false"
+    ).lower() in ("1", "true", "yes")
+    app.config["RESPONSE_CACHE_TTL"] = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+    app.cache = ResponseCache(  # type: ignore
+        redis_connection if app.config["RESPONSE_CACHE_ENABLED"] else None,
+        ttl=app.config["RESPONSE_CACHE_TTL"],
+    )
+    app.config["PASSWORD_HASH_ROUNDS"] = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+    app.config["PASSWORD_HASH_WORKERS"] = int(
+        os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1))
+    )
+    app.password_hasher = PasswordHasher(  # type: ignore
+        rounds=app.config["PASSWORD_HASH_ROUNDS"],
+        workers=app.config["PASSWORD_HASH_WORKERS"],
+    )
     app.config["JWT_SECRET_KEY"] = jwt_secret or os.getenv(
         "JWT_SECRET_KEY", str(secrets.SystemRandom().getrandbits(256))
     )
+    app.config["JWT_BLOCKLIST_BACKEND"] = os.getenv("JWT_BLOCKLIST_BACKEND", "memory")
+    app.config["JWT_BLOCKLIST_NEGATIVE_CACHE_TTL"] = float(
+        os.getenv("JWT_BLOCKLIST_NEGATIVE_CACHE_TTL", "5")
+    )
+    app.config["JWT_BLOCKLIST_NEGATIVE_CACHE_SIZE"] = int(
+        os.getenv("JWT_BLOCKLIST_NEGATIVE_CACHE_SIZE", "10000")
+    )
+    app.blocklist = create_blocklist(  # type: ignore
+        app.config["JWT_BLOCKLIST_BACKEND"],
+        redis_connection,
+        negative_cache_ttl=app.config["JWT_BLOCKLIST_NEGATIVE_CACHE_TTL"],
+        negative_cache_size=app.config["JWT_BLOCKLIST_NEGATIVE_CACHE_SIZE"],
+    )
 
     db.init_app(app)
-    Migrate(app, db)
+    # only the flask command line runs migrations, servers skip alembic
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate  # pylint: disable=import-outside-toplevel
+
+        Migrate(app, db, include_object=include_object)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(rebuild_summaries_command)
 
     api = Api(app)
     jwt = JWTManager(app)
 
     @jwt.token_in_blocklist_loader
     def verify_token_in_blocklist(jwt_header, jwt_payload):
-        return jwt_payload["jti"] in BLOCKLIST
+        return jwt_payload["jti"] in app.blocklist  # type: ignore
 
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
@@ -118,5 +211,10 @@ def create_app(db_url: str | None = None, jwt_secret: str | None = None) -> Api:
     api.register_blueprint(TagBlueprint)
     api.register_blueprint(UserBlueprint)
     api.register_blueprint(HealthCheckBlueprint)
+    api.register_blueprint(JobBlueprint)
+
+    init_timing(app)
+    if app.config["METRICS_ENABLED"]:
+        init_metrics(app)
 
     return app
@@ -0,0 +1,517 @@
+""" optional ASGI mode serving the item, store and tag reads on an asyncio engine
+
+    uvicorn --factory api.asgi:create_asgi_app
+
+The GET endpoints of items, stores and tags are served by coroutines
+querying the database with the asyncio driver of SQLAlchemy, asyncpg or
+aiosqlite, on the models, schemas and query builders of the Flask views.
+Every other request goes to the Flask app, run in a thread pool. Async
+views run in a request context of the Flask app, so JWT checks, argument
+parsing, error payloads, timings and metrics are the ones of the WSGI
+mode. The request hooks and the JWT check, which may query the redis
+blocklist, run in the thread pool too, never on the event loop. The response cache is not used, detail responses always read the
+database and carry ``X-Cache: BYPASS``.
+"""
+import hashlib
+import io
+import json
+import sys
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager
+from functools import partial, wraps
+
+from a2wsgi import WSGIMiddleware
+from flask import Flask, Response, jsonify, request
+from flask_jwt_extended import verify_jwt_in_request
+from flask_smorest import abort
+from flask_smorest.arguments import ArgumentsMixin
+from flask_smorest.exceptions import NotModified
+from marshmallow import Schema
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.convertors import Convertor, register_url_convertor
+from starlette.requests import Request
+from starlette.responses import Response as AsgiResponse
+from starlette.routing import Mount, Route
+
+from api.app import create_app
+from api.cache import CACHE_STATUS_HEADER
+from api.fieldsets import resolve_fieldset
+from api.filters import filter_items, item_sort
+from api.models import ItemModel, StoreModel, TagModel
+from api.pagination import page_query, page_rows
+from api.pool import async_database_url, build_async_engine_options
+from api.resources.item import ITEM_LOAD_OPTIONS
+from api.resources.store import (
+    ITEMS_VISIBLE,
+    STORE_LOAD_OPTIONS,
+    TAGS_VISIBLE,
+    VISIBLE,
+    filtered_items_query,
+    filtered_store_query,
+    store_view,
+)
+from api.resources.tag import TAG_LOAD_OPTIONS
+from api.schemas import (
+    ItemFieldsArgsSchema,
+    ItemListArgsSchema,
+    ItemSchema,
+    StoreArgsSchema,
+    StoreListArgsSchema,
+    StoreSchema,
+    TagFieldsArgsSchema,
+    TagListArgsSchema,
+    TagSchema,
+)
+from api.timing import timed
+
+AsyncView = Callable[..., Awaitable[Response]]
+
+
+def wsgi_environ(asgi_request: Request) -> dict:
+    """Describe an ASGI request as a WSGI environ, without its body.
+
+    Args:
+        asgi_request (Request): request received by the ASGI server
+
+    Returns:
+        dict: WSGI environ
+    """
+    scope = asgi_request.scope
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": asgi_request.method,
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": asgi_request.client.host if asgi_request.client else "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in asgi_request.headers.raw:
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        value = raw_value.decode("latin-1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+class DigitsConvertor(Convertor):
+    """Match ids like ``int`` but keep them as written, like ``<string:...>``.
+
+    Detail ETags hash the id of the URL, "/item/07" gets the ETag of the
+    Flask view.
+    """
+
+    regex = "[0-9]+"
+
+    def convert(self, value: str) -> str:
+        return value
+
+    def to_string(self, value: str) -> str:
+        return value
+
+
+register_url_convertor("digits", DigitsConvertor())
+
+
+def before_view(app: Flask, args_schema: type[Schema]) -> tuple:
+    """Run the blocking steps of a Flask view before its body.
+
+    Args:
+        app (Flask): Flask app
+        args_schema (type[Schema]): schema of the query arguments
+
+    Returns:
+        tuple: response of a request hook, None to run the view, and the
+        parsed arguments
+    """
+    # timings and metrics hooks, they may answer on their own
+    rv = app.preprocess_request()
+    if rv is not None:
+        return rv, None
+    with timed("auth"):
+        verify_jwt_in_request()
+    return None, ArgumentsMixin.ARGUMENTS_PARSER.parse(args_schema, location="query")
+
+
+def finish_response(app: Flask, rv) -> tuple[int, bytes, list]:
+    """Run the response hooks and render what a WSGI server would send.
+
+    Args:
+        app (Flask): Flask app
+        rv: return value of the view or of an error handler
+
+    Returns:
+        tuple[int, bytes, list]: status code, body and headers, without the
+        body of a 304
+    """
+    response = app.process_response(app.make_response(rv))
+    body, _, headers = response.get_wsgi_response(request.environ)
+    return response.status_code, b"".join(body), headers
+
+
+def async_view(args_schema: type[Schema]) -> Callable[[AsyncView], Callable]:
+    """Serve an async view like the Flask views decorated with ``jwt_required``.
+
+    The view gets a session of the asyncio engine, the query arguments
+    parsed with ``args_schema`` and the path parameters, and returns a Flask
+    response. The request hooks of the Flask app run around it and errors
+    are turned into responses by its error handlers. Only the view runs on
+    the event loop, the synchronous steps run in the thread pool, in the
+    copied context of the request.
+
+    Args:
+        args_schema (type[Schema]): schema of the query arguments
+
+    Returns:
+        Callable[[AsyncView], Callable]: decorator building a Starlette endpoint
+    """
+
+    def decorator(view: AsyncView) -> Callable:
+        @wraps(view)
+        async def endpoint(asgi_request: Request) -> AsgiResponse:
+            state = asgi_request.app.state
+            app: Flask = state.flask_app
+            with app.request_context(wsgi_environ(asgi_request)):
+                try:
+                    rv, args = await run_in_threadpool(before_view, app, args_schema)
+                    if rv is None:
+                        async with state.sessions() as session:
+                            rv = await view(session, args, **asgi_request.path_params)
+                except Exception as error:  # pylint: disable=broad-except
+                    # handled like in the Flask app, or raised again
+                    rv = app.handle_user_exception(error)
+                status, body, headers = await run_in_threadpool(
+                    finish_response, app, rv
+                )
+                asgi_response = AsgiResponse(body, status)
+                asgi_response.raw_headers = [
+                    (name.lower().encode("latin-1"), value.encode("latin-1"))
+                    for name, value in headers
+                ]
+                return asgi_response
+
+        return endpoint
+
+    return decorator
+
+
+def generate_etag(etag_data) -> str:
+    """Hash ETag data the way flask-smorest does, so both modes agree.
+
+    Args:
+        etag_data: JSON serializable data
+
+    Returns:
+        str: ETag
+    """
+    return hashlib.sha1(
+        json.dumps(etag_data, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+async def first(session: AsyncSession, statement: Select):
+    """Run a statement and return its first row, if any."""
+    return (await session.scalars(statement)).first()
+
+
+async def read_detail(
+    session: AsyncSession,
+    model,
+    object_id: str,
+    load: Callable[[], Awaitable[object | None]],
+    schema: Schema,
+    not_found: str,
+    variant: dict | None = None,
+    where: tuple = (),
+) -> Response:
+    """Async counterpart of ``read_through``, always reading the database.
+
+    Args:
+        session (AsyncSession): session of the asyncio engine
+        model: versioned model class
+        object_id (str): row id, as written in the URL
+        load (Callable[[], Awaitable[object | None]]): loads the row with its
+            relationships
+        schema (Schema): response schema
+        not_found (str): 404 message
+        variant (dict | None, optional): arguments changing the payload.
+            Defaults to None.
+        where (tuple, optional): extra conditions for the row to be found,
+            ``load`` must apply them too. Defaults to ().
+
+    Returns:
+        Response: payload with its ETag
+    """
+    version = await session.scalar(
+        select(model.version).filter_by(id=int(object_id)).filter(*where)
+    )
+    if version is None:
+        abort(404, message=not_found)
+    kind = model.__tablename__
+    etag = generate_etag(
+        [kind, object_id, version, variant] if variant else [kind, object_id, version]
+    )
+    if request.if_none_match.contains(etag):
+        raise NotModified
+    obj = await load()
+    if obj is None:
+        abort(404, message=not_found)
+    response = jsonify(schema.dump(obj))
+    response.set_etag(etag)
+    response.headers[CACHE_STATUS_HEADER] = "BYPASS"
+    return response
+
+
+async def read_page(
+    session: AsyncSession,
+    statement: Select,
+    column,
+    args: dict,
+    schema: Schema,
+    sort=None,
+    descending: bool = False,
+) -> Response:
+    """Async counterpart of ``paginate``, dumping the page.
+
+    Args:
+        session (AsyncSession): session of the asyncio engine
+        statement (Select): statement to paginate
+        column: primary key column to order by
+        args (dict): parsed CursorPaginationArgsSchema arguments
+        schema (Schema): response schema of the rows
+        sort (optional): non null column to order by first. Defaults to None.
+        descending (bool, optional): whether to walk backwards. Defaults to False.
+
+    Returns:
+        Response: rows of the page with the pagination header
+    """
+    statement, limit = page_query(statement, column, args, sort, descending)
+    rows, headers = page_rows((await session.scalars(statement)).all(), limit, sort)
+    response = jsonify(schema.dump(rows))
+    response.headers.update(headers)
+    return response
+
+
+@async_view(ItemFieldsArgsSchema)
+async def get_item(session: AsyncSession, field_args: dict, item_id: str) -> Response:
+    """Async ``Item.get``."""
+    schema, options = resolve_fieldset(
+        ItemSchema,
+        ItemModel,
+        field_args.get("field_names"),
+        ITEM_LOAD_OPTIONS,
+        ItemModel.version,
+    )
+    statement = (
+        select(ItemModel)
+        .options(*options)
+        .filter_by(id=int(item_id))
+        .filter(*ITEMS_VISIBLE)
+    )
+    return await read_detail(
+        session,
+        ItemModel,
+        item_id,
+        partial(first, session, statement),
+        schema,
+        "Item not found.",
+        variant=field_args,
+        where=ITEMS_VISIBLE,
+    )
+
+
+@async_view(ItemListArgsSchema)
+async def list_items(session: AsyncSession, list_args: dict) -> Response:
+    """Async ``ItemList.get``."""
+    sort, descending = item_sort(list_args)
+    schema, options = resolve_fieldset(
+        ItemSchema,
+        ItemModel,
+        list_args.get("field_names"),
+        ITEM_LOAD_OPTIONS,
+        *([] if sort is None else [sort]),
+        many=True,
+    )
+    return await read_page(
+        session,
+        filter_items(
+            select(ItemModel).options(*options).filter(*ITEMS_VISIBLE), list_args
+        ),
+        ItemModel.id,
+        list_args,
+        schema,
+        sort,
+        descending,
+    )
+
+
+@async_view(StoreArgsSchema)
+async def get_store(session: AsyncSession, store_args: dict, store_id: str) -> Response:
+    """Async ``Store.get``."""
+    filter_args = {
+        key: value for key, value in store_args.items() if key != "field_names"
+    }
+    schema, options = resolve_fieldset(
+        StoreSchema,
+        StoreModel,
+        store_args.get("field_names"),
+        STORE_LOAD_OPTIONS,
+        StoreModel.version,
+    )
+
+    async def load_filtered_store():
+        store = await first(session, filtered_store_query(int(store_id), schema))
+        if store is None:
+            return None
+        statement = filtered_items_query(store.id, filter_args, schema)
+        items = [] if statement is None else (await session.scalars(statement)).all()
+        return store_view(store, items, schema)
+
+    if filter_args:
+        load = load_filtered_store
+    else:
+        statement = (
+            select(StoreModel)
+            .options(*options)
+            .filter_by(id=int(store_id))
+            .filter(*VISIBLE)
+        )
+        load = partial(first, session, statement)
+    return await read_detail(
+        session,
+        StoreModel,
+        store_id,
+        load,
+        schema,
+        "Store not found.",
+        variant=store_args,
+        where=VISIBLE,
+    )
+
+
+@async_view(StoreListArgsSchema)
+async def list_stores(session: AsyncSession, page_args: dict) -> Response:
+    """Async ``StoreList.get``."""
+    schema, options = resolve_fieldset(
+        StoreSchema,
+        StoreModel,
+        page_args.get("field_names"),
+        STORE_LOAD_OPTIONS,
+        many=True,
+    )
+    return await read_page(
+        session,
+        select(StoreModel).options(*options).filter(*VISIBLE),
+        StoreModel.id,
+        page_args,
+        schema,
+    )
+
+
+@async_view(TagListArgsSchema)
+async def list_tags_in_store(
+    session: AsyncSession, page_args: dict, store_id: int
+) -> Response:
+    """Async ``TagsInStore.get``."""
+    visible = select(StoreModel.id).filter_by(id=store_id).filter(*VISIBLE)
+    if await session.scalar(visible) is None:
+        abort(404, message="Store not found.")
+    schema, options = resolve_fieldset(
+        TagSchema,
+        TagModel,
+        page_args.get("field_names"),
+        TAG_LOAD_OPTIONS,
+        many=True,
+    )
+    return await read_page(
+        session,
+        select(TagModel).options(*options).filter_by(store_id=store_id),
+        TagModel.id,
+        page_args,
+        schema,
+    )
+
+
+@async_view(TagFieldsArgsSchema)
+async def get_tag(session: AsyncSession, field_args: dict, tag_id: str) -> Response:
+    """Async ``Tag.get``."""
+    schema, options = resolve_fieldset(
+        TagSchema,
+        TagModel,
+        field_args.get("field_names"),
+        TAG_LOAD_OPTIONS,
+        TagModel.version,
+    )
+    statement = (
+        select(TagModel)
+        .options(*options)
+        .filter_by(id=int(tag_id))
+        .filter(*TAGS_VISIBLE)
+    )
+    return await read_detail(
+        session,
+        TagModel,
+        tag_id,
+        partial(first, session, statement),
+        schema,
+        "Tag not found.",
+        variant=field_args,
+        where=TAGS_VISIBLE,
+    )
+
+
+# matched before the Flask app, other methods and paths fall through to it
+ASYNC_ROUTES = (
+    Route("/item/{item_id:digits}", get_item, methods=["GET"]),
+    Route("/item", list_items, methods=["GET"]),
+    Route("/store/{store_id:digits}", get_store, methods=["GET"]),
+    Route("/store", list_stores, methods=["GET"]),
+    Route("/stores/{store_id:int}/tag", list_tags_in_store, methods=["GET"]),
+    Route("/tag/{tag_id:digits}", get_tag, methods=["GET"]),
+)
+
+
+def create_asgi_app(flask_app: Flask | None = None) -> Starlette:
+    """Wrap the Flask app in an ASGI app serving the reads asynchronously.
+
+    The asyncio engine connects to ASYNC_DATABASE_URL, by default the
+    database of the Flask app with the asyncpg or aiosqlite driver, with the
+    pool settings of build_engine_options.
+
+    Args:
+        flask_app (Flask | None, optional): app serving the other requests.
+            Defaults to None, creating it from the environment.
+
+    Returns:
+        Starlette: ASGI app
+    """
+    app = flask_app or create_app()
+    url = app.config["ASYNC_DATABASE_URL"] or async_database_url(
+        app.config["SQLALCHEMY_DATABASE_URI"]
+    )
+    engine = create_async_engine(url, **build_async_engine_options(url))
+
+    @asynccontextmanager
+    async def lifespan(_):
+        yield
+        await engine.dispose()
+
+    asgi_app = Starlette(
+        routes=[*ASYNC_ROUTES, Mount("/", WSGIMiddleware(app))], lifespan=lifespan
+    )
+    asgi_app.state.flask_app = app
+    asgi_app.state.sessions = async_sessionmaker(engine, expire_on_commit=False)
+    return asgi_app
@@ -1 +1,158 @@
-BLOCKLIST = set()
+""" JWT blocklist backends """
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from redis import Redis
+
+
+class InMemoryBlocklist:
+    """Process local blocklist.
+
+    Only suitable for a single worker process, revoked tokens are not
+    shared with other workers. Safe to share between threads.
+    """
+
+    def __init__(self) -> None:
+        self._revoked: dict[str, float | None] = {}
+        self._lock = threading.Lock()
+
+    def add(self, jti: str, exp: int | None = None) -> None:
+        """Revoke a token until it expires.
+
+        Args:
+            jti (str): token identifier
+            exp (int | None, optional): token expiration timestamp. Defaults to None.
+        """
+        now = time.time()
+        with self._lock:
+            expired = [
+                key
+                for key, value in self._revoked.items()
+                if value is not None and value <= now
+            ]
+            for key in expired:
+                del self._revoked[key]
+            self._revoked[jti] = exp
+
+    def __contains__(self, jti: object) -> bool:
+        if jti not in self._revoked:
+            return False
+        exp = self._revoked.get(jti, 0)  # type: ignore
+        return exp is None or exp > time.time()
+
+
+class NegativeCache:
+    """Small TTL LRU remembering token ids known not to be revoked.
+
+    Shared by the threads of a worker, every access holds a lock.
+    """
+
+    def __init__(self, ttl: float, maxsize: int) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, jti: str) -> None:
+        """Remember that a token was not revoked.
+
+        Args:
+            jti (str): token identifier
+        """
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[jti] = time.monotonic() + self.ttl
+            self._entries.move_to_end(jti)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, jti: str) -> None:
+        """Forget a token.
+
+        Args:
+            jti (str): token identifier
+        """
+        with self._lock:
+            self._entries.pop(jti, None)
+
+    def __contains__(self, jti: object) -> bool:
+        with self._lock:
+            deadline = self._entries.get(jti)  # type: ignore
+            if deadline is None:
+                return False
+            if deadline < time.monotonic():
+                del self._entries[jti]  # type: ignore
+                return False
+            return True
+
+
+class RedisBlocklist:
+    """Blocklist shared by every worker through Redis.
+
+    Each revoked token is stored under its own key expiring at the token
+    expiration, so the blocklist never outgrows the set of live tokens.
+    Tokens found not revoked are remembered by a per-worker negative cache,
+    so repeated calls with the same token skip the Redis round trip. A token
+    revoked by another worker is therefore accepted here for at most
+    ``negative_cache_ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        connection: "Redis",
+        prefix: str = "jwt:blocklist:",
+        negative_cache_ttl: float = 5.0,
+        negative_cache_size: int = 10000,
+    ) -> None:
+        self.connection = connection
+        self.prefix = prefix
+        self.negative_cache = NegativeCache(negative_cache_ttl, negative_cache_size)
+
+    def add(self, jti: str, exp: int | None = None) -> None:
+        """Revoke a token until it expires.
+
+        Args:
+            jti (str): token identifier
+            exp (int | None, optional): token expiration timestamp. Defaults to None.
+        """
+        self.negative_cache.discard(jti)
+        if exp is None:
+            self.connection.set(self.prefix + jti, 1)
+        elif exp > time.time():
+            self.connection.set(self.prefix + jti, 1, exat=exp)
+
+    def __contains__(self, jti: object) -> bool:
+        if jti in self.negative_cache:
+            return False
+        revoked = bool(self.connection.exists(self.prefix + str(jti)))
+        if not revoked:
+            self.negative_cache.add(str(jti))
+        return revoked
+
+
+def create_blocklist(
+    backend: str, connection: "Redis | None" = None, **options
+) -> InMemoryBlocklist | RedisBlocklist:
+    """Create the configured blocklist backend.
+
+    Args:
+        backend (str): "memory" or "redis"
+        connection (Redis | None, optional): redis connection. Defaults to None.
+
+    Raises:
+        ValueError: unknown backend or missing redis connection
+
+    Returns:
+        InMemoryBlocklist | RedisBlocklist: blocklist backend
+    """
+    if backend == "memory":
+        return InMemoryBlocklist()
+    if backend == "redis":
+        if connection is None:
+            raise ValueError("The redis blocklist backend needs a redis connection")
+        return RedisBlocklist(connection, **options)
+    raise ValueError(f"Unknown JWT blocklist backend: {backend}")
@@ -0,0 +1,44 @@
+""" view decorators """
+from functools import wraps
+
+from flask import current_app
+from flask_jwt_extended import verify_jwt_in_request
+from flask_jwt_extended.view_decorators import LocationType
+
+from api.timing import timed
+
+
+def jwt_required(
+    optional: bool = False,
+    fresh: bool = False,
+    refresh: bool = False,
+    locations: LocationType = None,
+    verify_type: bool = True,
+):
+    """Protect a view with JSON Web Tokens, timing the verification.
+
+    Same as ``flask_jwt_extended.jwt_required``, the time spent verifying
+    the token is reported as the "auth" request timing.
+
+    Args:
+        optional (bool, optional): allow requests without a JWT. Defaults to False.
+        fresh (bool, optional): require a fresh JWT. Defaults to False.
+        refresh (bool, optional): require a refresh JWT. Defaults to False.
+        locations (LocationType, optional): where to look for the JWT.
+            Defaults to None.
+        verify_type (bool, optional): check the token type. Defaults to True.
+
+    Returns:
+        Callable: view decorator
+    """
+
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            with timed("auth"):
+                verify_jwt_in_request(optional, fresh, refresh, locations, verify_type)
+            return current_app.ensure_sync(fn)(*args, **kwargs)
+
+        return decorator
+
+    return wrapper
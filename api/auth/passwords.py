@@ -0,0 +1,129 @@
+""" password hashing off the request thread """
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
+@lru_cache(maxsize=None)
+def crypt_context(rounds: int) -> "CryptContext":
+    """Build the passlib context for a number of pbkdf2 rounds.
+
+    Hashes made with fewer rounds are reported as needing an update.
+
+    Args:
+        rounds (int): pbkdf2_sha256 rounds
+
+    Returns:
+        CryptContext: passlib context
+    """
+    # imported by the first hash, in the process computing it
+    from passlib.context import CryptContext  # pylint: disable=import-outside-toplevel
+
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        pbkdf2_sha256__default_rounds=rounds,
+        pbkdf2_sha256__min_rounds=rounds,
+    )
+
+
+def hash_password(password: str, rounds: int) -> str:
+    """Hash a password.
+
+    Args:
+        password (str): clear text password
+        rounds (int): pbkdf2_sha256 rounds
+
+    Returns:
+        str: password hash
+    """
+    return crypt_context(rounds).hash(password)
+
+
+def verify_and_update(
+    password: str, password_hash: str, rounds: int
+) -> tuple[bool, str | None]:
+    """Verify a password and rehash it if its parameters are outdated.
+
+    Args:
+        password (str): clear text password
+        password_hash (str): stored hash
+        rounds (int): pbkdf2_sha256 rounds
+
+    Returns:
+        tuple[bool, str | None]: whether it matches and the upgraded hash, if any
+    """
+    return crypt_context(rounds).verify_and_update(password, password_hash)
+
+
+class PasswordHasher:
+    """Runs password hashing on a bounded process pool.
+
+    Each hash keeps a core busy for tens of milliseconds. Inline, it
+    occupies a request thread or worker for that long, and a burst of
+    logins competes with every other request for the cores. The pool keeps
+    hashing off the request workers and bounds how many hashes run at once,
+    extra logins queue for a pool process. The pool is created lazily in
+    each process that uses it, never inherited through a fork. With
+    ``workers=0`` hashing runs inline.
+    """
+
+    def __init__(self, rounds: int, workers: int, timeout: float = 30.0) -> None:
+        self.rounds = rounds
+        self.workers = workers
+        self.timeout = timeout
+        self._executor: Executor | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> Executor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+        return self._pool().submit(func, *args).result(timeout=self.timeout)
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the configured rounds.
+
+        Args:
+            password (str): clear text password
+
+        Returns:
+            str: password hash
+        """
+        return self._run(hash_password, password, self.rounds)
+
+    def verify_and_update(
+        self, password: str, password_hash: str
+    ) -> tuple[bool, str | None]:
+        """Verify a password, returning an upgraded hash when needed.
+
+        Args:
+            password (str): clear text password
+            password_hash (str): stored hash
+
+        Returns:
+            tuple[bool, str | None]: whether it matches and the upgraded hash, if any
+        """
+        return self._run(verify_and_update, password, password_hash, self.rounds)
+
+    def shutdown(self) -> None:
+        """Stop the pool of this process, if any."""
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._pid = None
@@ -0,0 +1,80 @@
+""" bulk insert helpers """
+import io
+from collections.abc import Iterable, Sequence
+
+from sqlalchemy import Table, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+# insert constructs supporting ON CONFLICT
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _copy_value(value) -> str:
+    """Format a value for COPY ... WITH CSV, keeping NULL and '' apart."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+
+def copy_rows(
+    session: Session, table: Table, columns: Sequence[str], rows: Iterable[dict]
+) -> None:
+    """Load rows with Postgres COPY inside the session transaction.
+
+    Args:
+        session (Session): database session
+        table (Table): target table
+        columns (Sequence[str]): column names to load
+        rows (Iterable[dict]): rows to load
+    """
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_copy_value(row.get(column)) for column in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH CSV", buffer
+        )
+    finally:
+        cursor.close()
+
+
+def insert_rows(
+    session: Session,
+    table: Table,
+    columns: Sequence[str],
+    rows: Sequence[dict],
+    chunk_size: int,
+) -> int:
+    """Insert rows in chunks without building ORM objects.
+
+    Postgres loads each chunk with COPY, other databases use a multi-row
+    INSERT / executemany. Nothing is committed, so every chunk belongs to
+    the caller's transaction.
+
+    Args:
+        session (Session): database session
+        table (Table): target table
+        columns (Sequence[str]): column names to insert
+        rows (Sequence[dict]): rows to insert
+        chunk_size (int): rows per statement
+
+    Returns:
+        int: number of inserted rows
+    """
+    use_copy = session.get_bind().dialect.name == "postgresql"
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start : start + chunk_size]
+        if use_copy:
+            copy_rows(session, table, columns, chunk)
+        else:
+            session.execute(
+                insert(table),
+                [{column: row.get(column) for column in columns} for row in chunk],
+            )
+    return len(rows)
@@ -0,0 +1,251 @@
+""" read-through cache of serialized detail responses """
+import json
+from collections.abc import Callable, Iterable
+from typing import TYPE_CHECKING
+
+from flask import Response, current_app, has_app_context, jsonify, request
+from flask_smorest import Blueprint, abort
+from marshmallow import Schema
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from api.db import db
+
+if TYPE_CHECKING:
+    from redis import Redis
+
+CACHE_STATUS_HEADER = "X-Cache"
+
+
+class ResponseCache:
+    """Cache of serialized schema output keyed by table name and id.
+
+    Entries hold the row version next to the payload so a cache hit can
+    answer conditional requests without touching the database. Redis
+    errors are counted and treated as misses, the database stays the
+    source of truth. Without a connection the cache is disabled.
+    """
+
+    def __init__(
+        self, connection: "Redis | None", ttl: int = 300, prefix: str = "cache:"
+    ) -> None:
+        self.connection = connection
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def key(self, kind: str, object_id) -> str | None:
+        """Build the redis key of an entry.
+
+        Ids are normalized so "/item/07" cannot create an entry that
+        invalidation of item 7 would miss.
+
+        Args:
+            kind (str): table name of the cached row
+            object_id: row id
+
+        Returns:
+            str | None: redis key, None if the id is not an integer
+        """
+        try:
+            return f"{self.prefix}{kind}:{int(object_id)}"
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, kind: str, object_id) -> dict | None:
+        """Read an entry.
+
+        Args:
+            kind (str): table name of the cached row
+            object_id: row id
+
+        Returns:
+            dict | None: entry with "version" and "data", None on a miss
+        """
+        key = self.key(kind, object_id)
+        if self.connection is None or key is None:
+            return None
+        # redis is only imported by an enabled cache
+        from redis import RedisError  # pylint: disable=import-outside-toplevel
+
+        try:
+            raw = self.connection.get(key)
+        except RedisError:
+            self.errors += 1
+            return None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, kind: str, object_id, version: int, data: dict) -> dict:
+        """Store an entry.
+
+        Args:
+            kind (str): table name of the cached row
+            object_id: row id
+            version (int): row version
+            data (dict): serialized payload
+
+        Returns:
+            dict: the stored entry
+        """
+        entry = {"version": version, "data": data}
+        key = self.key(kind, object_id)
+        if self.connection is not None and key is not None:
+            from redis import RedisError  # pylint: disable=import-outside-toplevel
+
+            try:
+                self.connection.set(key, json.dumps(entry), ex=self.ttl)
+            except RedisError:
+                self.errors += 1
+        return entry
+
+    def invalidate(self, keys: Iterable[tuple[str, int]]) -> None:
+        """Drop entries.
+
+        Args:
+            keys (Iterable[tuple[str, int]]): (table name, id) pairs
+        """
+        if self.connection is None:
+            return
+        redis_keys = [self.key(kind, object_id) for kind, object_id in keys]
+        redis_keys = [key for key in redis_keys if key is not None]
+        if not redis_keys:
+            return
+        from redis import RedisError  # pylint: disable=import-outside-toplevel
+
+        try:
+            self.connection.delete(*redis_keys)
+        except RedisError:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        """Return the hit, miss and error counters of this worker.
+
+        Returns:
+            dict: counters
+        """
+        return {
+            "enabled": self.connection is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+def cache_bypassed() -> bool:
+    """Tell whether the client asked to skip cached entries.
+
+    Returns:
+        bool: True if the request has Cache-Control: no-cache
+    """
+    return bool(request.cache_control.no_cache)
+
+
+@event.listens_for(db.session, "after_commit")
+def invalidate_touched(session: Session) -> None:
+    """Invalidate the entries of rows touched by the committed transaction.
+
+    Args:
+        session (Session): committed session
+    """
+    keys = session.info.pop("touched_keys", set())
+    cache = getattr(current_app, "cache", None) if has_app_context() else None
+    if keys and cache is not None:
+        cache.invalidate(keys)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def forget_touched(session: Session, previous_transaction) -> None:
+    """Forget rows touched by a rolled back transaction.
+
+    Args:
+        session (Session): rolled back session
+        previous_transaction: rolled back transaction
+    """
+    session.info.pop("touched", None)
+    session.info.pop("touched_keys", None)
+
+
+def read_through(
+    blp: Blueprint,
+    model,
+    object_id,
+    load: Callable[[], object | None],
+    schema: Schema,
+    not_found: str,
+    variant: dict | None = None,
+    where: tuple = (),
+) -> tuple[Response, int, dict]:
+    """Serve a detail payload from the cache, falling back to the database.
+
+    The ETag is derived from the row version, read from the cached entry
+    on a hit, so conditional requests are answered before any loading.
+    On a miss the ETag is set again from the version of the loaded row,
+    and the entry is dropped right after being stored if the row version
+    changed since the load: the invalidation of that write may already
+    have run. Variants of the payload, like filtered ones, are never
+    cached and get the variant arguments in their ETag.
+
+    Args:
+        blp (Blueprint): blueprint of the resource, used to set the ETag
+        model: versioned model class
+        object_id: row id
+        load (Callable[[], object | None]): loads the row with its relationships
+        schema (Schema): response schema
+        not_found (str): 404 message
+        variant (dict | None, optional): arguments changing the payload.
+            Defaults to None.
+        where (tuple, optional): extra conditions for the row to be found,
+            ``load`` must apply them too. Defaults to ().
+
+    Returns:
+        tuple[Response, int, dict]: response, status code and cache status header
+    """
+    cache = current_app.cache  # type: ignore
+    kind = model.__tablename__
+
+    def set_etag(version: int) -> None:
+        blp.set_etag(
+            [kind, object_id, version, variant]
+            if variant
+            else [kind, object_id, version]
+        )
+
+    bypass = cache_bypassed() or bool(variant)
+    entry = None if bypass else cache.get(kind, object_id)
+    if entry is not None:
+        set_etag(entry["version"])
+        return jsonify(entry["data"]), 200, {CACHE_STATUS_HEADER: "HIT"}
+
+    version = _row_version(model, object_id, where)
+    if version is None:
+        abort(404, message=not_found)
+    set_etag(version)
+    obj = load()
+    if obj is None:
+        abort(404, message=not_found)
+    # a write committed since the version lookup changes the payload
+    set_etag(obj.version)
+    if variant:
+        entry = {"version": obj.version, "data": schema.dump(obj)}
+    else:
+        entry = cache.set(kind, object_id, obj.version, schema.dump(obj))
+        if (
+            cache.connection is not None
+            and _row_version(model, object_id, where) != obj.version
+        ):
+            cache.invalidate([(kind, object_id)])
+    status = "BYPASS" if bypass else "MISS"
+    return jsonify(entry["data"]), 200, {CACHE_STATUS_HEADER: status}
+
+
+def _row_version(model, object_id, where: tuple = ()) -> int | None:
+    """Read the current version of a row, None if it is not found."""
+    return (
+        db.session.query(model.version).filter_by(id=object_id).filter(*where).scalar()
+    )
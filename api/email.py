@@ -1,8 +1,18 @@
 """send email module"""
+import json
 import os
+import time
+from collections.abc import Sequence
 
 import jinja2
 import requests
+from markupsafe import escape
+from redis import Redis
+from requests.adapters import HTTPAdapter
+from rq import Queue
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+from rq.utils import as_text
 
 template_loader = jinja2.FileSystemLoader(searchpath="templates")
 template_env = jinja2.Environment(loader=template_loader, autoescape=True)
@@ -23,6 +33,153 @@ def render_template(template_name: str, **kwargs) -> str:
 
 MAILGUN_DOMAIN = os.getenv("MAILGUN_DOMAIN")
 MAILGUN_TOKEN = os.getenv("MAILGUN_TOKEN")
+MAILGUN_API_URL = os.getenv("MAILGUN_API_URL", "https://api.mailgun.net/v3")
+# Mailgun accepts at most 1000 recipients per batch sending call
+MAILGUN_BATCH_SIZE = 1000
+
+WELCOME_SUBJECT = (
+    "Welcome {username}! You have successfully registered to our Stores API."
+)
+WELCOME_BODY = "Successfully created a new user."
+
+
+class MailgunClient:
+    """Mailgun messages API client keeping its connections alive.
+
+    A single ``requests.Session`` is reused for every call so consecutive
+    messages share pooled TCP/TLS connections instead of paying a new
+    handshake each time.
+    """
+
+    def __init__(
+        self,
+        domain: str,
+        token: str,
+        base_url: str = MAILGUN_API_URL,
+        pool_size: int = 10,
+        timeout: float = 5,
+    ) -> None:
+        self.domain = domain
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @property
+    def messages_url(self) -> str:
+        """URL of the messages endpoint of the domain."""
+        return f"{self.base_url}/{self.domain}.mailgun.org/messages"
+
+    @property
+    def postmaster(self) -> str:
+        """Sender address of the domain postmaster."""
+        return f"Rcbop <postmaster@{self.domain}.mailgun.org>"
+
+    def send(
+        self, subject: str, body: str, mail_from: str, mail_to: str, html: str
+    ) -> requests.Response:
+        """Send an email to a single recipient.
+
+        Args:
+            subject (str): email subject
+            body (str): email body
+            mail_from (str): email sender
+            mail_to (str): email recipient
+            html (str): html body
+
+        Returns:
+            requests.Response: Mailgun response
+        """
+        return self.session.post(
+            url=self.messages_url,
+            auth=("api", self.token),
+            data={
+                "from": mail_from,
+                "to": [mail_to],
+                "subject": subject,
+                "text": body,
+                "html": html,
+            },
+            timeout=self.timeout,
+        )
+
+    def send_batch(
+        self,
+        subject: str,
+        body: str,
+        mail_from: str,
+        recipients: dict[str, dict],
+        html: str,
+    ) -> list[requests.Response]:
+        """Send one templated email to many recipients.
+
+        Uses Mailgun batch sending: ``%recipient.<name>%`` placeholders in
+        the subject and bodies are replaced by the recipient variables, and
+        every recipient only sees its own address. Recipients are split in
+        calls of at most ``MAILGUN_BATCH_SIZE``.
+
+        Args:
+            subject (str): email subject
+            body (str): email body
+            mail_from (str): email sender
+            recipients (dict[str, dict]): variables of each recipient address
+            html (str): html body
+
+        Returns:
+            list[requests.Response]: Mailgun response of each call
+        """
+        addresses = list(recipients)
+        responses = []
+        for start in range(0, len(addresses), MAILGUN_BATCH_SIZE):
+            batch = addresses[start : start + MAILGUN_BATCH_SIZE]
+            responses.append(
+                self.session.post(
+                    url=self.messages_url,
+                    auth=("api", self.token),
+                    data={
+                        "from": mail_from,
+                        "to": batch,
+                        "subject": subject,
+                        "text": body,
+                        "html": html,
+                        "recipient-variables": json.dumps(
+                            {address: recipients[address] for address in batch}
+                        ),
+                    },
+                    timeout=self.timeout,
+                )
+            )
+        return responses
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self.session.close()
+
+
+_clients: dict[tuple, MailgunClient] = {}
+
+
+def get_client() -> MailgunClient:
+    """Return the Mailgun client of this process.
+
+    Clients are never shared across a fork, since the pooled sockets
+    would be shared with the parent.
+
+    Raises:
+        ValueError: MAILGUN_DOMAIN and MAILGUN_TOKEN must be set
+
+    Returns:
+        MailgunClient: client for the configured domain
+    """
+    if MAILGUN_DOMAIN is None or MAILGUN_TOKEN is None:
+        raise ValueError("MAILGUN_DOMAIN and MAILGUN_TOKEN must be set")
+    key = (os.getpid(), MAILGUN_DOMAIN, MAILGUN_TOKEN, MAILGUN_API_URL)
+    if key not in _clients:
+        _clients[key] = MailgunClient(MAILGUN_DOMAIN, MAILGUN_TOKEN, MAILGUN_API_URL)
+    return _clients[key]
 
 
 def send_email_from_postmaster(email: str, username: str) -> requests.Response:
@@ -36,14 +193,43 @@ def send_email_from_postmaster(email: str, username: str) -> requests.Response:
         requests.Response: Mailgun response
     """
     return send_email(
-        subject=f"Welcome {username}! You have successfully registered to our Stores API.",
-        body="Successfully created a new user.",
+        subject=WELCOME_SUBJECT.format(username=username),
+        body=WELCOME_BODY,
         mail_from=f"Rcbop <postmaster@{MAILGUN_DOMAIN}.mailgun.org>",
         mail_to=email,
         html=render_template("email/welcome.html", username=username),
     )
 
 
+def send_welcome_emails(
+    recipients: Sequence[tuple[str, str]]
+) -> list[requests.Response]:
+    """Send the welcome email to many users with batch sending.
+
+    The html body is rendered once; usernames are substituted by Mailgun,
+    html escaped in the body and verbatim in the subject.
+
+    Args:
+        recipients (Sequence[tuple[str, str]]): (email, username) pairs
+
+    Returns:
+        list[requests.Response]: Mailgun response of each call
+    """
+    client = get_client()
+    return client.send_batch(
+        subject=WELCOME_SUBJECT.format(username="%recipient.username%"),
+        body=WELCOME_BODY,
+        mail_from=client.postmaster,
+        recipients={
+            email: {"username": username, "username_html": str(escape(username))}
+            for email, username in recipients
+        },
+        html=render_template(
+            "email/welcome.html", username="%recipient.username_html%"
+        ),
+    )
+
+
 def send_email(
     subject: str, body: str, mail_from: str, mail_to: str, html: str
 ) -> requests.Response:
@@ -62,18 +248,135 @@ def send_email(
     Returns:
         requests.Response: Mailgun response
     """
-    if MAILGUN_DOMAIN is None or MAILGUN_TOKEN is None:
-        raise ValueError("MAILGUN_DOMAIN and MAILGUN_TOKEN must be set")
+    return get_client().send(subject, body, mail_from, mail_to, html)
 
-    return requests.post(
-        url=f"https://api.mailgun.net/v3/{MAILGUN_DOMAIN}.mailgun.org/messages",
-        auth=("api", MAILGUN_TOKEN),
-        data={
-            "from": mail_from,
-            "to": [mail_to],
-            "subject": subject,
-            "text": body,
-            "html": html,
-        },
-        timeout=5,
+
+WELCOME_JOB = f"{__name__}.send_email_from_postmaster"
+
+
+def batch_key(queue: Queue) -> str:
+    """Name the redis list holding the job ids of the batch being sent.
+
+    Args:
+        queue (Queue): queue the jobs are enqueued to
+
+    Returns:
+        str: redis key
+    """
+    return f"{queue.key}:welcome-batch"
+
+
+def _acknowledge(queue: Queue, job_ids: Sequence[str]) -> None:
+    """Remove job ids from the batch list, once handled."""
+    with queue.connection.pipeline() as pipe:
+        for job_id in job_ids:
+            pipe.lrem(batch_key(queue), 1, job_id)
+        pipe.execute()
+
+
+def _release(queue: Queue, job_ids: Sequence[str], at_front: bool) -> None:
+    """Move job ids from the batch list back to the queue, atomically."""
+    with queue.connection.pipeline() as pipe:
+        for job_id in reversed(job_ids) if at_front else job_ids:
+            queue.push_job_id(job_id, pipeline=pipe, at_front=at_front)
+            pipe.lrem(batch_key(queue), 1, job_id)
+        pipe.execute()
+
+
+def requeue_unacknowledged(queue: Queue) -> int:
+    """Put back in front of the queue the batch of a batcher that died.
+
+    Args:
+        queue (Queue): queue the jobs are enqueued to
+
+    Returns:
+        int: number of jobs put back
+    """
+    job_ids = [
+        as_text(job_id) for job_id in queue.connection.lrange(batch_key(queue), 0, -1)
+    ]
+    _release(queue, job_ids, at_front=True)
+    return len(job_ids)
+
+
+def drain_welcome_jobs(queue: Queue, max_jobs: int = MAILGUN_BATCH_SIZE) -> int:
+    """Send queued welcome email jobs as a single batch.
+
+    Job ids are moved atomically from the queue to the batch list (LMOVE),
+    so regular RQ workers listening to the same queue never run a drained
+    job, and a batch lost by a crash is still in redis for
+    requeue_unacknowledged. Ids leave the batch list only once handled:
+    other jobs are pushed back in order, sent welcome jobs are
+    acknowledged, and welcome jobs go back to the queue if the batch fails
+    so a regular worker can retry them one by one. Run a single batcher
+    per queue.
+
+    Args:
+        queue (Queue): queue the jobs are enqueued to
+        max_jobs (int): maximum number of jobs drained
+
+    Returns:
+        int: number of welcome emails sent
+    """
+    welcome: list[Job] = []
+    others: list[str] = []
+    missing: list[str] = []
+    for _ in range(max_jobs):
+        job_id = as_text(
+            queue.connection.lmove(queue.key, batch_key(queue), "LEFT", "RIGHT")
+        )
+        if job_id is None:
+            break
+        try:
+            job = Job.fetch(job_id, connection=queue.connection)
+        except NoSuchJobError:
+            missing.append(job_id)
+            continue
+        if job.func_name == WELCOME_JOB:
+            welcome.append(job)
+        else:
+            others.append(job_id)
+    _acknowledge(queue, missing)
+    _release(queue, others, at_front=True)
+    if not welcome:
+        return 0
+
+    try:
+        responses = send_welcome_emails(
+            [(job.kwargs["email"], job.kwargs["username"]) for job in welcome]
+        )
+        sent = all(response.ok for response in responses)
+    except requests.RequestException:
+        sent = False
+    if not sent:
+        _release(queue, [job.id for job in welcome], at_front=False)
+        return 0
+    _acknowledge(queue, [job.id for job in welcome])
+    for job in welcome:
+        job.delete()
+    return len(welcome)
+
+
+def run_welcome_batcher(queue: Queue, interval: float = 1.0) -> None:
+    """Drain welcome email jobs forever, after requeuing an unfinished batch.
+
+    Args:
+        queue (Queue): queue the jobs are enqueued to
+        interval (float): seconds to wait when the queue is empty
+    """
+    requeue_unacknowledged(queue)
+    while True:
+        if not drain_welcome_jobs(queue):
+            time.sleep(interval)
+
+
+if __name__ == "__main__":
+    run_welcome_batcher(
+        Queue(
+            "emails",
+            connection=Redis.from_url(
+                os.getenv("REDIS_URL", "redis://localhost:6379/0")
+            ),
+        ),
+        interval=float(os.getenv("MAILGUN_BATCH_INTERVAL", "1")),
     )
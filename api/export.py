@@ -0,0 +1,48 @@
+""" streaming NDJSON export """
+from collections.abc import Iterator
+
+from flask import Response, current_app, request, stream_with_context
+from flask_smorest import abort
+from marshmallow import Schema
+from sqlalchemy import Select
+
+from api.db import db
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def ndjson_lines(statement: Select, schema: Schema, yield_per: int) -> Iterator[str]:
+    """Serialize rows one by one as newline delimited JSON.
+
+    Rows are fetched ``yield_per`` at a time through a server side cursor
+    where the driver supports it, and eager loaders run once per batch, so
+    memory stays flat whatever the size of the table.
+
+    Args:
+        statement (Select): ORM select of the rows to export
+        schema (Schema): schema used to serialize a row
+        yield_per (int): rows fetched per batch
+
+    Yields:
+        str: one serialized row followed by a newline
+    """
+    result = db.session.execute(statement.execution_options(yield_per=yield_per))
+    for row in result.scalars():
+        yield current_app.json.dumps(schema.dump(row)) + "\n"
+
+
+def ndjson_response(statement: Select, schema: Schema) -> Response:
+    """Stream the rows of a select as an NDJSON response.
+
+    Args:
+        statement (Select): ORM select of the rows to export
+        schema (Schema): schema used to serialize a row
+
+    Returns:
+        Response: streamed response
+    """
+    accept = request.accept_mimetypes
+    if accept and accept.best_match([NDJSON_MIMETYPE]) is None:
+        abort(406, message=f"Export is only available as {NDJSON_MIMETYPE}.")
+    lines = ndjson_lines(statement, schema, current_app.config["EXPORT_YIELD_PER"])
+    return Response(stream_with_context(lines), mimetype=NDJSON_MIMETYPE)
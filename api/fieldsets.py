@@ -0,0 +1,144 @@
+""" sparse fieldsets: response schemas and loader options pruned to some fields """
+from collections.abc import Collection, Iterable
+from functools import lru_cache
+
+from marshmallow import Schema, fields
+from sqlalchemy import inspect
+from sqlalchemy.orm import RelationshipProperty, joinedload, load_only, selectinload
+
+
+def nested_schema(field: fields.Field) -> Schema | None:
+    """Return the schema of a nested field, or of a list of nested fields.
+
+    Args:
+        field (fields.Field): schema field
+
+    Returns:
+        Schema | None: nested schema, None if the field is not nested
+    """
+    if isinstance(field, fields.List):
+        field = field.inner
+    return field.schema if isinstance(field, fields.Nested) else None
+
+
+def dumps_field(schema: Schema, path: str) -> bool:
+    """Tell whether a schema dumps a field, dotted paths naming nested fields.
+
+    Args:
+        schema (Schema): response schema
+        path (str): field name, like ``name`` or ``items.price``
+
+    Returns:
+        bool: True if the field is dumped
+    """
+    name, _, rest = path.partition(".")
+    field = schema.dump_fields.get(name)
+    if field is None or not rest:
+        return field is not None
+    nested = nested_schema(field)
+    return nested is not None and dumps_field(nested, rest)
+
+
+@lru_cache(maxsize=None)
+def full_schema(schema_class: type[Schema], many: bool = False) -> Schema:
+    """Build a response schema dumping every field.
+
+    Shared by every request, like the sparse schemas, so its compiled
+    serializer is generated once per schema class.
+
+    Args:
+        schema_class (type[Schema]): full response schema
+        many (bool, optional): whether to dump lists. Defaults to False.
+
+    Returns:
+        Schema: response schema
+    """
+    return schema_class(many=many)
+
+
+@lru_cache(maxsize=256)
+def sparse_schema(
+    schema_class: type[Schema], names: tuple[str, ...], many: bool = False
+) -> Schema:
+    """Build a response schema dumping only some fields.
+
+    Schemas are cached per fieldset, so compiled serializers are generated
+    once per combination of fields instead of once per request.
+
+    Args:
+        schema_class (type[Schema]): full response schema
+        names (tuple[str, ...]): fields to dump, dotted for nested fields
+        many (bool, optional): whether to dump lists. Defaults to False.
+
+    Returns:
+        Schema: pruned schema
+    """
+    return schema_class(only=names, many=many)
+
+
+def load_options(model, schema: Schema, *columns, skip: Collection[str] = ()) -> list:
+    """Build loader options fetching what a schema dumps, and nothing else.
+
+    Columns outside the schema are deferred with ``load_only`` and
+    relationships outside the schema get no loader, so they are never
+    accessed. Dumped relationships are eagerly loaded like the default
+    options: joined for many-to-one, with a second SELECT for collections,
+    each pruned to the columns of its nested schema.
+
+    Args:
+        model: mapped class of the rows
+        schema (Schema): response schema of the rows
+        *columns: attributes to load even if not dumped, like sort keys
+        skip (Collection[str], optional): dumped fields loaded by the caller.
+            Defaults to ().
+
+    Returns:
+        list: loader options
+    """
+    mapper = inspect(model)
+    loaded = [getattr(model, column.key) for column in mapper.primary_key]
+    loaded.extend(columns)
+    options = []
+    for name, field in schema.dump_fields.items():
+        attribute = field.attribute or name
+        prop = mapper.attrs.get(attribute)
+        if name in skip or prop is None:
+            continue
+        if not isinstance(prop, RelationshipProperty):
+            loaded.append(getattr(model, attribute))
+            continue
+        loader = (selectinload if prop.uselist else joinedload)(
+            getattr(model, attribute)
+        )
+        nested = nested_schema(field)
+        if nested is not None:
+            loader = loader.options(*load_options(prop.mapper.class_, nested))
+        options.append(loader)
+    return [load_only(*loaded), *options]
+
+
+def resolve_fieldset(
+    schema_class: type[Schema],
+    model,
+    names: tuple[str, ...] | None,
+    default_options: Iterable,
+    *columns,
+    many: bool = False,
+) -> tuple[Schema, tuple]:
+    """Resolve the response schema and loader options of a request.
+
+    Args:
+        schema_class (type[Schema]): full response schema
+        model: mapped class of the rows
+        names (tuple[str, ...] | None): requested fields, None for all
+        default_options (Iterable): loader options of the full schema
+        *columns: attributes to load even if not dumped, like sort keys
+        many (bool, optional): whether to dump lists. Defaults to False.
+
+    Returns:
+        tuple[Schema, tuple]: response schema and loader options
+    """
+    if not names:
+        return full_schema(schema_class, many), tuple(default_options)
+    schema = sparse_schema(schema_class, names, many)
+    return schema, tuple(load_options(model, schema, *columns))
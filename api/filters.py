@@ -0,0 +1,85 @@
+""" item filters and sort keys shared by the listing endpoints """
+import re
+
+from sqlalchemy import and_
+from sqlalchemy.orm import aliased
+
+from api.db import db
+from api.models import ItemModel, ItemTags
+
+GLOB_SPECIAL = re.compile(r"([*?\[])")
+
+
+def name_prefix_filter(prefix: str):
+    """Match item names starting with a prefix, case sensitively.
+
+    SQLite only walks an index for GLOB on binary collated columns, Postgres
+    serves LIKE 'prefix%' from the name trigram index.
+
+    Args:
+        prefix (str): name prefix
+
+    Returns:
+        condition on the item name
+    """
+    if db.engine.dialect.name == "sqlite":
+        return ItemModel.name.op("GLOB")(GLOB_SPECIAL.sub(r"[\1]", prefix) + "*")
+    return ItemModel.name.startswith(prefix, autoescape=True)
+
+
+def filter_items(query, args: dict):
+    """Apply the filters of ItemListArgsSchema to a query of items.
+
+    Each requested tag adds a join through item_tags, so items carrying all
+    of them are found on the (tag_id, item_id) index in the same query.
+
+    Args:
+        query: Query or Select of ItemModel
+        args (dict): parsed ItemFilterArgsSchema arguments
+
+    Returns:
+        the filtered query
+    """
+    if "store_id" in args:
+        query = query.filter(ItemModel.store_id == args["store_id"])
+    if "min_price" in args:
+        query = query.filter(ItemModel.price >= args["min_price"])
+    if "max_price" in args:
+        query = query.filter(ItemModel.price <= args["max_price"])
+    if "name_prefix" in args:
+        query = query.filter(name_prefix_filter(args["name_prefix"]))
+    for tag_id in sorted(set(args.get("tag_id", ()))):
+        link = aliased(ItemTags)
+        query = query.join(
+            link, and_(link.item_id == ItemModel.id, link.tag_id == tag_id)
+        )
+    return query
+
+
+def item_sort(args: dict) -> tuple:
+    """Resolve the sort argument of ItemFilterArgsSchema.
+
+    Args:
+        args (dict): parsed ItemFilterArgsSchema arguments
+
+    Returns:
+        tuple: column to sort by before the id, None for the id alone, and
+        whether the order is descending
+    """
+    sort = args.get("sort", "id")
+    column = sort.lstrip("-")
+    return (None if column == "id" else getattr(ItemModel, column)), sort[0] == "-"
+
+
+def item_order(args: dict) -> list:
+    """Build the ORDER BY clauses of the sort argument, ids breaking ties.
+
+    Args:
+        args (dict): parsed ItemFilterArgsSchema arguments
+
+    Returns:
+        list: order by clauses
+    """
+    sort, descending = item_sort(args)
+    keys = [ItemModel.id] if sort is None else [sort, ItemModel.id]
+    return [key.desc() for key in keys] if descending else keys
@@ -0,0 +1,74 @@
+""" background jobs run by the rq workers """
+from contextlib import AbstractContextManager, nullcontext
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, select
+
+from api.db import db
+from api.models import ItemModel, StoreModel, TagModel
+
+
+def job_app_context() -> AbstractContextManager:
+    """Reuse the current app context, or create the app inside a worker.
+
+    Returns:
+        AbstractContextManager: app context
+    """
+    if has_app_context():
+        return nullcontext()
+    # the app imports the resources enqueuing the jobs of this module
+    from api.app import create_app  # pylint: disable=import-outside-toplevel
+
+    return create_app().app_context()
+
+
+def delete_store_rows(store_id: int, chunk_size: int) -> dict[str, int]:
+    """Delete a store, its items then its tags, one transaction per chunk.
+
+    Each chunk is committed and dropped from the response cache on its own,
+    so no transaction holds locks on the whole store. Links of the deleted
+    rows go with them through ON DELETE CASCADE, like the summary rollups of
+    the hidden store, which are not updated chunk by chunk. Progress is saved
+    in the meta of the current job, if any.
+
+    Args:
+        store_id (int): store id
+        chunk_size (int): rows deleted per transaction
+
+    Returns:
+        dict[str, int]: deleted rows per table
+    """
+    from rq import get_current_job  # pylint: disable=import-outside-toplevel
+
+    job = get_current_job()
+    counts = {"items": 0, "tags": 0}
+    for model in (ItemModel, TagModel):
+        kind = model.__tablename__
+        while ids := db.session.scalars(
+            select(model.id).where(model.store_id == store_id).limit(chunk_size)
+        ).all():
+            db.session.execute(delete(model).where(model.id.in_(ids)))
+            db.session.commit()
+            current_app.cache.invalidate((kind, row_id) for row_id in ids)  # type: ignore
+            counts[kind] += len(ids)
+            if job is not None:
+                job.meta.update(counts)
+                job.save_meta()
+    db.session.execute(delete(StoreModel).where(StoreModel.id == store_id))
+    db.session.commit()
+    current_app.cache.invalidate([("stores", store_id)])  # type: ignore
+    return counts
+
+
+def delete_store_job(store_id: int, chunk_size: int) -> dict[str, int]:
+    """RQ job deleting a hidden store.
+
+    Args:
+        store_id (int): store id
+        chunk_size (int): rows deleted per transaction
+
+    Returns:
+        dict[str, int]: deleted rows per table, kept as the job result
+    """
+    with job_app_context():
+        return delete_store_rows(store_id, chunk_size)
@@ -0,0 +1,46 @@
+""" orjson based Flask JSON provider """
+import orjson
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider encoding with orjson.
+
+    Keys are sorted and output is compact like the default provider.
+    Dates, datetimes and dataclasses are passed through to the default
+    provider's ``default`` so they keep serializing the same way.
+    """
+
+    options = (
+        orjson.OPT_SORT_KEYS
+        | orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+    def dumps_bytes(self, obj, indent: bool = False) -> bytes:
+        """Serialize an object to JSON bytes.
+
+        Args:
+            obj: object to serialize
+            indent (bool, optional): pretty print. Defaults to False.
+
+        Returns:
+            bytes: UTF-8 encoded JSON
+        """
+        options = self.options | orjson.OPT_INDENT_2 if indent else self.options
+        return orjson.dumps(obj, default=self.default, option=options)
+
+    def dumps(self, obj, **kwargs) -> str:
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s: str | bytes, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(
+            self.dumps_bytes(obj, indent=indent) + b"\n", mimetype=self.mimetype
+        )
@@ -0,0 +1,91 @@
+""" Prometheus request metrics """
+import os
+import time
+
+from flask import Flask, Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LABELS = ("method", "endpoint")
+
+REQUESTS = Counter("http_requests_total", "HTTP requests", [*LABELS, "status"])
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling a request",
+    LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of response bodies, streamed responses excluded",
+    LABELS,
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+SQL_STATEMENTS = Histogram(
+    "http_request_sql_statements",
+    "SQL statements executed while handling a request",
+    LABELS,
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+SQL_DURATION = Histogram(
+    "http_request_sql_duration_seconds",
+    "Time spent executing SQL while handling a request",
+    LABELS,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+
+def record_request(response: Response) -> Response:
+    """Record the metrics of a handled request.
+
+    Args:
+        response (Response): response about to be sent
+
+    Returns:
+        Response: the same response
+    """
+    if "request_started" not in g or request.endpoint == "metrics":
+        return response
+    labels = (request.method, request.endpoint or "unmatched")
+    REQUESTS.labels(*labels, response.status_code).inc()
+    LATENCY.labels(*labels).observe(time.perf_counter() - g.request_started)
+    SQL_STATEMENTS.labels(*labels).observe(g.sql_statements)
+    SQL_DURATION.labels(*labels).observe(g.sql_seconds)
+    if not response.is_streamed:
+        RESPONSE_SIZE.labels(*labels).observe(response.calculate_content_length() or 0)
+    return response
+
+
+def metrics() -> Response:
+    """Expose the metrics in Prometheus text format.
+
+    With PROMETHEUS_MULTIPROC_DIR set, the metrics written by every worker
+    process to that directory are aggregated, whichever worker answers.
+
+    Returns:
+        Response: Prometheus exposition
+    """
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app: Flask) -> None:
+    """Instrument an app and register its /metrics route.
+
+    Relies on the request timings set up by ``api.timing.init_timing``.
+
+    Args:
+        app (Flask): the app
+    """
+    app.after_request(record_request)
+    app.add_url_rule("/metrics", "metrics", metrics)
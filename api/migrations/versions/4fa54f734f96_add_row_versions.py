@@ -0,0 +1,31 @@
+"""add row versions to stores, items and tags
+
+Revision ID: 4fa54f734f96
+Revises: 5316f090aad0
+Create Date: 2026-10-17 10:02:31.540918
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4fa54f734f96"
+down_revision = "5316f090aad0"
+branch_labels = None
+depends_on = None
+
+TABLES = ("stores", "items", "tags")
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(
+                sa.Column("version", sa.Integer(), nullable=False, server_default="1")
+            )
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column("version")
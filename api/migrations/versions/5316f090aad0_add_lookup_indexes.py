@@ -0,0 +1,76 @@
+"""add lookup indexes and unique constraints
+
+Revision ID: 5316f090aad0
+Revises: 46231e91ce9a
+Create Date: 2026-10-17 09:12:44.118204
+
+The unique constraints on (tags.store_id, tags.name) and
+(item_tags.item_id, item_tags.tag_id) also serve lookups by their leading
+column, so only items.store_id and item_tags.tag_id get a plain index.
+On Postgres every index is built concurrently and the unique constraints
+are attached to the prebuilt indexes, so writes are never blocked.
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5316f090aad0"
+down_revision = "46231e91ce9a"
+branch_labels = None
+depends_on = None
+
+UNIQUE_CONSTRAINTS = {
+    "uq_tags_store_id_name": ("tags", ["store_id", "name"]),
+    "uq_item_tags_item_id_tag_id": ("item_tags", ["item_id", "tag_id"]),
+}
+
+
+def upgrade():
+    # drop duplicated links so the unique constraint can be created
+    op.execute(
+        sa.text(
+            "DELETE FROM item_tags WHERE id NOT IN "
+            "(SELECT MIN(id) FROM item_tags GROUP BY item_id, tag_id)"
+        )
+    )
+
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_items_store_id",
+                "items",
+                ["store_id"],
+                postgresql_concurrently=True,
+            )
+            op.create_index(
+                "ix_item_tags_tag_id",
+                "item_tags",
+                ["tag_id"],
+                postgresql_concurrently=True,
+            )
+            for name, (table, columns) in UNIQUE_CONSTRAINTS.items():
+                op.create_index(
+                    name, table, columns, unique=True, postgresql_concurrently=True
+                )
+        for name, (table, columns) in UNIQUE_CONSTRAINTS.items():
+            op.execute(
+                sa.text(
+                    f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}"
+                )
+            )
+        return
+
+    op.create_index("ix_items_store_id", "items", ["store_id"])
+    op.create_index("ix_item_tags_tag_id", "item_tags", ["tag_id"])
+    for name, (table, columns) in UNIQUE_CONSTRAINTS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_unique_constraint(name, columns)
+
+
+def downgrade():
+    for name, (table, _) in UNIQUE_CONSTRAINTS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(name, type_="unique")
+    op.drop_index("ix_item_tags_tag_id", table_name="item_tags")
+    op.drop_index("ix_items_store_id", table_name="items")
@@ -0,0 +1,89 @@
+"""add full-text search indexes on items
+
+Revision ID: 8c1f2d3a9b7e
+Revises: 4fa54f734f96
+Create Date: 2026-10-17 15:20:07.412876
+
+SQLite gets an external content FTS5 table filled from the existing items
+and kept in sync by triggers. Postgres gets the pg_trgm extension and GIN
+indexes on the search document and on item name trigrams, built
+concurrently. The statements mirror api.models.search.
+
+Batch migrations recreate the items table on SQLite, which drops its
+triggers: later revisions doing so must create them again.
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8c1f2d3a9b7e"
+down_revision = "4fa54f734f96"
+branch_labels = None
+depends_on = None
+
+SQLITE_TRIGGERS = {
+    "items_fts_insert": (
+        "AFTER INSERT ON items BEGIN "
+        "INSERT INTO items_fts(rowid, name, description) "
+        "VALUES (new.id, new.name, new.description); END"
+    ),
+    "items_fts_delete": (
+        "AFTER DELETE ON items BEGIN "
+        "INSERT INTO items_fts(items_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); END"
+    ),
+    "items_fts_update": (
+        "AFTER UPDATE OF name, description ON items BEGIN "
+        "INSERT INTO items_fts(items_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); "
+        "INSERT INTO items_fts(rowid, name, description) "
+        "VALUES (new.id, new.name, new.description); END"
+    ),
+}
+
+POSTGRES_SEARCH_DOCUMENT = (
+    "to_tsvector('simple'::regconfig, "
+    "coalesce(name, '') || ' ' || coalesce(description, ''))"
+)
+
+POSTGRES_INDEXES = {
+    "ix_items_search_document": f"USING gin ({POSTGRES_SEARCH_DOCUMENT})",
+    "ix_items_name_trgm": "USING gin (name gin_trgm_ops)",
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        with op.get_context().autocommit_block():
+            for name, definition in POSTGRES_INDEXES.items():
+                op.execute(
+                    sa.text(
+                        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                        f"ON items {definition}"
+                    )
+                )
+        return
+
+    op.execute(
+        sa.text(
+            "CREATE VIRTUAL TABLE items_fts USING fts5("
+            "name, description, content='items', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+    )
+    op.execute(sa.text("INSERT INTO items_fts(items_fts) VALUES ('rebuild')"))
+    for name, definition in SQLITE_TRIGGERS.items():
+        op.execute(sa.text(f"CREATE TRIGGER {name} {definition}"))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        for name in POSTGRES_INDEXES:
+            op.execute(sa.text(f"DROP INDEX IF EXISTS {name}"))
+        return
+
+    for name in SQLITE_TRIGGERS:
+        op.execute(sa.text(f"DROP TRIGGER IF EXISTS {name}"))
+    op.execute(sa.text("DROP TABLE IF EXISTS items_fts"))
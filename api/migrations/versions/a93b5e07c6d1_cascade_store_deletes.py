@@ -0,0 +1,126 @@
+"""cascade deletes in the database and add the hidden flag of stores
+
+Revision ID: a93b5e07c6d1
+Revises: d4e7a1c0b352
+Create Date: 2026-10-17 18:05:33.270419
+
+Foreign keys from items and tags to stores, and from item_tags to items
+and tags, get ON DELETE CASCADE so deleting a store never loads its rows.
+On Postgres the new constraints are added NOT VALID then validated, each
+statement committed on its own: writes are only blocked by the short ADD
+and DROP, the validation scans the table under a lock allowing them. On SQLite the
+tables are recreated, so the search triggers of items are created again.
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a93b5e07c6d1"
+down_revision = "d4e7a1c0b352"
+branch_labels = None
+depends_on = None
+
+# name: (table, column, referred table, default Postgres name of the old key)
+FOREIGN_KEYS = {
+    "fk_items_store_id_stores": ("items", "store_id", "stores", "items_store_id_fkey"),
+    "fk_tags_store_id_stores": ("tags", "store_id", "stores", "tags_store_id_fkey"),
+    "fk_item_tags_item_id_items": (
+        "item_tags",
+        "item_id",
+        "items",
+        "item_tags_item_id_fkey",
+    ),
+    "fk_item_tags_tag_id_tags": (
+        "item_tags",
+        "tag_id",
+        "tags",
+        "item_tags_tag_id_fkey",
+    ),
+}
+
+# names given by batch mode to the unnamed keys reflected from SQLite
+NAMING_CONVENTION = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"
+}
+
+SQLITE_SEARCH_TRIGGERS = {
+    "items_fts_insert": (
+        "AFTER INSERT ON items BEGIN "
+        "INSERT INTO items_fts(rowid, name, description) "
+        "VALUES (new.id, new.name, new.description); END"
+    ),
+    "items_fts_delete": (
+        "AFTER DELETE ON items BEGIN "
+        "INSERT INTO items_fts(items_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); END"
+    ),
+    "items_fts_update": (
+        "AFTER UPDATE OF name, description ON items BEGIN "
+        "INSERT INTO items_fts(items_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); "
+        "INSERT INTO items_fts(rowid, name, description) "
+        "VALUES (new.id, new.name, new.description); END"
+    ),
+}
+
+
+def _sqlite_replace_foreign_keys(ondelete: str | None) -> None:
+    tables = dict.fromkeys(table for table, _, _, _ in FOREIGN_KEYS.values())
+    for table in tables:
+        with op.batch_alter_table(
+            table, naming_convention=NAMING_CONVENTION, recreate="always"
+        ) as batch_op:
+            for name, (fk_table, column, referred, _) in FOREIGN_KEYS.items():
+                if fk_table != table:
+                    continue
+                batch_op.drop_constraint(name, type_="foreignkey")
+                batch_op.create_foreign_key(
+                    name, referred, [column], ["id"], ondelete=ondelete
+                )
+    for name, definition in SQLITE_SEARCH_TRIGGERS.items():
+        op.execute(sa.text(f"CREATE TRIGGER IF NOT EXISTS {name} {definition}"))
+
+
+def upgrade():
+    with op.batch_alter_table("stores", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("hidden", sa.Boolean(), nullable=False, server_default=sa.false())
+        )
+
+    if op.get_bind().dialect.name != "postgresql":
+        _sqlite_replace_foreign_keys("CASCADE")
+        return
+
+    # outside the migration transaction, the lock of each ALTER is released
+    # when it commits instead of being held through the validations
+    with op.get_context().autocommit_block():
+        for name, (table, column, referred, old_name) in FOREIGN_KEYS.items():
+            op.execute(
+                sa.text(
+                    f"ALTER TABLE {table} ADD CONSTRAINT {name} "
+                    f"FOREIGN KEY ({column}) REFERENCES {referred} (id) "
+                    "ON DELETE CASCADE NOT VALID"
+                )
+            )
+            op.execute(sa.text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}"))
+            op.execute(
+                sa.text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {old_name}")
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        _sqlite_replace_foreign_keys(None)
+    else:
+        for name, (table, column, referred, old_name) in FOREIGN_KEYS.items():
+            op.execute(
+                sa.text(
+                    f"ALTER TABLE {table} ADD CONSTRAINT {old_name} "
+                    f"FOREIGN KEY ({column}) REFERENCES {referred} (id)"
+                )
+            )
+            op.execute(sa.text(f"ALTER TABLE {table} DROP CONSTRAINT {name}"))
+
+    with op.batch_alter_table("stores", schema=None) as batch_op:
+        batch_op.drop_column("hidden")
@@ -0,0 +1,79 @@
+"""add store summary rollups
+
+Revision ID: b5f0c2d8e614
+Revises: a93b5e07c6d1
+Create Date: 2026-10-17 20:41:52.118304
+
+The rollup tables are filled from the current rows, they are only kept up
+to date by apps running with STORE_SUMMARY_ROLLUP.
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b5f0c2d8e614"
+down_revision = "a93b5e07c6d1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "store_summaries",
+        sa.Column("store_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("item_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("tag_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("price_total", sa.Float(), server_default="0", nullable=False),
+        sa.Column("min_price", sa.Float(), nullable=True),
+        sa.Column("max_price", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["store_id"],
+            ["stores.id"],
+            name="fk_store_summaries_store_id_stores",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("store_id"),
+    )
+    op.create_table(
+        "tag_usage",
+        sa.Column("tag_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("store_id", sa.Integer(), nullable=False),
+        sa.Column("item_count", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(
+            ["tag_id"], ["tags.id"], name="fk_tag_usage_tag_id_tags", ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("tag_id"),
+    )
+    with op.batch_alter_table("tag_usage", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_tag_usage_store_id_item_count", ["store_id", "item_count"], unique=False
+        )
+
+    op.execute(
+        sa.text(
+            "INSERT INTO store_summaries "
+            "(store_id, item_count, tag_count, price_total, min_price, max_price) "
+            "SELECT stores.id, count(items.id), "
+            "(SELECT count(tags.id) FROM tags WHERE tags.store_id = stores.id), "
+            "coalesce(sum(items.price), 0), min(items.price), max(items.price) "
+            "FROM stores LEFT OUTER JOIN items ON items.store_id = stores.id "
+            "GROUP BY stores.id"
+        )
+    )
+    op.execute(
+        sa.text(
+            "INSERT INTO tag_usage (tag_id, store_id, item_count) "
+            "SELECT tags.id, tags.store_id, count(item_tags.id) "
+            "FROM tags JOIN item_tags ON item_tags.tag_id = tags.id "
+            "GROUP BY tags.id, tags.store_id"
+        )
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("tag_usage", schema=None) as batch_op:
+        batch_op.drop_index("ix_tag_usage_store_id_item_count")
+
+    op.drop_table("tag_usage")
+    op.drop_table("store_summaries")
@@ -0,0 +1,51 @@
+"""add composite indexes for item filters and sort keys
+
+Revision ID: d4e7a1c0b352
+Revises: 8c1f2d3a9b7e
+Create Date: 2026-10-17 16:41:52.903314
+
+Each sort key of the item listing gets an index ending with the id, alone
+and behind store_id, so keyset pages filtered by store walk an index in
+order. The (tag_id, item_id) index replaces the tag_id one, tag filters
+then join through item_tags without reading the table. On Postgres every
+index is built concurrently.
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d4e7a1c0b352"
+down_revision = "8c1f2d3a9b7e"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_items_store_id_price_id": ("items", ["store_id", "price", "id"]),
+    "ix_items_store_id_name_id": ("items", ["store_id", "name", "id"]),
+    "ix_items_price_id": ("items", ["price", "id"]),
+    "ix_items_name_id": ("items", ["name", "id"]),
+    "ix_item_tags_tag_id_item_id": ("item_tags", ["tag_id", "item_id"]),
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, (table, columns) in INDEXES.items():
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+            op.drop_index(
+                "ix_item_tags_tag_id",
+                table_name="item_tags",
+                postgresql_concurrently=True,
+            )
+        return
+
+    for name, (table, columns) in INDEXES.items():
+        op.create_index(name, table, columns)
+    op.drop_index("ix_item_tags_tag_id", table_name="item_tags")
+
+
+def downgrade():
+    op.create_index("ix_item_tags_tag_id", "item_tags", ["tag_id"])
+    for name, (table, _) in INDEXES.items():
+        op.drop_index(name, table_name=table)
@@ -1,6 +1,14 @@
 """model exports."""
 from api.models.item import ItemModel
 from api.models.item_tags import ItemTags
+from api.models.search import include_object
 from api.models.store import StoreModel
+from api.models.summary import (
+    StoreSummaryModel,
+    SummaryDeltas,
+    TagUsageModel,
+    rollup_enabled,
+)
 from api.models.tag import TagModel
 from api.models.user import UserModel
+from api.models.versioning import bump_versions
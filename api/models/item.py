@@ -7,17 +7,32 @@ class ItemModel(db.Model):  # type: ignore
     """Item model class."""
 
     __tablename__ = "items"
+    # listing filters and sort keys, ids last to break ties in keyset pages
+    __table_args__ = (
+        db.Index("ix_items_store_id_price_id", "store_id", "price", "id"),
+        db.Index("ix_items_store_id_name_id", "store_id", "name", "id"),
+        db.Index("ix_items_price_id", "price", "id"),
+        db.Index("ix_items_name_id", "name", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), unique=False, nullable=False)
     price = db.Column(db.Float(precision=2), unique=False, nullable=False)
-    description = db.Column(db.String)
+    # unbounded and not in the item schemas, loaded only when accessed
+    description = db.deferred(db.Column(db.String))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
 
     store_id = db.Column(
-        db.Integer, db.ForeignKey("stores.id"), unique=False, nullable=False
+        db.Integer,
+        db.ForeignKey("stores.id", name="fk_items_store_id_stores", ondelete="CASCADE"),
+        unique=False,
+        nullable=False,
+        index=True,
     )
     store = db.relationship("StoreModel", back_populates="items")
-    tags = db.relationship("TagModel", secondary="item_tags", back_populates="items")
+    tags = db.relationship(
+        "TagModel", secondary="item_tags", back_populates="items", passive_deletes=True
+    )
 
     def to_dict(self) -> Item:
         """Converts item to dictionary.
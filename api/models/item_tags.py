@@ -7,10 +7,25 @@ class ItemTags(db.Model):  # type: ignore
     """Item tags model class."""
 
     __tablename__ = "item_tags"
+    __table_args__ = (
+        db.UniqueConstraint("item_id", "tag_id", name="uq_item_tags_item_id_tag_id"),
+        # items of a tag without reading the links table
+        db.Index("ix_item_tags_tag_id_item_id", "tag_id", "item_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    item_id = db.Column(db.Integer, db.ForeignKey("items.id"), nullable=False)
-    tag_id = db.Column(db.Integer, db.ForeignKey("tags.id"), nullable=False)
+    item_id = db.Column(
+        db.Integer,
+        db.ForeignKey(
+            "items.id", name="fk_item_tags_item_id_items", ondelete="CASCADE"
+        ),
+        nullable=False,
+    )
+    tag_id = db.Column(
+        db.Integer,
+        db.ForeignKey("tags.id", name="fk_item_tags_tag_id_tags", ondelete="CASCADE"),
+        nullable=False,
+    )
 
     def to_dict(self) -> ItemTag:
         """Converts item tag to dictionary.
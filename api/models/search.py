@@ -0,0 +1,81 @@
+"""Full-text search indexes on items, kept in sync by the database.
+
+SQLite gets an external content FTS5 table maintained by triggers, Postgres
+gets GIN indexes on a tsvector expression and on item name trigrams. The
+statements are frozen into the add_item_search migration, keep both in step.
+"""
+from sqlalchemy import DDL, event
+
+from api.models.item import ItemModel
+
+SQLITE_FTS_TABLE = "items_fts"
+
+SQLITE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5("
+    "name, description, content='items', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN "
+    "INSERT INTO items_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN "
+    "INSERT INTO items_fts(items_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_update "
+    "AFTER UPDATE OF name, description ON items BEGIN "
+    "INSERT INTO items_fts(items_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO items_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+)
+
+# the query must repeat this expression verbatim to use the index
+POSTGRES_SEARCH_DOCUMENT = (
+    "to_tsvector('simple'::regconfig, "
+    "coalesce(name, '') || ' ' || coalesce(description, ''))"
+)
+
+POSTGRES_SEARCH_INDEXES = ("ix_items_search_document", "ix_items_name_trgm")
+
+POSTGRES_SEARCH_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_items_search_document ON items "
+    f"USING gin ({POSTGRES_SEARCH_DOCUMENT})",
+    "CREATE INDEX IF NOT EXISTS ix_items_name_trgm ON items "
+    "USING gin (name gin_trgm_ops)",
+)
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(
+        ItemModel.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite")
+    )
+event.listen(
+    ItemModel.__table__,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}").execute_if(dialect="sqlite"),
+)
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(
+        ItemModel.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="postgresql"),
+    )
+
+
+def include_object(obj, name: str, type_: str, reflected: bool, compare_to) -> bool:
+    """Hide the search tables and indexes from migration autogenerate.
+
+    Args:
+        obj: schema item
+        name (str): name of the schema item
+        type_ (str): kind of schema item
+        reflected (bool): whether the item was reflected from the database
+        compare_to: metadata item it is compared to
+
+    Returns:
+        bool: whether autogenerate should consider the item
+    """
+    if type_ == "table":
+        return not name.startswith(SQLITE_FTS_TABLE)
+    if type_ == "index":
+        return name not in POSTGRES_SEARCH_INDEXES
+    return True
@@ -10,12 +10,18 @@ class StoreModel(db.Model):  # type: ignore
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), unique=True, nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    # set while an asynchronous deletion of the store is running
+    hidden = db.Column(
+        db.Boolean, nullable=False, default=False, server_default=db.false()
+    )
 
+    # rows of the store are removed by ON DELETE CASCADE, never loaded to delete
     items = db.relationship(
-        "ItemModel", back_populates="store", lazy="dynamic", cascade="all, delete"
+        "ItemModel", back_populates="store", cascade="all, delete", passive_deletes=True
     )
     tags = db.relationship(
-        "TagModel", back_populates="store", lazy="dynamic", cascade="all, delete"
+        "TagModel", back_populates="store", cascade="all, delete", passive_deletes=True
     )
 
     def to_dict(self) -> Store:
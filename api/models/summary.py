@@ -0,0 +1,274 @@
+"""Store summary rollups, maintained incrementally by the write paths."""
+from collections import Counter, defaultdict
+from collections.abc import Collection
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, inspect, literal, select, update
+from sqlalchemy.orm import Session
+
+from api.bulk import UPSERT_INSERTS
+from api.db import db
+from api.models.item import ItemModel
+from api.models.item_tags import ItemTags
+from api.models.store import StoreModel
+from api.models.tag import TagModel
+
+
+class StoreSummaryModel(db.Model):  # type: ignore
+    """Item and tag counts and price statistics of a store."""
+
+    __tablename__ = "store_summaries"
+
+    store_id = db.Column(
+        db.Integer,
+        db.ForeignKey(
+            "stores.id", name="fk_store_summaries_store_id_stores", ondelete="CASCADE"
+        ),
+        primary_key=True,
+        autoincrement=False,
+    )
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    tag_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    price_total = db.Column(db.Float, nullable=False, default=0, server_default="0")
+    min_price = db.Column(db.Float)
+    max_price = db.Column(db.Float)
+
+
+class TagUsageModel(db.Model):  # type: ignore
+    """Number of items linked to a tag."""
+
+    __tablename__ = "tag_usage"
+    # most used tags of a store, read in index order
+    __table_args__ = (
+        db.Index("ix_tag_usage_store_id_item_count", "store_id", "item_count"),
+    )
+
+    tag_id = db.Column(
+        db.Integer,
+        db.ForeignKey("tags.id", name="fk_tag_usage_tag_id_tags", ondelete="CASCADE"),
+        primary_key=True,
+        autoincrement=False,
+    )
+    store_id = db.Column(db.Integer, nullable=False)
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+
+def rollup_enabled() -> bool:
+    """Tell whether the app maintains and reads the summary rollups.
+
+    Returns:
+        bool: True if STORE_SUMMARY_ROLLUP is set
+    """
+    return has_app_context() and current_app.config.get("STORE_SUMMARY_ROLLUP", False)
+
+
+class SummaryDeltas:
+    """Changes to the store summaries and tag usage made by a write."""
+
+    def __init__(self) -> None:
+        # store id: [items, tags, price total]
+        self.stores: defaultdict[int, list] = defaultdict(lambda: [0, 0, 0.0])
+        self.repriced: set[int] = set()
+        self.links: Counter[int] = Counter()
+
+    def item(self, store_id: int, price: float, sign: int = 1) -> None:
+        """Count an item added to (or removed from, with sign -1) a store.
+
+        Args:
+            store_id (int): store id
+            price (float): item price
+            sign (int, optional): 1 for an addition, -1 for a removal.
+                Defaults to 1.
+        """
+        deltas = self.stores[store_id]
+        deltas[0] += sign
+        deltas[2] += sign * price
+        self.repriced.add(store_id)
+
+    def tag(self, store_id: int, sign: int = 1) -> None:
+        """Count a tag added to (or removed from, with sign -1) a store.
+
+        Args:
+            store_id (int): store id
+            sign (int, optional): 1 for an addition, -1 for a removal.
+                Defaults to 1.
+        """
+        self.stores[store_id][1] += sign
+
+    def link(self, tag_id: int, count: int = 1) -> None:
+        """Count links added to (or removed from, if negative) a tag.
+
+        Args:
+            tag_id (int): tag id
+            count (int, optional): number of links. Defaults to 1.
+        """
+        self.links[tag_id] += count
+
+    def apply(self, session: Session, deleted_stores: Collection[int] = ()) -> None:
+        """Add the changes to the rollup rows, creating missing ones.
+
+        Counts and price totals are incremented with one upsert. Minimum
+        and maximum prices of the stores whose items changed are read back
+        from the (store_id, price) index, a removed item may have held them.
+
+        Args:
+            session (Session): session of the write, nothing is committed
+            deleted_stores (Collection[int], optional): stores deleted by the
+                write, their rollups go with them. Defaults to ().
+        """
+        insert = UPSERT_INSERTS[session.get_bind().dialect.name]
+        summaries = StoreSummaryModel.__table__
+        rows = [
+            {
+                "store_id": store_id,
+                "item_count": items,
+                "tag_count": tags,
+                "price_total": total,
+            }
+            for store_id, (items, tags, total) in self.stores.items()
+            if store_id not in deleted_stores and (items or tags or total)
+        ]
+        if rows:
+            statement = insert(summaries).values(rows)
+            session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[summaries.c.store_id],
+                    set_={
+                        column: summaries.c[column] + statement.excluded[column]
+                        for column in ("item_count", "tag_count", "price_total")
+                    },
+                )
+            )
+        repriced = self.repriced - set(deleted_stores)
+        if repriced:
+            items = ItemModel.__table__
+            of_store = items.c.store_id == summaries.c.store_id
+            session.execute(
+                update(summaries)
+                .where(summaries.c.store_id.in_(repriced))
+                .values(
+                    min_price=select(func.min(items.c.price))
+                    .where(of_store)
+                    .scalar_subquery(),
+                    max_price=select(func.max(items.c.price))
+                    .where(of_store)
+                    .scalar_subquery(),
+                )
+            )
+        usage, tags = TagUsageModel.__table__, TagModel.__table__
+        by_count = defaultdict(list)
+        for tag_id, count in self.links.items():
+            if count:
+                by_count[count].append(tag_id)
+        for count, tag_ids in by_count.items():
+            statement = insert(usage).from_select(
+                ["tag_id", "store_id", "item_count"],
+                select(tags.c.id, tags.c.store_id, literal(count)).where(
+                    tags.c.id.in_(tag_ids)
+                ),
+            )
+            session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[usage.c.tag_id],
+                    set_={
+                        "item_count": usage.c.item_count + statement.excluded.item_count
+                    },
+                )
+            )
+
+
+def _committed(obj, attribute: str):
+    """Return the value of an attribute before the flush."""
+    history = inspect(obj).attrs[attribute].history
+    return history.deleted[0] if history.deleted else getattr(obj, attribute)
+
+
+def _link_pairs(obj, attribute: str, changes: str) -> list[tuple]:
+    """Return (item, tag) pairs added to or deleted from a link collection."""
+    others = getattr(inspect(obj).attrs[attribute].history, changes)
+    if isinstance(obj, ItemModel):
+        return [(obj, other) for other in others]
+    return [(other, obj) for other in others]
+
+
+@event.listens_for(db.session, "before_flush")
+def count_deleted_links(session: Session, flush_context, instances) -> None:
+    """Count the links of deleted items while they still exist.
+
+    Links go with their item through ON DELETE CASCADE, so the tags losing
+    an item are read before the flush.
+
+    Args:
+        session (Session): flushing session
+        flush_context: flush context
+        instances: objects passed to flush
+    """
+    if not rollup_enabled():
+        return
+    item_ids = [obj.id for obj in session.deleted if isinstance(obj, ItemModel)]
+    if not item_ids:
+        return
+    deltas = session.info.setdefault("summary_deltas", SummaryDeltas())
+    with session.no_autoflush:
+        for tag_id, count in session.execute(
+            select(ItemTags.tag_id, func.count())
+            .where(ItemTags.item_id.in_(item_ids))
+            .group_by(ItemTags.tag_id)
+        ):
+            deltas.link(tag_id, -count)
+
+
+@event.listens_for(db.session, "after_flush")
+def update_summaries(session: Session, flush_context) -> None:
+    """Apply the changes of a flush to the store summaries and tag usage.
+
+    Ids of new rows are known once flushed, and the session still holds the
+    pre-flush state and attribute history.
+
+    Args:
+        session (Session): flushed session
+        flush_context: flush context
+    """
+    if not rollup_enabled():
+        return
+    deltas = session.info.pop("summary_deltas", None) or SummaryDeltas()
+    deleted = set(session.deleted)
+    deleted_stores = {obj.id for obj in deleted if isinstance(obj, StoreModel)}
+    added_links, deleted_links = set(), set()
+    for obj in session.new:
+        if isinstance(obj, ItemModel):
+            deltas.item(obj.store_id, obj.price)
+        elif isinstance(obj, TagModel):
+            deltas.tag(obj.store_id)
+        elif isinstance(obj, ItemTags):
+            added_links.add((obj.item_id, obj.tag_id))
+    for obj in deleted:
+        if isinstance(obj, ItemModel):
+            deltas.item(_committed(obj, "store_id"), _committed(obj, "price"), -1)
+        elif isinstance(obj, TagModel):
+            deltas.tag(_committed(obj, "store_id"), -1)
+        elif isinstance(obj, ItemTags):
+            deleted_links.add((obj.item_id, obj.tag_id))
+    for obj in session.dirty:
+        state = inspect(obj)
+        if isinstance(obj, ItemModel) and (
+            state.attrs.price.history.has_changes()
+            or state.attrs.store_id.history.has_changes()
+        ):
+            deltas.item(_committed(obj, "store_id"), _committed(obj, "price"), -1)
+            deltas.item(obj.store_id, obj.price)
+    for obj in [*session.new, *session.dirty]:
+        attribute = {ItemModel: "tags", TagModel: "items"}.get(type(obj))
+        if attribute is None:
+            continue
+        for changes, links in (("added", added_links), ("deleted", deleted_links)):
+            links.update(
+                (item.id, tag.id)
+                for item, tag in _link_pairs(obj, attribute, changes)
+                if item not in deleted and tag not in deleted
+            )
+    for _, tag_id in added_links:
+        deltas.link(tag_id)
+    for _, tag_id in deleted_links:
+        deltas.link(tag_id, -1)
+    deltas.apply(session, deleted_stores)
@@ -8,12 +8,22 @@ class TagModel(db.Model):  # type: ignore
     """Tag model class."""
 
     __tablename__ = "tags"
+    __table_args__ = (
+        db.UniqueConstraint("store_id", "name", name="uq_tags_store_id_name"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80))
-    store_id = db.Column(db.Integer, db.ForeignKey("stores.id"), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    store_id = db.Column(
+        db.Integer,
+        db.ForeignKey("stores.id", name="fk_tags_store_id_stores", ondelete="CASCADE"),
+        nullable=False,
+    )
     store = db.relationship("StoreModel", back_populates="tags")
-    items = db.relationship("ItemModel", secondary="item_tags", back_populates="tags")
+    items = db.relationship(
+        "ItemModel", secondary="item_tags", back_populates="tags", passive_deletes=True
+    )
 
     def to_dict(self) -> Tag:
         """Converts tag to dictionary.
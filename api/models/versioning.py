@@ -0,0 +1,155 @@
+"""Row version bookkeeping for conditional requests and cache invalidation."""
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session
+
+from api.db import db
+from api.models.item import ItemModel
+from api.models.item_tags import ItemTags
+from api.models.store import StoreModel
+from api.models.tag import TagModel
+
+VERSIONED_MODELS = (ItemModel, StoreModel, TagModel)
+
+# columns of each model dumped by the plain schemas nested in other payloads
+EMBEDDED_COLUMNS = {
+    ItemModel: ("name", "price"),
+    StoreModel: ("name",),
+    TagModel: ("name",),
+}
+
+
+def _changed_links(obj, attribute: str) -> list:
+    """Return the objects added to or removed from a collection.
+
+    The history of a collection that was never loaded is empty, reading it
+    does not load the collection.
+    """
+    history = inspect(obj).attrs[attribute].history
+    return [*history.added, *history.deleted]
+
+
+def _embedded_change(session: Session, obj) -> bool:
+    """Tell whether a stored row changed in the payloads embedding it."""
+    if obj in session.new:
+        return False
+    if obj in session.deleted:
+        # items and tags of a deleted store go with it
+        return not isinstance(obj, StoreModel)
+    state = inspect(obj)
+    return any(
+        state.attrs[column].history.has_changes()
+        for column in EMBEDDED_COLUMNS[type(obj)]
+    )
+
+
+def _affected(session: Session, obj) -> list:
+    """Return the loaded rows whose serialized payload embeds a changed row.
+
+    Items and tags are embedded in their parent store, and linked or
+    unlinked rows in each other. The ``items`` and ``tags`` collections
+    are never walked, rows embedding a renamed one are bumped by
+    ``_bump_embedding`` instead.
+    """
+    if isinstance(obj, ItemModel):
+        store = obj.store or session.get(StoreModel, obj.store_id)
+        return [store, *_changed_links(obj, "tags")]
+    if isinstance(obj, TagModel):
+        store = obj.store or session.get(StoreModel, obj.store_id)
+        return [store, *_changed_links(obj, "items")]
+    if isinstance(obj, ItemTags):
+        return [
+            session.get(ItemModel, obj.item_id),
+            session.get(TagModel, obj.tag_id),
+        ]
+    return []
+
+
+def _embedding(obj) -> list[tuple]:
+    """Return the (model, condition) pairs of rows embedding a stored row."""
+    if isinstance(obj, ItemModel):
+        linked = select(ItemTags.tag_id).where(ItemTags.item_id == obj.id)
+        return [(TagModel, TagModel.id.in_(linked))]
+    if isinstance(obj, TagModel):
+        linked = select(ItemTags.item_id).where(ItemTags.tag_id == obj.id)
+        return [(ItemModel, ItemModel.id.in_(linked))]
+    if isinstance(obj, StoreModel):
+        return [
+            (ItemModel, ItemModel.store_id == obj.id),
+            (TagModel, TagModel.store_id == obj.id),
+        ]
+    return []
+
+
+def _bump_embedding(session: Session, obj) -> set[tuple[str, int]]:
+    """Bump the rows embedding a stored row, one UPDATE per table.
+
+    Rows of the identity map are not synchronized, they expire on commit.
+
+    Args:
+        session (Session): flushing session
+        obj: changed item, store or tag
+
+    Returns:
+        set[tuple[str, int]]: (table name, id) keys of the bumped rows
+    """
+    keys = set()
+    for model, condition in _embedding(obj):
+        ids = session.scalars(
+            update(model)
+            .where(condition)
+            .values(version=model.version + 1)
+            .returning(model.id),
+            execution_options={"synchronize_session": False},
+        )
+        keys.update((model.__tablename__, row_id) for row_id in ids)
+    return keys
+
+
+@event.listens_for(db.session, "before_flush")
+def bump_versions(session: Session, flush_context, instances) -> None:
+    """Bump the version of changed rows and of the rows embedding them.
+
+    Every changed or embedding row is also remembered in
+    ``session.info["touched"]``, or its key in ``session.info["touched_keys"]``
+    when bumped by a set-based UPDATE, so cached payloads can be invalidated.
+
+    Args:
+        session (Session): flushing session
+        flush_context: flush context
+        instances: objects passed to flush
+    """
+    changed = [
+        *session.new,
+        *session.deleted,
+        *(obj for obj in session.dirty if session.is_modified(obj)),
+    ]
+    touched = session.info.setdefault("touched", set())
+    touched_keys = session.info.setdefault("touched_keys", set())
+    bumped = set()
+    for obj in changed:
+        if isinstance(obj, VERSIONED_MODELS) and _embedded_change(session, obj):
+            touched_keys.update(_bump_embedding(session, obj))
+        for target in [obj, *_affected(session, obj)]:
+            if target is None or not isinstance(target, VERSIONED_MODELS):
+                continue
+            touched.add(target)
+            if target in session.new or target in session.deleted or target in bumped:
+                continue
+            bumped.add(target)
+            # incremented by the database, concurrent writers never lose a bump
+            target.version = type(target).version + 1
+
+
+@event.listens_for(db.session, "after_flush_postexec")
+def collect_touched_keys(session: Session, flush_context) -> None:
+    """Turn the touched rows into (table name, id) keys once ids are known.
+
+    Args:
+        session (Session): flushed session
+        flush_context: flush context
+    """
+    keys = session.info.setdefault("touched_keys", set())
+    for obj in session.info.pop("touched", ()):
+        identity = inspect(obj).identity
+        if identity is not None:
+            keys.add((obj.__tablename__, identity[0]))
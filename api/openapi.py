@@ -0,0 +1,48 @@
+""" API registration serving an optional precomputed OpenAPI document """
+from pathlib import Path
+
+import flask_smorest
+from flask import current_app
+
+
+class Api(flask_smorest.Api):
+    """Api serving the OpenAPI document from OPENAPI_SPEC_FILE, if set.
+
+    Building the document from the schemas of every view is most of the
+    time spent creating the app. With a precomputed file, blueprints are
+    registered in the app only and ``/openapi.json`` returns the file,
+    written beforehand with ``flask openapi write`` from an app without
+    OPENAPI_SPEC_FILE.
+    """
+
+    def init_app(self, app, *, spec_kwargs=None):
+        """Initialize Api with application, reading the precomputed document.
+
+        Args:
+            app (Flask): Flask application
+            spec_kwargs (dict, optional): kwargs of the APISpec instance.
+                Defaults to None.
+        """
+        path = app.config.get("OPENAPI_SPEC_FILE")
+        self.spec_document = Path(path).read_bytes() if path else None
+        super().init_app(app, spec_kwargs=spec_kwargs)
+
+    def register_blueprint(self, blp, *, parameters=None, **options):
+        """Register a blueprint, documenting it unless the document is precomputed.
+
+        Args:
+            blp (Blueprint): blueprint to register
+            parameters (list, optional): path parameters of the url prefix.
+                Defaults to None.
+        """
+        if self.spec_document is None:
+            super().register_blueprint(blp, parameters=parameters, **options)
+        else:
+            self._app.register_blueprint(blp, **options)
+
+    def _openapi_json(self):
+        if self.spec_document is None:
+            return super()._openapi_json()
+        return current_app.response_class(
+            self.spec_document, mimetype="application/json"
+        )
@@ -0,0 +1,184 @@
+""" keyset (cursor) pagination helpers """
+import base64
+import binascii
+import json
+
+from flask import current_app
+from flask_smorest import abort
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+from api.schemas import CursorPaginationMetadataSchema
+
+PAGINATION_HEADER = "X-Pagination"
+
+# response header documentation for blp.response(..., headers=...)
+PAGINATION_HEADER_DOC = {
+    PAGINATION_HEADER: {
+        "description": "Page size and opaque cursor of the next page",
+        "schema": CursorPaginationMetadataSchema,
+    }
+}
+
+
+def encode_cursor(values: dict) -> str:
+    """Encode keyset values into an opaque cursor.
+
+    Args:
+        values (dict): values of the last row of a page
+
+    Returns:
+        str: url safe cursor
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode an opaque cursor, aborting with 400 if it is malformed.
+
+    Args:
+        cursor (str): cursor returned by a previous page
+
+    Returns:
+        dict: keyset values
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        abort(400, message="Invalid pagination cursor.")
+    if not isinstance(values, dict):
+        abort(400, message="Invalid pagination cursor.")
+    return values
+
+
+def page_size(requested: int | None) -> int:
+    """Resolve the page size, capped by PAGINATION_MAX_PAGE_SIZE.
+
+    Args:
+        requested (int | None): page size requested by the client
+
+    Returns:
+        int: page size to use
+    """
+    if requested is None:
+        requested = current_app.config["PAGINATION_DEFAULT_PAGE_SIZE"]
+    return min(requested, current_app.config["PAGINATION_MAX_PAGE_SIZE"])
+
+
+def paginate(
+    query: Query, column, args: dict, sort=None, descending: bool = False
+) -> tuple[list, dict]:
+    """Apply keyset pagination on an integer primary key column.
+
+    See page_query, the rows are fetched and passed to page_rows.
+
+    Args:
+        query (Query): query to paginate
+        column: primary key column to order by
+        args (dict): parsed CursorPaginationArgsSchema arguments
+        sort (optional): non null column to order by first. Defaults to None.
+        descending (bool, optional): whether to walk backwards. Defaults to False.
+
+    Returns:
+        tuple[list, dict]: rows of the page and the pagination header
+    """
+    query, limit = page_query(query, column, args, sort, descending)
+    return page_rows(query.all(), limit, sort)
+
+
+def page_query(query, column, args: dict, sort=None, descending: bool = False):
+    """Restrict a query to a page, without running it.
+
+    Rows are ordered by ``column`` and the page starts right after the id
+    carried by the ``after`` cursor, so the database walks the primary key
+    index instead of counting skipped rows like OFFSET would. With a
+    ``sort`` column rows are ordered by (sort, column) and the cursor also
+    carries the name and the sort value of the last row, to walk a
+    composite index. A cursor of another sort, or whose value the sort
+    column cannot be compared to, is rejected with 400.
+
+    Args:
+        query: Query or Select to paginate
+        column: primary key column to order by
+        args (dict): parsed CursorPaginationArgsSchema arguments
+        sort (optional): non null column to order by first. Defaults to None.
+        descending (bool, optional): whether to walk backwards. Defaults to False.
+
+    Returns:
+        tuple: the query of the page, one row longer than the page size to
+        tell whether there is a next page, and the page size
+    """
+    limit = page_size(args.get("limit"))
+    keys = [column] if sort is None else [sort, column]
+    if args.get("after"):
+        cursor = decode_cursor(args["after"])
+        values = [cursor.get("key"), cursor.get("id")][-len(keys) :]
+        if (
+            not isinstance(values[-1], int)
+            or None in values
+            or cursor.get("sort") != (None if sort is None else sort.key)
+            or (sort is not None and not comparable(values[0], sort))
+        ):
+            abort(400, message="Invalid pagination cursor.")
+        position, last = keys[0], values[0]
+        if sort is not None:
+            position, last = tuple_(*keys), tuple_(*values)
+        query = query.filter(position < last if descending else position > last)
+    order = [key.desc() for key in keys] if descending else keys
+    return query.order_by(*order).limit(limit + 1), limit
+
+
+def comparable(value, column) -> bool:
+    """Tell whether a cursor value can be compared to a column.
+
+    Args:
+        value: value decoded from a cursor
+        column: sort column
+
+    Returns:
+        bool: True if the value has the Python type of the column
+    """
+    try:
+        expected = column.type.python_type
+    except NotImplementedError:
+        return True
+    if expected is float:
+        expected = (int, float)
+    return isinstance(value, expected) and not isinstance(value, bool)
+
+
+def page_rows(rows: list, limit: int, sort=None) -> tuple[list, dict]:
+    """Cut the rows of a page query to the page, building the next cursor.
+
+    Args:
+        rows (list): rows of the query returned by page_query
+        limit (int): page size
+        sort (optional): sort column given to page_query. Defaults to None.
+
+    Returns:
+        tuple[list, dict]: rows of the page and the pagination header
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        values = {"id": rows[-1].id}
+        if sort is not None:
+            values["sort"] = sort.key
+            values["key"] = getattr(rows[-1], sort.key)
+        next_cursor = encode_cursor(values)
+    return rows, pagination_header(limit, next_cursor)
+
+
+def pagination_header(limit: int, next_cursor: str | None) -> dict:
+    """Build the pagination response header.
+
+    Args:
+        limit (int): page size used
+        next_cursor (str | None): cursor of the next page, if any
+
+    Returns:
+        dict: response headers
+    """
+    return {PAGINATION_HEADER: json.dumps({"limit": limit, "next": next_cursor})}
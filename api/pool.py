@@ -0,0 +1,221 @@
+""" database engine options and connection pool metrics """
+import json
+import os
+import threading
+import time
+
+from flask import Flask
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+from api.db import db
+
+
+class PoolMetrics:
+    """Thread safe checkout counters of a connection pool."""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        """Record a checkout.
+
+        Args:
+            waited (float): seconds spent waiting for a connection
+            timed_out (bool, optional): no connection was available in time.
+                Defaults to False.
+        """
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def as_dict(self) -> dict:
+        """Return the counters.
+
+        Returns:
+            dict: counters
+        """
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool recording how long checkouts wait for a connection.
+
+    The wait includes opening a new connection when the pool grows, which
+    is the latency a request pays either way.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+        self._checkout = threading.local()
+
+    def _do_get(self):
+        # QueuePool._do_get retries by calling itself, only time the outer call
+        if getattr(self._checkout, "active", False):
+            return super()._do_get()
+        self._checkout.active = True
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self._checkout.active = False
+            self.metrics.record(time.perf_counter() - started, timed_out)
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def build_engine_options(db_url: str, overrides: dict | None = None) -> dict:
+    """Build SQLALCHEMY_ENGINE_OPTIONS for a database URL.
+
+    Pool settings come from the environment and only apply to server
+    databases; SQLite keeps the pools chosen by Flask-SQLAlchemy. On
+    Postgres, a statement timeout and libpq connect arguments
+    (DATABASE_CONNECT_ARGS, a JSON object) are passed to psycopg2.
+
+    Args:
+        db_url (str): database URL
+        overrides (dict | None, optional): options taking precedence over the
+            environment. Defaults to None.
+
+    Returns:
+        dict: engine options
+    """
+    url = make_url(db_url)
+    options: dict = {}
+    if url.get_backend_name() != "sqlite":
+        options = {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": int(os.getenv("DATABASE_POOL_SIZE", "5")),
+            "max_overflow": int(os.getenv("DATABASE_MAX_OVERFLOW", "10")),
+            "pool_timeout": float(os.getenv("DATABASE_POOL_TIMEOUT", "30")),
+            "pool_recycle": int(os.getenv("DATABASE_POOL_RECYCLE", "1800")),
+            "pool_pre_ping": _env_flag("DATABASE_POOL_PRE_PING", "true"),
+        }
+    if url.get_backend_name() == "postgresql":
+        connect_args = {
+            "connect_timeout": int(os.getenv("DATABASE_CONNECT_TIMEOUT", "10")),
+            **json.loads(os.getenv("DATABASE_CONNECT_ARGS", "{}")),
+        }
+        statement_timeout = os.getenv("DATABASE_STATEMENT_TIMEOUT_MS")
+        if statement_timeout:
+            connect_args["options"] = (
+                connect_args.get("options", "")
+                + f" -c statement_timeout={int(statement_timeout)}"
+            ).strip()
+        options["connect_args"] = connect_args
+    options.update(overrides or {})
+    return options
+
+
+# asyncio drivers replacing the blocking ones in the async read mode
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_database_url(db_url: str) -> str:
+    """Build the URL of the asyncio engine serving the same database.
+
+    Args:
+        db_url (str): database URL of the app
+
+    Raises:
+        ValueError: no asyncio driver for the database
+
+    Returns:
+        str: URL with the asyncpg or aiosqlite driver
+    """
+    url = make_url(db_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver for {backend} databases")
+    driver = ASYNC_DRIVERS[backend]
+    return url.set(drivername=f"{backend}+{driver}").render_as_string(
+        hide_password=False
+    )
+
+
+def build_async_engine_options(db_url: str) -> dict:
+    """Build the options of the asyncio engine from the same environment.
+
+    Pool sizes, timeouts and pre-ping are the ones of build_engine_options,
+    on the default asyncio pool. The statement timeout is a server setting
+    of asyncpg connections, the psycopg2 connect arguments do not apply.
+
+    Args:
+        db_url (str): database URL of the app
+
+    Returns:
+        dict: engine options
+    """
+    options = build_engine_options(db_url)
+    options.pop("poolclass", None)
+    connect_args = options.pop("connect_args", None)
+    statement_timeout = os.getenv("DATABASE_STATEMENT_TIMEOUT_MS")
+    if connect_args is not None:
+        options["connect_args"] = {"timeout": connect_args["connect_timeout"]}
+        if statement_timeout:
+            options["connect_args"]["server_settings"] = {
+                "statement_timeout": str(int(statement_timeout))
+            }
+    return options
+
+
+def pool_stats(engine: Engine) -> dict:
+    """Describe the connection pool of an engine.
+
+    Args:
+        engine (Engine): database engine
+
+    Returns:
+        dict: pool class, sizes and checkout metrics when instrumented
+    """
+    pool = engine.pool
+    stats: dict = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            in_use=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,  # pylint: disable=protected-access
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.as_dict())
+    return stats
+
+
+def dispose_engines(app: Flask) -> None:
+    """Drop the pooled connections inherited from a parent process.
+
+    Called in each worker forked from an app loaded once, like gunicorn
+    with ``preload_app``. Inherited connections are left open for the
+    parent, the child opens its own.
+
+    Args:
+        app (Flask): the app
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -1,10 +1,12 @@
 """ Healthcheck resource """
+from flask import current_app
 from flask.views import MethodView
 from flask_smorest import Blueprint
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
 from api.db import db
+from api.pool import pool_stats
 
 blp = Blueprint(
     "healthcheck", "healthcheck", description="Check connections to database"
@@ -23,3 +25,21 @@ class HealthCheck(MethodView):
             return {"message": "OK"}, 200
         except SQLAlchemyError as err:
             return {"message": f"Internal error: {err}"}, 500
+
+
+@blp.route("/healthcheck/cache")
+class CacheStats(MethodView):
+    """Response cache counters resource"""
+
+    def get(self) -> tuple[dict, int]:
+        """Get the response cache counters of this worker"""
+        return current_app.cache.stats(), 200  # type: ignore
+
+
+@blp.route("/healthcheck/pool")
+class PoolStats(MethodView):
+    """Database connection pool metrics resource"""
+
+    def get(self) -> tuple[dict, int]:
+        """Get the connection pool usage and checkout waits of this worker"""
+        return pool_stats(db.engine), 200
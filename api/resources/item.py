@@ -1,36 +1,97 @@
 """Item resource module."""
+from flask import Response, current_app, jsonify, request
 from flask.views import MethodView
-from flask_jwt_extended import jwt_required
 from flask_smorest import Blueprint, abort
+from marshmallow import ValidationError
+from sqlalchemy import select, update
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import joinedload, selectinload
 
+from api.auth.decorators import jwt_required
+from api.bulk import insert_rows
+from api.cache import read_through
 from api.db import db
-from api.models import ItemModel
-from api.schemas import ItemSchema, ItemUpdateSchema
+from api.export import NDJSON_MIMETYPE, ndjson_response
+from api.fieldsets import resolve_fieldset
+from api.filters import filter_items, item_sort
+from api.models import ItemModel, StoreModel, SummaryDeltas, rollup_enabled
+from api.pagination import PAGINATION_HEADER_DOC, paginate
+from api.resources.store import ITEMS_VISIBLE, VISIBLE
+from api.schemas import (
+    ItemBulkArgsSchema,
+    ItemBulkResultSchema,
+    ItemFieldsArgsSchema,
+    ItemListArgsSchema,
+    ItemSchema,
+    ItemSearchArgsSchema,
+    ItemUpdateSchema,
+)
+from api.search import search_items
 
 blp = Blueprint("Items", "items", description="Operations on items")
 
+# relationships dumped by ItemSchema, loaded up front to avoid N+1 queries
+ITEM_LOAD_OPTIONS = (joinedload(ItemModel.store), selectinload(ItemModel.tags))
+
+
+def store_visible(store_id: int) -> bool:
+    """Tell whether a store exists and is not being deleted.
+
+    Args:
+        store_id (int): store id
+
+    Returns:
+        bool: True if items can be added to the store
+    """
+    return (
+        db.session.query(StoreModel.id).filter_by(id=store_id).filter(*VISIBLE).first()
+        is not None
+    )
+
 
 @blp.route("/item/<string:item_id>")
 class Item(MethodView):
     """Item resource."""
 
+    @blp.etag
+    @blp.arguments(ItemFieldsArgsSchema, location="query")
     @blp.response(200, ItemSchema)
     @blp.alt_response(404, description="Item not found.")
     @jwt_required()
-    def get(self, item_id: int) -> tuple[dict, int]:
-        """Get an item.
+    def get(self, field_args: dict, item_id: int) -> tuple[Response, int, dict]:
+        """Get an item, optionally with some of its fields only.
+
+        Served from the response cache when possible, answers 304 from the
+        item version alone when If-None-Match matches. Sparse fieldsets skip
+        the cache.
 
         Args:
+            field_args (dict): fields to return
             item_id (int): item id
 
         Returns:
-            tuple[dict, int]: response message and status code or item and status code
+            tuple[Response, int, dict]: item, status code and cache status header
         """
-        item = ItemModel.query.filter_by(id=item_id).first()
-        if item is None:
-            abort(404, message="Item not found.")
-        return item, 200
+        schema, options = resolve_fieldset(
+            ItemSchema,
+            ItemModel,
+            field_args.get("field_names"),
+            ITEM_LOAD_OPTIONS,
+            ItemModel.version,
+        )
+        return read_through(
+            blp,
+            ItemModel,
+            item_id,
+            ItemModel.query.options(*options)
+            .filter_by(id=item_id)
+            .filter(*ITEMS_VISIBLE)
+            .first,
+            schema,
+            "Item not found.",
+            variant=field_args,
+            where=ITEMS_VISIBLE,
+        )
 
     @blp.response(202)
     @blp.alt_response(404, description="Item not found.")
@@ -92,20 +153,44 @@ class Item(MethodView):
 class ItemList(MethodView):
     """ItemList resource."""
 
-    @blp.response(200, ItemSchema(many=True))
+    @blp.arguments(ItemListArgsSchema, location="query")
+    @blp.response(200, ItemSchema(many=True), headers=PAGINATION_HEADER_DOC)
+    @blp.alt_response(400, description="Invalid pagination cursor.")
     @jwt_required()
-    def get(self) -> tuple[list[ItemModel], int]:
-        """Get all items.
+    def get(self, list_args: dict) -> tuple[Response, int, dict]:
+        """Get a page of filtered items, ordered by id unless a sort key is given.
+
+        Args:
+            list_args (dict): filters, sort key, fields, limit and after cursor
 
         Returns:
-            tuple[list[ItemModel], int]: response message and status code
+            tuple[Response, int, dict]: items, status code and pagination header
         """
-        return ItemModel.query.all(), 200
+        sort, descending = item_sort(list_args)
+        schema, options = resolve_fieldset(
+            ItemSchema,
+            ItemModel,
+            list_args.get("field_names"),
+            ITEM_LOAD_OPTIONS,
+            *([] if sort is None else [sort]),
+            many=True,
+        )
+        items, headers = paginate(
+            filter_items(
+                ItemModel.query.options(*options).filter(*ITEMS_VISIBLE), list_args
+            ),
+            ItemModel.id,
+            list_args,
+            sort,
+            descending,
+        )
+        return jsonify(schema.dump(items)), 200, headers
 
     @blp.arguments(ItemSchema)
     @blp.response(201, ItemSchema)
     @blp.alt_response(500, description="An error occurred while inserting the item.")
     @blp.alt_response(400, description="Item must have a name and a price.")
+    @blp.alt_response(404, description="Store not found.")
     @blp.alt_response(409, description="An item with that name already exists.")
     @jwt_required(fresh=True)
     def post(self, item_data: dict) -> tuple[dict, int]:
@@ -119,12 +204,18 @@ class ItemList(MethodView):
         """
         if "name" not in item_data or "price" not in item_data:
             abort(400, message="Item must have a name and a price.")
+        if not store_visible(item_data["store_id"]):
+            abort(404, message="Store not found.")
         item = ItemModel(**item_data)
 
         try:
             db.session.add(item)
             db.session.commit()
         except IntegrityError:
+            db.session.rollback()
+            # the foreign key fails when the store is deleted meanwhile
+            if not store_visible(item_data["store_id"]):
+                abort(404, message="Store not found.")
             abort(
                 409,
                 message="An item with that name already exists.",
@@ -133,3 +224,163 @@ class ItemList(MethodView):
             abort(500, message="An error occurred while inserting the item.")
 
         return item, 201
+
+
+@blp.route("/item/search")
+class ItemSearch(MethodView):
+    """Item search resource."""
+
+    @blp.arguments(ItemSearchArgsSchema, location="query")
+    @blp.response(200, ItemSchema(many=True), headers=PAGINATION_HEADER_DOC)
+    @blp.alt_response(400, description="Invalid search query or pagination cursor.")
+    @jwt_required()
+    def get(self, search_args: dict) -> tuple[Response, int, dict]:
+        """Search items by name and description, best matches first.
+
+        Every word of the query matches as a prefix, on the full-text index
+        of the database.
+
+        Args:
+            search_args (dict): query, fields, limit and after cursor
+
+        Returns:
+            tuple[Response, int, dict]: items, status code and pagination header
+        """
+        schema, options = resolve_fieldset(
+            ItemSchema,
+            ItemModel,
+            search_args.get("field_names"),
+            ITEM_LOAD_OPTIONS,
+            many=True,
+        )
+        items, headers = search_items(
+            search_args["q"], search_args, options, where=ITEMS_VISIBLE
+        )
+        return jsonify(schema.dump(items)), 200, headers
+
+
+@blp.route("/item/bulk")
+class ItemBulk(MethodView):
+    """Bulk item creation resource."""
+
+    @blp.arguments(ItemBulkArgsSchema, location="query")
+    @blp.doc(
+        requestBody={
+            "required": True,
+            "content": {"application/json": {"schema": ItemSchema(many=True)}},
+        }
+    )
+    @blp.response(201, ItemBulkResultSchema)
+    @blp.alt_response(400, description="Expected a list of items.")
+    @blp.alt_response(413, description="Too many items in one request.")
+    @blp.alt_response(422, description="Some items are invalid.")
+    @blp.alt_response(500, description="An error occurred while inserting the items.")
+    @jwt_required(fresh=True)
+    def post(self, bulk_args: dict) -> tuple[dict, int]:
+        """Create many items in one transaction.
+
+        Items are validated in one pass. With atomic=true (the default) any
+        invalid item rejects the whole batch, otherwise valid items are
+        inserted and the errors of the others are returned by index.
+
+        Args:
+            bulk_args (dict): bulk arguments
+
+        Returns:
+            tuple[dict, int]: created count, per item errors and status code
+        """
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, list):
+            abort(400, message="Expected a list of items.")
+        if len(payload) > current_app.config["BULK_INSERT_MAX_ITEMS"]:
+            abort(413, message="Too many items in one request.")
+
+        schema = ItemSchema()
+        rows: list[dict] = []
+        errors: dict[str, dict] = {}
+        for index, raw_item in enumerate(payload):
+            if not isinstance(raw_item, dict):
+                errors[str(index)] = {"_schema": ["Invalid input type."]}
+                continue
+            try:
+                rows.append({"index": index, **schema.load(raw_item)})
+            except ValidationError as err:
+                errors[str(index)] = err.messages  # type: ignore
+
+        store_ids = {row["store_id"] for row in rows}
+        known_store_ids = {
+            store_id
+            for (store_id,) in db.session.query(StoreModel.id).filter(
+                StoreModel.id.in_(store_ids), *VISIBLE
+            )
+        }
+        for row in rows:
+            if row["store_id"] not in known_store_ids:
+                errors[str(row["index"])] = {"store_id": ["Store not found."]}
+        rows = [row for row in rows if str(row["index"]) not in errors]
+
+        if errors and bulk_args["atomic"]:
+            abort(422, message="Some items are invalid.", errors=errors)
+
+        try:
+            created = insert_rows(
+                db.session,
+                ItemModel.__table__,
+                ["name", "price", "store_id"],
+                rows,
+                current_app.config["BULK_INSERT_CHUNK_SIZE"],
+            )
+            # Core inserts skip the ORM version and rollup bookkeeping
+            if rollup_enabled():
+                deltas = SummaryDeltas()
+                for row in rows:
+                    deltas.item(row["store_id"], row["price"])
+                deltas.apply(db.session)
+            db.session.execute(
+                update(StoreModel)
+                .where(StoreModel.id.in_({row["store_id"] for row in rows}))
+                .values(version=StoreModel.version + 1)
+            )
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            abort(500, message="An error occurred while inserting the items.")
+        current_app.cache.invalidate(  # type: ignore
+            ("stores", store_id) for store_id in {row["store_id"] for row in rows}
+        )
+
+        return {"created": created, "errors": errors}, 201
+
+
+@blp.route("/item/export")
+class ItemExport(MethodView):
+    """Item export resource."""
+
+    @blp.arguments(ItemFieldsArgsSchema, location="query")
+    @blp.response(
+        200,
+        ItemSchema,
+        content_type=NDJSON_MIMETYPE,
+        description="One item per line, ordered by id.",
+    )
+    @blp.alt_response(406, description="Client does not accept NDJSON.")
+    @jwt_required()
+    def get(self, field_args: dict) -> Response:
+        """Stream every item as newline delimited JSON.
+
+        Args:
+            field_args (dict): fields to return
+
+        Returns:
+            Response: streamed items
+        """
+        schema, options = resolve_fieldset(
+            ItemSchema, ItemModel, field_args.get("field_names"), ITEM_LOAD_OPTIONS
+        )
+        return ndjson_response(
+            select(ItemModel)
+            .options(*options)
+            .where(*ITEMS_VISIBLE)
+            .order_by(ItemModel.id),
+            schema,
+        )
@@ -0,0 +1,50 @@
+""" Job resource """
+from flask import current_app
+from flask.views import MethodView
+from flask_smorest import Blueprint, abort
+
+from api.auth.decorators import jwt_required
+from api.schemas import JobSchema
+
+blp = Blueprint("Jobs", "jobs", description="Status of background jobs")
+
+
+@blp.route("/job/<string:job_id>")
+class Job(MethodView):
+    """Job resource"""
+
+    @blp.response(200, JobSchema)
+    @blp.alt_response(404, description="Job not found.")
+    @jwt_required()
+    def get(self, job_id: str) -> tuple[dict, int]:
+        """Get the status of a background job
+
+        Args:
+            job_id (str): job id
+
+        Returns:
+            tuple[dict, int]: job status and status code
+        """
+        # rq is imported by the first lookup, not when the app starts
+        # pylint: disable=import-outside-toplevel
+        from rq.exceptions import NoSuchJobError
+        from rq.job import Job as RQJob
+        from rq.results import Result
+
+        try:
+            job = RQJob.fetch(job_id, connection=current_app.jobs.connection)  # type: ignore
+        except NoSuchJobError:
+            abort(404, message="Job not found.")
+        latest = job.latest_result()
+        succeeded = latest is not None and latest.type == Result.Type.SUCCESSFUL
+        failed = latest is not None and latest.type == Result.Type.FAILED
+        return {
+            "id": job.id,
+            "status": job.get_status(),
+            "progress": job.meta,
+            "result": latest.return_value if succeeded else None,
+            # only the exception line, tracebacks stay in the worker logs
+            "error": latest.exc_string.strip().splitlines()[-1] if failed else None,
+            "enqueued_at": job.enqueued_at,
+            "ended_at": job.ended_at,
+        }, 200
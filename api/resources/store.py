@@ -1,54 +1,253 @@
 """ Store resource """
+from functools import partial
+from types import SimpleNamespace
+
+from flask import Response, current_app, jsonify, url_for
 from flask.views import MethodView
-from flask_jwt_extended import jwt_required
 from flask_smorest import Blueprint, abort
+from marshmallow import Schema
+from sqlalchemy import Select, func, select
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import selectinload
 
+from api.auth.decorators import jwt_required
+from api.cache import read_through
 from api.db import db
-from api.models import StoreModel
-from api.schemas import StoreSchema
+from api.export import NDJSON_MIMETYPE, ndjson_response
+from api.fieldsets import load_options, nested_schema, resolve_fieldset
+from api.filters import filter_items, item_order
+from api.jobs import delete_store_job
+from api.models import ItemModel, StoreModel, TagModel
+from api.pagination import PAGINATION_HEADER_DOC, paginate
+from api.schemas import (
+    CursorPaginationArgsSchema,
+    StoreArgsSchema,
+    StoreDeletionSchema,
+    StoreFieldsArgsSchema,
+    StoreListArgsSchema,
+    StoreSchema,
+    StoreSummarySchema,
+)
+from api.summary import store_summaries, summary_query
 
 blp = Blueprint("Stores", "stores", description="Operations on stores")
 
+# relationships dumped by StoreSchema, loaded up front to avoid N+1 queries
+STORE_LOAD_OPTIONS = (selectinload(StoreModel.items), selectinload(StoreModel.tags))
+
+# stores being deleted in the background are hidden from every read
+VISIBLE = (StoreModel.hidden.is_(False),)
+
+# items and tags of a store being deleted are hidden with it, from writes too
+ITEMS_VISIBLE = (ItemModel.store_id.in_(select(StoreModel.id).where(*VISIBLE)),)
+TAGS_VISIBLE = (TagModel.store_id.in_(select(StoreModel.id).where(*VISIBLE)),)
+
+# seconds an asynchronous store deletion may run
+STORE_DELETE_JOB_TIMEOUT = 3600
+
+
+def filtered_store_query(store_id, schema: Schema) -> Select:
+    """Select a visible store with the fields of a schema, except its items.
+
+    Args:
+        store_id: store id
+        schema (Schema): response schema, possibly a sparse one
+
+    Returns:
+        Select: store statement
+    """
+    return (
+        select(StoreModel)
+        .options(*load_options(StoreModel, schema, StoreModel.version, skip=["items"]))
+        .filter_by(id=store_id)
+        .filter(*VISIBLE)
+    )
+
+
+def filtered_items_query(store_id, filter_args: dict, schema: Schema) -> Select | None:
+    """Select the items of a store matching the filters, in the requested order.
+
+    Args:
+        store_id: store id
+        filter_args (dict): parsed ItemFilterArgsSchema arguments
+        schema (Schema): response schema, possibly a sparse one
+
+    Returns:
+        Select | None: items statement, None if the schema does not dump items
+    """
+    dumped = schema.dump_fields
+    if "items" not in dumped:
+        return None
+    return filter_items(
+        select(ItemModel).options(
+            *load_options(ItemModel, nested_schema(dumped["items"]))
+        ),
+        {**filter_args, "store_id": store_id},
+    ).order_by(*item_order(filter_args))
+
+
+def store_view(store: StoreModel, items: list, schema: Schema) -> SimpleNamespace:
+    """Build a detached view of a store holding some of its items.
+
+    Args:
+        store (StoreModel): store loaded by filtered_store_query
+        items (list): items loaded by filtered_items_query
+        schema (Schema): response schema, possibly a sparse one
+
+    Returns:
+        SimpleNamespace: store view
+    """
+    return SimpleNamespace(
+        version=store.version,
+        items=items,
+        **{
+            name: getattr(store, name) for name in schema.dump_fields if name != "items"
+        },
+    )
+
+
+def load_filtered_store(
+    store_id, filter_args: dict, schema: Schema
+) -> SimpleNamespace | None:
+    """Load a store with only the items matching the filters.
+
+    The items go to a detached view of the store, the session keeps the
+    full items collection of the store. Only the fields dumped by the
+    schema are loaded, the items are not queried if it does not dump them.
+
+    Args:
+        store_id: store id
+        filter_args (dict): parsed ItemFilterArgsSchema arguments
+        schema (Schema): response schema, possibly a sparse one
+
+    Returns:
+        SimpleNamespace | None: store view, None if the store does not exist
+    """
+    store = db.session.scalars(filtered_store_query(store_id, schema)).first()
+    if store is None:
+        return None
+    query = filtered_items_query(store.id, filter_args, schema)
+    items = [] if query is None else db.session.scalars(query).all()
+    return store_view(store, items, schema)
+
 
 @blp.route("/store/<string:store_id>")
 class Store(MethodView):
     """Store resource"""
 
+    @blp.etag
+    @blp.arguments(StoreArgsSchema, location="query")
     @blp.response(200, StoreSchema)
     @blp.alt_response(404, description="Store not found.")
     @jwt_required()
-    def get(self, store_id: int) -> tuple[dict, int]:
-        """Get a store
+    def get(self, store_args: dict, store_id: int) -> tuple[Response, int, dict]:
+        """Get a store, optionally with filtered and sorted items or sparse fields
+
+        Served from the response cache when possible, answers 304 from the
+        store version alone when If-None-Match matches. Filtered stores and
+        sparse fieldsets skip the cache.
 
         Args:
+            store_args (dict): item filters, sort key and fields
             store_id (int): store id
 
         Returns:
-            tuple[dict, int]: response message and status code or store and status code
+            tuple[Response, int, dict]: store, status code and cache status header
         """
-        store = db.session.query(StoreModel).filter_by(id=store_id).first()
-        if store is None:
-            abort(404, message="Store not found.")
-        return store, 200
+        filter_args = {
+            key: value for key, value in store_args.items() if key != "field_names"
+        }
+        schema, options = resolve_fieldset(
+            StoreSchema,
+            StoreModel,
+            store_args.get("field_names"),
+            STORE_LOAD_OPTIONS,
+            StoreModel.version,
+        )
+        if filter_args:
+            load = partial(load_filtered_store, store_id, filter_args, schema)
+        else:
+            load = (
+                db.session.query(StoreModel)
+                .options(*options)
+                .filter_by(id=store_id)
+                .filter(*VISIBLE)
+                .first
+            )
+        return read_through(
+            blp,
+            StoreModel,
+            store_id,
+            load,
+            schema,
+            "Store not found.",
+            variant=store_args,
+            where=VISIBLE,
+        )
 
-    @blp.response(202)
+    @blp.response(202, StoreDeletionSchema)
     @blp.alt_response(404, description="Store not found.")
+    @blp.alt_response(503, description="Could not start the store deletion.")
     @jwt_required()
-    def delete(self, store_id: int) -> tuple[dict, int]:
+    def delete(self, store_id: int) -> tuple[dict, int] | tuple[dict, int, dict]:
         """Delete a store
 
+        Items, tags and their links are removed by the database cascade.
+        Stores with at least STORE_DELETE_ASYNC_THRESHOLD items are hidden
+        at once and deleted by a background job in chunked transactions,
+        the response then links to the job status.
+
         Args:
             store_id (int): store id
 
         Returns:
-            tuple[dict, int]: response message and status code
+            tuple[dict, int] | tuple[dict, int, dict]: response message, status
+            code and, for background deletions, the job status location
         """
-        store = db.session.query(StoreModel).filter_by(id=store_id).first()
+        store = (
+            db.session.query(StoreModel).filter_by(id=store_id).filter(*VISIBLE).first()
+        )
         if store is None:
             abort(404, message="Store not found.")
+        items = db.session.scalar(
+            select(func.count()).where(ItemModel.store_id == store.id)
+        )
+        # only the ids are read to drop cached payloads
+        keys = [
+            (model.__tablename__, row_id)
+            for model in (ItemModel, TagModel)
+            for row_id in db.session.scalars(
+                select(model.id).where(model.store_id == store.id)
+            )
+        ]
+        if items >= current_app.config["STORE_DELETE_ASYNC_THRESHOLD"]:
+            store.hidden = True
+            db.session.commit()
+            # cache hits do not check visibility, misses of hidden rows are 404
+            current_app.cache.invalidate(keys)  # type: ignore
+            from redis import RedisError  # pylint: disable=import-outside-toplevel
+
+            try:
+                job = current_app.jobs.enqueue(  # type: ignore
+                    delete_store_job,
+                    store.id,
+                    current_app.config["STORE_DELETE_CHUNK_SIZE"],
+                    job_timeout=STORE_DELETE_JOB_TIMEOUT,
+                )
+            except RedisError:
+                store.hidden = False
+                db.session.commit()
+                abort(503, message="Could not start the store deletion.")
+            location = url_for("Jobs.Job", job_id=job.id)
+            return (
+                {"message": "Store deletion started", "job_id": job.id},
+                202,
+                {"Location": location},
+            )
+
         db.session.delete(store)
         db.session.commit()
+        current_app.cache.invalidate(keys)  # type: ignore
         return {"message": "Store deleted"}, 202
 
 
@@ -56,15 +255,32 @@ class Store(MethodView):
 class StoreList(MethodView):
     """Store list resource"""
 
-    @blp.response(200, StoreSchema(many=True))
+    @blp.arguments(StoreListArgsSchema, location="query")
+    @blp.response(200, StoreSchema(many=True), headers=PAGINATION_HEADER_DOC)
+    @blp.alt_response(400, description="Invalid pagination cursor.")
     @jwt_required()
-    def get(self) -> tuple[list[dict], int]:
-        """Get all stores
+    def get(self, page_args: dict) -> tuple[Response, int, dict]:
+        """Get a page of stores ordered by id
+
+        Args:
+            page_args (dict): fields, limit and after cursor
 
         Returns:
-            tuple[list[dict], int]: list of stores and status code
+            tuple[Response, int, dict]: stores, status code and pagination header
         """
-        return StoreModel.query.all(), 200
+        schema, options = resolve_fieldset(
+            StoreSchema,
+            StoreModel,
+            page_args.get("field_names"),
+            STORE_LOAD_OPTIONS,
+            many=True,
+        )
+        stores, headers = paginate(
+            StoreModel.query.options(*options).filter(*VISIBLE),
+            StoreModel.id,
+            page_args,
+        )
+        return jsonify(schema.dump(stores)), 200, headers
 
     @blp.arguments(StoreSchema)
     @blp.response(201, StoreSchema)
@@ -96,3 +312,90 @@ class StoreList(MethodView):
             abort(500, message="An error occurred creating the store.")
 
         return store, 201
+
+
+@blp.route("/store/export")
+class StoreExport(MethodView):
+    """Store export resource"""
+
+    @blp.arguments(StoreFieldsArgsSchema, location="query")
+    @blp.response(
+        200,
+        StoreSchema,
+        content_type=NDJSON_MIMETYPE,
+        description="One store per line, ordered by id.",
+    )
+    @blp.alt_response(406, description="Client does not accept NDJSON.")
+    @jwt_required()
+    def get(self, field_args: dict) -> Response:
+        """Stream every store as newline delimited JSON
+
+        Args:
+            field_args (dict): fields to return
+
+        Returns:
+            Response: streamed stores
+        """
+        schema, options = resolve_fieldset(
+            StoreSchema, StoreModel, field_args.get("field_names"), STORE_LOAD_OPTIONS
+        )
+        return ndjson_response(
+            select(StoreModel)
+            .options(*options)
+            .where(*VISIBLE)
+            .order_by(StoreModel.id),
+            schema,
+        )
+
+
+@blp.route("/store/<int:store_id>/summary")
+class StoreSummary(MethodView):
+    """Store summary resource"""
+
+    @blp.response(200, StoreSummarySchema)
+    @blp.alt_response(404, description="Store not found.")
+    @jwt_required()
+    def get(self, store_id: int) -> tuple[dict, int]:
+        """Get the item and tag counts, prices and most used tags of a store
+
+        Computed in SQL, or read from the rollup rows maintained by the
+        write paths when STORE_SUMMARY_ROLLUP is set.
+
+        Args:
+            store_id (int): store id
+
+        Returns:
+            tuple[dict, int]: store summary and status code
+        """
+        row = summary_query().filter(StoreModel.id == store_id, *VISIBLE).first()
+        if row is None:
+            abort(404, message="Store not found.")
+        limit = current_app.config["STORE_SUMMARY_TOP_TAGS"]
+        return store_summaries([row], limit)[0], 200
+
+
+@blp.route("/store/summary")
+class StoreSummaryList(MethodView):
+    """Store summary list resource"""
+
+    @blp.arguments(CursorPaginationArgsSchema, location="query")
+    @blp.response(200, StoreSummarySchema(many=True), headers=PAGINATION_HEADER_DOC)
+    @blp.alt_response(400, description="Invalid pagination cursor.")
+    @jwt_required()
+    def get(self, page_args: dict) -> tuple[list[dict], int, dict]:
+        """Get a page of store summaries ordered by store id
+
+        One query aggregates the stores of the page and one ranks their
+        tags, whatever the page size.
+
+        Args:
+            page_args (dict): limit and after cursor
+
+        Returns:
+            tuple[list[dict], int, dict]: summaries, status code and pagination header
+        """
+        rows, headers = paginate(
+            summary_query().filter(*VISIBLE), StoreModel.id, page_args
+        )
+        limit = current_app.config["STORE_SUMMARY_TOP_TAGS"]
+        return store_summaries(rows, limit), 200, headers
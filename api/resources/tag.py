@@ -1,36 +1,211 @@
 """ tag resource """
+from collections.abc import Collection
+
+from flask import Response, current_app, jsonify
 from flask.views import MethodView
-from flask_jwt_extended import jwt_required
 from flask_smorest import Blueprint, abort
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import and_, delete, literal, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import joinedload, selectinload
 
+from api.auth.decorators import jwt_required
+from api.bulk import UPSERT_INSERTS
+from api.cache import read_through
 from api.db import db
-from api.models import ItemModel, StoreModel, TagModel
-from api.schemas import TagAndItemSchema, TagSchema
+from api.export import NDJSON_MIMETYPE, ndjson_response
+from api.fieldsets import resolve_fieldset
+from api.models import (
+    ItemModel,
+    ItemTags,
+    StoreModel,
+    SummaryDeltas,
+    TagModel,
+    rollup_enabled,
+)
+from api.pagination import PAGINATION_HEADER_DOC, paginate
+from api.resources.store import ITEMS_VISIBLE, TAGS_VISIBLE, VISIBLE
+from api.schemas import (
+    ItemTagsPatchSchema,
+    ItemTagsSchema,
+    PlainTagSchema,
+    TagAndItemSchema,
+    TagFieldsArgsSchema,
+    TagListArgsSchema,
+    TagSchema,
+)
 
 blp = Blueprint("Tags", "tags", description="Operations on tags")
 
+# relationships dumped by TagSchema, loaded up front to avoid N+1 queries
+TAG_LOAD_OPTIONS = (joinedload(TagModel.store), selectinload(TagModel.items))
+
+
+def check_store_tags(item_id: int, tag_ids: Collection[int]) -> None:
+    """Abort unless the item exists and every tag belongs to its store.
+
+    The item and the matching tags of its store are read in one query.
+
+    Args:
+        item_id (int): item id
+        tag_ids (Collection[int]): tag ids
+    """
+    rows = db.session.execute(
+        select(ItemModel.id, TagModel.id)
+        .outerjoin(
+            TagModel,
+            and_(TagModel.store_id == ItemModel.store_id, TagModel.id.in_(tag_ids)),
+        )
+        .where(ItemModel.id == item_id, *ITEMS_VISIBLE)
+    ).all()
+    if not rows:
+        abort(404, message="Item not found.")
+    unknown = set(tag_ids) - {tag_id for _, tag_id in rows}
+    if unknown:
+        abort(
+            422,
+            message="Tags not found in the store of the item.",
+            errors={"tag_ids": sorted(unknown)},
+        )
+
+
+def link_tags(item_id: int, tag_ids: Collection[int]) -> set[int]:
+    """Link tags of the item's store to an item, skipping existing links.
+
+    Args:
+        item_id (int): item id
+        tag_ids (Collection[int]): tag ids
+
+    Returns:
+        set[int]: newly linked tag ids
+    """
+    if not tag_ids:
+        return set()
+    insert = UPSERT_INSERTS[db.session.get_bind().dialect.name]
+    store_id = select(ItemModel.store_id).where(ItemModel.id == item_id)
+    statement = (
+        insert(ItemTags)
+        .from_select(
+            ["item_id", "tag_id"],
+            select(literal(item_id), TagModel.id).where(
+                TagModel.id.in_(tag_ids),
+                TagModel.store_id == store_id.scalar_subquery(),
+            ),
+        )
+        .on_conflict_do_nothing(index_elements=["item_id", "tag_id"])
+        .returning(ItemTags.tag_id)
+    )
+    return set(db.session.scalars(statement))
+
+
+def unlink_tags(item_id: int, condition) -> set[int]:
+    """Remove links of an item.
+
+    Args:
+        item_id (int): item id
+        condition: condition on ItemTags.tag_id selecting the links to remove
+
+    Returns:
+        set[int]: unlinked tag ids
+    """
+    statement = (
+        delete(ItemTags)
+        .where(ItemTags.item_id == item_id, condition)
+        .returning(ItemTags.tag_id)
+    )
+    return set(db.session.scalars(statement))
+
+
+def commit_retag(item_id: int, linked: set[int], unlinked: set[int]) -> None:
+    """Bump versions and drop cached payloads of a retagged item and its tags.
+
+    The Core statements of the retag skip the ORM version bookkeeping and
+    the summary rollups, both are updated here.
+
+    Args:
+        item_id (int): item id
+        linked (set[int]): linked tag ids
+        unlinked (set[int]): unlinked tag ids
+    """
+    changed = linked | unlinked
+    if changed and rollup_enabled():
+        deltas = SummaryDeltas()
+        for tag_id in changed:
+            deltas.link(tag_id, 1 if tag_id in linked else -1)
+        deltas.apply(db.session)
+    if changed:
+        db.session.execute(
+            update(ItemModel)
+            .where(ItemModel.id == item_id)
+            .values(version=ItemModel.version + 1)
+        )
+        db.session.execute(
+            update(TagModel)
+            .where(TagModel.id.in_(changed))
+            .values(version=TagModel.version + 1)
+        )
+    db.session.commit()
+    current_app.cache.invalidate(  # type: ignore
+        [("items", item_id), *(("tags", tag_id) for tag_id in changed)]
+    )
+
+
+def item_tags(item_id: int) -> list[TagModel]:
+    """Load the tags of an item.
+
+    Args:
+        item_id (int): item id
+
+    Returns:
+        list[TagModel]: tags ordered by id
+    """
+    return db.session.scalars(
+        select(TagModel)
+        .join(ItemTags, ItemTags.tag_id == TagModel.id)
+        .where(ItemTags.item_id == item_id)
+        .order_by(TagModel.id)
+    ).all()
+
 
 @blp.route("/stores/<int:store_id>/tag")
 class TagsInStore(MethodView):
     """Tags in store resource"""
 
-    @blp.response(200, TagSchema(many=True))
+    @blp.arguments(TagListArgsSchema, location="query")
+    @blp.response(200, TagSchema(many=True), headers=PAGINATION_HEADER_DOC)
+    @blp.alt_response(400, description="Invalid pagination cursor.")
     @blp.alt_response(404, description="Store not found.")
     @jwt_required()
-    def get(self, store_id: int) -> tuple[list[dict], int]:
-        """Get all tags in a store
+    def get(self, page_args: dict, store_id: int) -> tuple[Response, int, dict]:
+        """Get a page of tags in a store ordered by id
 
         Args:
+            page_args (dict): fields, limit and after cursor
             store_id (int): store id
 
         Returns:
-            tuple[list[dict], int]: list of tags and status code
+            tuple[Response, int, dict]: tags, status code and pagination header
         """
-        store = db.session.query(StoreModel).filter_by(id=store_id).first()
+        store = (
+            db.session.query(StoreModel.id)
+            .filter_by(id=store_id)
+            .filter(*VISIBLE)
+            .first()
+        )
         if not store:
             abort(404, message="Store not found.")
-        return store.tags.all(), 200
+        schema, options = resolve_fieldset(
+            TagSchema,
+            TagModel,
+            page_args.get("field_names"),
+            TAG_LOAD_OPTIONS,
+            many=True,
+        )
+        tags, headers = paginate(
+            db.session.query(TagModel).options(*options).filter_by(store_id=store_id),
+            TagModel.id,
+            page_args,
+        )
+        return jsonify(schema.dump(tags)), 200, headers
 
     @blp.arguments(TagSchema)
     @blp.response(201, TagSchema)
@@ -50,20 +225,22 @@ class TagsInStore(MethodView):
             tuple[dict, int]: response message and status code or tag and status code
         """
         try:
-            store = db.session.query(StoreModel).filter_by(id=store_id).first()
+            store = (
+                db.session.query(StoreModel.id)
+                .filter_by(id=store_id)
+                .filter(*VISIBLE)
+                .first()
+            )
             if "name" not in new_tag:
                 abort(400, message="Tag name is required.")
             if not store:
                 abort(404, message="Store not found.")
-            if (
-                db.session.query(TagModel)
-                .filter_by(name=new_tag["name"], store_id=store_id)
-                .first()
-            ):
-                abort(409, message="Tag with name already exists in that store.")
             tag = TagModel(**new_tag, store_id=store_id)
             db.session.add(tag)
             db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            abort(409, message="Tag with name already exists in that store.")
         except SQLAlchemyError as err:
             db.session.rollback()
             abort(500, message=f"Database error: {err}")
@@ -89,19 +266,58 @@ class LinkTagsToItem(MethodView):
             tuple[dict, int]: response message and status code or tags and status code
         """
         try:
-            item = db.session.query(ItemModel).filter_by(id=item_id).first()
-            tag = db.session.query(TagModel).filter_by(id=tag_id).first()
+            item = (
+                db.session.query(ItemModel)
+                .filter_by(id=item_id)
+                .filter(*ITEMS_VISIBLE)
+                .first()
+            )
+            tag = (
+                db.session.query(TagModel)
+                .filter_by(id=tag_id)
+                .filter(*TAGS_VISIBLE)
+                .first()
+            )
             if not item:
                 abort(404, message="Item not found.")
             if not tag:
                 abort(404, message="Tag not found.")
-            if tag not in item.tags:
-                item.tags.append(tag)
-                db.session.commit()
+            item_id, tag_id = item.id, tag.id
+            db.session.add(ItemTags(item_id=item_id, tag_id=tag_id))
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            # already linked, enforced by uq_item_tags_item_id_tag_id
+            linked = (
+                db.session.query(ItemTags.id)
+                .filter_by(item_id=item_id, tag_id=tag_id)
+                .first()
+            )
+            if linked is None:
+                # the foreign keys fail when the item or tag is deleted meanwhile
+                if not (
+                    db.session.query(ItemModel.id)
+                    .filter_by(id=item_id)
+                    .filter(*ITEMS_VISIBLE)
+                    .first()
+                    and db.session.query(TagModel.id)
+                    .filter_by(id=tag_id)
+                    .filter(*TAGS_VISIBLE)
+                    .first()
+                ):
+                    abort(404, message="Item or tag not found.")
+                abort(500, message="Database error: {}".format(e))
         except SQLAlchemyError as e:
             db.session.rollback()
             abort(500, message="Database error: {}".format(e))
-        return item.tags, 201
+        tags = (
+            db.session.query(TagModel)
+            .options(*TAG_LOAD_OPTIONS)
+            .filter(TagModel.items.any(ItemModel.id == item_id))
+            .order_by(TagModel.id)
+            .all()
+        )
+        return tags, 201
 
     @blp.response(202, TagAndItemSchema)
     @blp.alt_response(404, description="Item or tag not found.")
@@ -133,26 +349,115 @@ class LinkTagsToItem(MethodView):
         return {"message": "Tag unlinked"}, 202
 
 
+@blp.route("/item/<int:item_id>/tags")
+class ItemTagSet(MethodView):
+    """Tags of an item resource"""
+
+    @blp.arguments(ItemTagsSchema)
+    @blp.response(200, PlainTagSchema(many=True))
+    @blp.alt_response(404, description="Item not found.")
+    @blp.alt_response(422, description="Tags not found in the store of the item.")
+    @blp.alt_response(500, description="Database error.")
+    @jwt_required()
+    def put(self, tag_data: dict, item_id: int) -> tuple[list[TagModel], int]:
+        """Replace the tags of an item
+
+        Tags of the item's store are linked with one INSERT ... ON CONFLICT
+        DO NOTHING, the other links are removed with one DELETE.
+
+        Args:
+            tag_data (dict): complete list of tag ids
+            item_id (int): item id
+
+        Returns:
+            tuple[list[TagModel], int]: tags of the item and status code
+        """
+        tag_ids = set(tag_data["tag_ids"])
+        check_store_tags(item_id, tag_ids)
+        try:
+            linked = link_tags(item_id, tag_ids)
+            unlinked = unlink_tags(item_id, ItemTags.tag_id.not_in(tag_ids))
+            commit_retag(item_id, linked, unlinked)
+        except SQLAlchemyError as err:
+            db.session.rollback()
+            abort(500, message=f"Database error: {err}")
+        return item_tags(item_id), 200
+
+    @blp.arguments(ItemTagsPatchSchema)
+    @blp.response(200, PlainTagSchema(many=True))
+    @blp.alt_response(404, description="Item not found.")
+    @blp.alt_response(422, description="Tags not found in the store of the item.")
+    @blp.alt_response(500, description="Database error.")
+    @jwt_required()
+    def patch(self, tag_data: dict, item_id: int) -> tuple[list[TagModel], int]:
+        """Link and unlink tags of an item
+
+        Args:
+            tag_data (dict): tag ids to link and to unlink
+            item_id (int): item id
+
+        Returns:
+            tuple[list[TagModel], int]: tags of the item and status code
+        """
+        check_store_tags(item_id, set(tag_data["link"]))
+        try:
+            linked = link_tags(item_id, set(tag_data["link"]))
+            unlinked = set()
+            if tag_data["unlink"]:
+                unlinked = unlink_tags(
+                    item_id, ItemTags.tag_id.in_(set(tag_data["unlink"]))
+                )
+            commit_retag(item_id, linked, unlinked)
+        except SQLAlchemyError as err:
+            db.session.rollback()
+            abort(500, message=f"Database error: {err}")
+        return item_tags(item_id), 200
+
+
 @blp.route("/tag/<string:tag_id>")
 class Tag(MethodView):
     """Tag resource"""
 
+    @blp.etag
+    @blp.arguments(TagFieldsArgsSchema, location="query")
     @blp.response(200, TagSchema)
     @blp.alt_response(404, description="Tag not found.")
     @jwt_required()
-    def get(self, tag_id: int) -> tuple[dict, int]:
-        """Get a tag
+    def get(self, field_args: dict, tag_id: int) -> tuple[Response, int, dict]:
+        """Get a tag, optionally with some of its fields only
+
+        Served from the response cache when possible, answers 304 from the
+        tag version alone when If-None-Match matches. Sparse fieldsets skip
+        the cache.
 
         Args:
+            field_args (dict): fields to return
             tag_id (int): tag id
 
         Returns:
-            tuple[dict, int]: tag and status code
+            tuple[Response, int, dict]: tag, status code and cache status header
         """
-        tag = db.session.query(TagModel).filter_by(id=tag_id).first()
-        if not tag:
-            abort(404, message="Tag not found.")
-        return tag, 200
+        schema, options = resolve_fieldset(
+            TagSchema,
+            TagModel,
+            field_args.get("field_names"),
+            TAG_LOAD_OPTIONS,
+            TagModel.version,
+        )
+        return read_through(
+            blp,
+            TagModel,
+            tag_id,
+            db.session.query(TagModel)
+            .options(*options)
+            .filter_by(id=tag_id)
+            .filter(*TAGS_VISIBLE)
+            .first,
+            schema,
+            "Tag not found.",
+            variant=field_args,
+            where=TAGS_VISIBLE,
+        )
 
     @blp.response(202)
     @blp.alt_response(404, description="Tag not found.")
@@ -177,3 +482,37 @@ class Tag(MethodView):
             db.session.rollback()
             abort(500, message="Database error: {}".format(err))
         return {"message": "Tag deleted"}, 202
+
+
+@blp.route("/tag/export")
+class TagExport(MethodView):
+    """Tag export resource"""
+
+    @blp.arguments(TagFieldsArgsSchema, location="query")
+    @blp.response(
+        200,
+        TagSchema,
+        content_type=NDJSON_MIMETYPE,
+        description="One tag per line, ordered by id.",
+    )
+    @blp.alt_response(406, description="Client does not accept NDJSON.")
+    @jwt_required()
+    def get(self, field_args: dict) -> Response:
+        """Stream every tag as newline delimited JSON
+
+        Args:
+            field_args (dict): fields to return
+
+        Returns:
+            Response: streamed tags
+        """
+        schema, options = resolve_fieldset(
+            TagSchema, TagModel, field_args.get("field_names"), TAG_LOAD_OPTIONS
+        )
+        return ndjson_response(
+            select(TagModel)
+            .options(*options)
+            .where(*TAGS_VISIBLE)
+            .order_by(TagModel.id),
+            schema,
+        )
@@ -8,15 +8,12 @@ from flask_jwt_extended import (
     create_refresh_token,
     get_jwt,
     get_jwt_identity,
-    jwt_required,
 )
 from flask_smorest import Blueprint, abort
-from passlib.hash import pbkdf2_sha256
 from sqlalchemy import or_
 
-from api.auth.blocklist import BLOCKLIST
+from api.auth.decorators import jwt_required
 from api.db import db
-from api.email import send_email_from_postmaster
 from api.models import UserModel
 from api.schemas import UserRegisterSchema, UserSchema
 
@@ -59,14 +56,17 @@ class UserRegister(MethodView):
         try:
             user = UserModel(
                 username=user_data.username,  # type: ignore
-                password=pbkdf2_sha256.hash(user_data.password),  # type: ignore
+                password=current_app.password_hasher.hash(  # type: ignore
+                    user_data.password  # type: ignore
+                ),
                 email=user_data.email,  # type: ignore
             )
             db.session.add(user)
             db.session.commit()
 
+            # enqueued by name, the mailer imports the email module
             current_app.queue.enqueue(  # type: ignore
-                send_email_from_postmaster,
+                "api.email.send_email_from_postmaster",
                 email=user_data.email,  # type: ignore
                 username=user_data.username,  # type: ignore
             )
@@ -136,7 +136,15 @@ class UserLogin(MethodView):
             .first()
         )
 
-        if user and pbkdf2_sha256.verify(user_data["password"], user.password):
+        if user is None:
+            return {"message": "Invalid credentials"}, 401
+        valid, new_hash = current_app.password_hasher.verify_and_update(  # type: ignore
+            user_data["password"], user.password
+        )
+        if valid:
+            if new_hash is not None:
+                user.password = new_hash
+                db.session.commit()
             access_token = create_access_token(identity=user.id, fresh=True)
             refresh_token = create_refresh_token(user.id)
             return {"access_token": access_token, "refresh_token": refresh_token}, 200
@@ -154,8 +162,8 @@ class UserLogout(MethodView):
         Returns:
             tuple[dict, int]: response message and status code
         """
-        jti = get_jwt()["jti"]
-        BLOCKLIST.add(jti)
+        token = get_jwt()
+        current_app.blocklist.add(token["jti"], token.get("exp"))  # type: ignore
         return {"message": "Successfully logged out"}, 200
 
 
@@ -172,6 +180,6 @@ class TokenRefresh(MethodView):
         """
         current_user = get_jwt_identity()
         access_token = create_access_token(identity=current_user, fresh=False)
-        jti = get_jwt()["jti"]
-        BLOCKLIST.add(jti)
+        token = get_jwt()
+        current_app.blocklist.add(token["jti"], token.get("exp"))  # type: ignore
         return {"access_token": access_token}, 200
@@ -1,8 +1,51 @@
 """ serialization schemas for the api """
-from marshmallow import Schema, fields
+from marshmallow import Schema, ValidationError, fields, validate, validates_schema
 
+from api.fieldsets import dumps_field
+from api.serializers import Serializer, compile_serializer, fast_serialization_enabled
+from api.timing import timed
 
-class PlainItemSchema(Schema):
+
+class BaseSchema(Schema):
+    """Schema dumping through a compiled serializer when enabled"""
+
+    _serializer: Serializer | None = None
+
+    def dump(self, obj, *, many: bool | None = None):
+        with timed("serialize"):
+            return self._dump(obj, many=many)
+
+    def _dump(self, obj, *, many: bool | None = None):
+        if not fast_serialization_enabled():
+            return super().dump(obj, many=many)
+        if self._serializer is None:
+            self._serializer = compile_serializer(self)
+        many = self.many if many is None else bool(many)
+        if many and obj is not None:
+            return [self._serializer(each) for each in obj]
+        return self._serializer(obj)
+
+
+class FieldNames(fields.Str):
+    """Comma separated fields of a response schema, dotted for nested fields"""
+
+    def __init__(self, schema: type[Schema], **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.response_schema = schema
+
+    def _deserialize(self, value, attr, data, **kwargs) -> tuple[str, ...]:
+        names = super()._deserialize(value, attr, data, **kwargs).split(",")
+        names = tuple(dict.fromkeys(name.strip() for name in names if name.strip()))
+        if not names:
+            raise ValidationError("Must name at least one field.")
+        schema = self.response_schema()
+        unknown = [name for name in names if not dumps_field(schema, name)]
+        if unknown:
+            raise ValidationError(f"Unknown fields: {', '.join(unknown)}.")
+        return names
+
+
+class PlainItemSchema(BaseSchema):
     """Item schema without store and tags"""
 
     id = fields.Int(dump_only=True)
@@ -10,14 +53,14 @@ class PlainItemSchema(Schema):
     price = fields.Float(required=True)
 
 
-class PlainTagSchema(Schema):
+class PlainTagSchema(BaseSchema):
     """Tag schema without store and items"""
 
     id = fields.Int(dump_only=True)
     name = fields.Str()
 
 
-class PlainStoreSchema(Schema):
+class PlainStoreSchema(BaseSchema):
     """Store schema without items and tags"""
 
     id = fields.Int(dump_only=True)
@@ -32,7 +75,20 @@ class ItemSchema(PlainItemSchema):
     tags = fields.List(fields.Nested(PlainTagSchema()), dump_only=True)
 
 
-class ItemUpdateSchema(Schema):
+class ItemBulkArgsSchema(BaseSchema):
+    """Query arguments for bulk item creation"""
+
+    atomic = fields.Bool(load_default=True)
+
+
+class ItemBulkResultSchema(BaseSchema):
+    """Result of a bulk item creation"""
+
+    created = fields.Int()
+    errors = fields.Dict(keys=fields.Str(), values=fields.Dict())
+
+
+class ItemUpdateSchema(BaseSchema):
     """Item schema for updating an item"""
 
     name = fields.Str()
@@ -46,6 +102,46 @@ class StoreSchema(PlainStoreSchema):
     tags = fields.List(fields.Nested(PlainTagSchema()), dump_only=True)
 
 
+class TagUsageSchema(BaseSchema):
+    """Tag with the number of items linked to it"""
+
+    id = fields.Int()
+    name = fields.Str()
+    item_count = fields.Int()
+
+
+class StoreSummarySchema(BaseSchema):
+    """Item and tag counts, prices and most used tags of a store"""
+
+    id = fields.Int()
+    name = fields.Str()
+    item_count = fields.Int()
+    tag_count = fields.Int()
+    min_price = fields.Float(allow_none=True)
+    max_price = fields.Float(allow_none=True)
+    avg_price = fields.Float(allow_none=True)
+    top_tags = fields.List(fields.Nested(TagUsageSchema()))
+
+
+class StoreDeletionSchema(BaseSchema):
+    """Outcome of a store deletion request"""
+
+    message = fields.Str()
+    job_id = fields.Str(metadata={"description": "Background deletion job, if any"})
+
+
+class JobSchema(BaseSchema):
+    """Status of a background job"""
+
+    id = fields.Str()
+    status = fields.Str()
+    progress = fields.Dict(keys=fields.Str())
+    result = fields.Raw(allow_none=True)
+    error = fields.Str(allow_none=True)
+    enqueued_at = fields.DateTime(allow_none=True)
+    ended_at = fields.DateTime(allow_none=True)
+
+
 class TagSchema(PlainTagSchema):
     """Tag schema with store and items"""
 
@@ -54,14 +150,76 @@ class TagSchema(PlainTagSchema):
     items = fields.List(fields.Nested(PlainItemSchema()), dump_only=True)
 
 
-class TagAndItemSchema(Schema):
+FIELDS_DESCRIPTION = "Comma separated fields to return, like id,name or items.name"
+
+
+class ItemFieldsArgsSchema(BaseSchema):
+    """Query argument selecting the item fields to return"""
+
+    field_names = FieldNames(
+        ItemSchema, data_key="fields", metadata={"description": FIELDS_DESCRIPTION}
+    )
+
+
+class StoreFieldsArgsSchema(BaseSchema):
+    """Query argument selecting the store fields to return"""
+
+    field_names = FieldNames(
+        StoreSchema, data_key="fields", metadata={"description": FIELDS_DESCRIPTION}
+    )
+
+
+class TagFieldsArgsSchema(BaseSchema):
+    """Query argument selecting the tag fields to return"""
+
+    field_names = FieldNames(
+        TagSchema, data_key="fields", metadata={"description": FIELDS_DESCRIPTION}
+    )
+
+
+ITEM_TAGS_MAX_IDS = 1000
+
+
+class ItemTagsSchema(BaseSchema):
+    """Complete set of tags of an item"""
+
+    tag_ids = fields.List(
+        fields.Int(), required=True, validate=validate.Length(max=ITEM_TAGS_MAX_IDS)
+    )
+
+
+class ItemTagsPatchSchema(BaseSchema):
+    """Tags to link to and unlink from an item"""
+
+    link = fields.List(
+        fields.Int(), load_default=list, validate=validate.Length(max=ITEM_TAGS_MAX_IDS)
+    )
+    unlink = fields.List(
+        fields.Int(), load_default=list, validate=validate.Length(max=ITEM_TAGS_MAX_IDS)
+    )
+
+    @validates_schema
+    def validate_disjoint(self, data: dict, **kwargs) -> None:
+        """Reject tags both linked and unlinked.
+
+        Args:
+            data (dict): loaded arguments
+
+        Raises:
+            ValidationError: a tag is in both lists
+        """
+        if set(data["link"]) & set(data["unlink"]):
+            raise ValidationError("Must not contain linked tags.", "unlink")
+
+
+class TagAndItemSchema(BaseSchema):
     """Tag and Item schema for creating a tag and item"""
 
     item = fields.Nested(PlainItemSchema())
     tag = fields.Nested(PlainTagSchema())
 
 
-class UserSchema(Schema):
+class UserSchema(BaseSchema):
     """User schema for login and registration"""
 
     id = fields.Int(dump_only=True)
@@ -73,3 +231,79 @@ class UserRegisterSchema(UserSchema):
     """User schema for registration"""
 
     email = fields.Email(required=True)
+
+
+class CursorPaginationArgsSchema(BaseSchema):
+    """Query arguments for keyset (cursor) pagination"""
+
+    limit = fields.Int(validate=validate.Range(min=1))
+    after = fields.Str()
+
+
+ITEM_SORT_KEYS = ("id", "-id", "name", "-name", "price", "-price")
+
+
+class ItemFilterArgsSchema(BaseSchema):
+    """Query arguments filtering and sorting items"""
+
+    min_price = fields.Float(metadata={"description": "Lowest price, inclusive"})
+    max_price = fields.Float(metadata={"description": "Highest price, inclusive"})
+    tag_id = fields.List(
+        fields.Int(),
+        validate=validate.Length(max=10),
+        metadata={"description": "Only items with every one of these tags"},
+    )
+    name_prefix = fields.Str(
+        validate=validate.Length(min=1, max=80),
+        metadata={"description": "Case sensitive prefix of the item name"},
+    )
+    sort = fields.Str(
+        validate=validate.OneOf(ITEM_SORT_KEYS),
+        metadata={"description": "Sort key, prefixed by - for descending order"},
+    )
+
+    @validates_schema
+    def validate_price_range(self, data: dict, **kwargs) -> None:
+        """Reject empty price ranges.
+
+        Args:
+            data (dict): loaded arguments
+
+        Raises:
+            ValidationError: min_price is above max_price
+        """
+        if data.get("min_price", float("-inf")) > data.get("max_price", float("inf")):
+            raise ValidationError("Must not exceed max_price.", "min_price")
+
+
+class ItemListArgsSchema(
+    ItemFilterArgsSchema, CursorPaginationArgsSchema, ItemFieldsArgsSchema
+):
+    """Query arguments of the item listing"""
+
+    store_id = fields.Int()
+
+
+class ItemSearchArgsSchema(CursorPaginationArgsSchema, ItemFieldsArgsSchema):
+    """Query arguments of the item search"""
+
+    q = fields.Str(required=True, validate=validate.Length(min=1, max=200))
+
+
+class StoreArgsSchema(ItemFilterArgsSchema, StoreFieldsArgsSchema):
+    """Query arguments of a store"""
+
+
+class StoreListArgsSchema(CursorPaginationArgsSchema, StoreFieldsArgsSchema):
+    """Query arguments of the store listing"""
+
+
+class TagListArgsSchema(CursorPaginationArgsSchema, TagFieldsArgsSchema):
+    """Query arguments of the tag listing of a store"""
+
+
+class CursorPaginationMetadataSchema(BaseSchema):
+    """Pagination metadata returned in the X-Pagination header"""
+
+    limit = fields.Int()
+    next = fields.Str(allow_none=True)
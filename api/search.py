@@ -0,0 +1,115 @@
+""" ranked item search on the database full-text indexes """
+import re
+from collections.abc import Callable, Iterable
+
+from flask_smorest import abort
+from sqlalchemy import Select, column, func, literal_column, or_, select, table, tuple_
+
+from api.db import db
+from api.models import ItemModel
+from api.models.search import POSTGRES_SEARCH_DOCUMENT, SQLITE_FTS_TABLE
+from api.pagination import decode_cursor, encode_cursor, page_size, pagination_header
+
+TERM = re.compile(r"\w+")
+LIKE_SPECIAL = re.compile(r"([\\%_])")
+
+
+def search_terms(text: str) -> list[str]:
+    """Split a search query into lower case words.
+
+    Punctuation never reaches the full-text query syntax of the database.
+
+    Args:
+        text (str): search query
+
+    Returns:
+        list[str]: words of the query
+    """
+    return [term.lower() for term in TERM.findall(text)]
+
+
+def _sqlite_ranking(terms: list[str], text: str) -> Select:
+    """Rank items matching every term as a prefix with FTS5 bm25."""
+    fts = table(SQLITE_FTS_TABLE, column("rowid"))
+    match = " AND ".join(f'"{term}"*' for term in terms)
+    return select(
+        fts.c.rowid.label("id"),
+        # bm25 is negative, the best match has the lowest score
+        func.bm25(literal_column(SQLITE_FTS_TABLE)).label("score"),
+    ).where(literal_column(SQLITE_FTS_TABLE).op("MATCH")(match))
+
+
+def _postgres_ranking(terms: list[str], text: str) -> Select:
+    """Rank items matching every term as a prefix, or the name as a substring.
+
+    Both predicates are served by GIN indexes, the tsvector one for words
+    and the trigram one for fragments inside a name.
+    """
+    document = literal_column(POSTGRES_SEARCH_DOCUMENT)
+    query = func.to_tsquery(
+        literal_column("'simple'::regconfig"),
+        " & ".join(f"{term}:*" for term in terms),
+    )
+    # backslash is the default LIKE escape character of Postgres
+    pattern = "%" + LIKE_SPECIAL.sub(r"\\\1", text.strip()) + "%"
+    relevance = func.ts_rank(document, query) + func.similarity(ItemModel.name, text)
+    return select(ItemModel.id.label("id"), (-relevance).label("score")).where(
+        or_(document.op("@@")(query), ItemModel.name.ilike(pattern))
+    )
+
+
+RANKINGS: dict[str, Callable[[list[str], str], Select]] = {
+    "sqlite": _sqlite_ranking,
+    "postgresql": _postgres_ranking,
+}
+
+
+def search_items(
+    text: str, args: dict, options: Iterable = (), where: tuple = ()
+) -> tuple[list, dict]:
+    """Search items by name and description, best matches first.
+
+    Matching, ranking and keyset pagination all happen in SQL: pages are
+    ordered by (score, id) and the ``after`` cursor carries both values of
+    the last row.
+
+    Args:
+        text (str): search query
+        args (dict): parsed CursorPaginationArgsSchema arguments
+        options (Iterable, optional): loader options of the items. Defaults to ().
+        where (tuple, optional): extra conditions on the items. Defaults to ().
+
+    Returns:
+        tuple[list, dict]: items of the page and the pagination header
+    """
+    terms = search_terms(text)
+    if not terms:
+        abort(400, message="Search query must contain a word.")
+    ranking = RANKINGS[db.engine.dialect.name]
+    ranked = ranking(terms, text).subquery("ranked")
+    limit = page_size(args.get("limit"))
+
+    statement = (
+        select(ItemModel, ranked.c.score)
+        .join(ranked, ranked.c.id == ItemModel.id)
+        .options(*options)
+        .where(*where)
+    )
+    if args.get("after"):
+        cursor = decode_cursor(args["after"])
+        last_score, last_id = cursor.get("score"), cursor.get("id")
+        if not isinstance(last_score, (int, float)) or not isinstance(last_id, int):
+            abort(400, message="Invalid pagination cursor.")
+        statement = statement.where(
+            tuple_(ranked.c.score, ranked.c.id) > tuple_(last_score, last_id)
+        )
+    # fetch one extra row to know whether there is a next page
+    rows = db.session.execute(
+        statement.order_by(ranked.c.score, ranked.c.id).limit(limit + 1)
+    ).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        item, score = rows[-1]
+        next_cursor = encode_cursor({"score": score, "id": item.id})
+    return [item for item, _ in rows], pagination_header(limit, next_cursor)
@@ -0,0 +1,344 @@
+""" synthetic catalogue generation """
+import math
+import random
+import time
+from collections.abc import Callable, Iterable, Iterator
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import Table, func, select, text
+from sqlalchemy.orm import Session
+
+from api.bulk import insert_rows
+from api.db import db
+from api.models import (
+    ItemModel,
+    ItemTags,
+    StoreModel,
+    TagModel,
+    UserModel,
+    rollup_enabled,
+)
+from api.summary import rebuild_summaries
+
+FANOUTS = ("fixed", "uniform", "poisson", "zipf")
+
+# vocabulary of item names and descriptions, so search has words to match
+ADJECTIVES = (
+    "antique", "classic", "compact", "deluxe", "folding", "heavy", "modern",
+    "portable", "rustic", "sturdy", "vintage", "wireless",
+)  # fmt: skip
+NOUNS = (
+    "bench", "blender", "chair", "clock", "desk", "kettle", "lamp", "mirror",
+    "rug", "shelf", "speaker", "table", "toaster", "vase",
+)  # fmt: skip
+MATERIALS = (
+    "bamboo", "brass", "ceramic", "copper", "glass", "leather", "linen",
+    "marble", "oak", "steel", "walnut", "wool",
+)  # fmt: skip
+
+
+def fanout_sampler(
+    distribution: str, mean: float, limit: int, rng: random.Random
+) -> Callable[[], int]:
+    """Build a sampler of the number of tags of an item.
+
+    Args:
+        distribution (str): one of FANOUTS; zipf is heavy tailed
+        mean (float): average number of tags per item
+        limit (int): maximum number of tags, the tags of a store
+        rng (random.Random): random generator
+
+    Returns:
+        Callable[[], int]: sampler
+    """
+
+    def fixed() -> float:
+        return mean
+
+    def uniform() -> float:
+        return rng.uniform(0, 2 * mean)
+
+    def poisson() -> float:
+        # Knuth, fine for the small means of tag fan-outs
+        threshold, count, product = math.exp(-mean), 0, rng.random()
+        while product > threshold:
+            count += 1
+            product *= rng.random()
+        return count
+
+    def zipf() -> float:
+        # pareto(2) - 1 has a mean of 1 and a long tail
+        return mean * (rng.paretovariate(2.0) - 1)
+
+    sample = {"fixed": fixed, "uniform": uniform, "poisson": poisson, "zipf": zipf}[
+        distribution
+    ]
+    return lambda: max(0, min(limit, round(sample())))
+
+
+def tag_picker(
+    tags: int, skew: float, rng: random.Random
+) -> Callable[[int], list[int]]:
+    """Build a picker of distinct tag ranks, popular ranks first.
+
+    Args:
+        tags (int): tags per store
+        skew (float): zipf exponent of tag popularity, 0 for uniform
+        rng (random.Random): random generator
+
+    Returns:
+        Callable[[int], list[int]]: picks k distinct ranks in [0, tags)
+    """
+    population = range(tags)
+    cum_weights = []
+    total = 0.0
+    for rank in population:
+        total += 1 / (rank + 1) ** skew
+        cum_weights.append(total)
+
+    def pick(k: int) -> list[int]:
+        if k >= tags:
+            return list(population)
+        if skew == 0:
+            return rng.sample(population, k)
+        chosen: dict[int, None] = {}
+        while len(chosen) < k:
+            for rank in rng.choices(population, cum_weights=cum_weights, k=k):
+                chosen.setdefault(rank)
+        return list(chosen)[:k]
+
+    return pick
+
+
+def _next_id(session: Session, model) -> int:
+    return (session.scalar(select(func.max(model.id))) or 0) + 1
+
+
+def _load(
+    session: Session,
+    table: Table,
+    columns: list[str],
+    units: Iterable[list[dict]],
+    length: int,
+    chunk_size: int,
+) -> int:
+    """Insert generated rows chunk by chunk, committing each chunk.
+
+    Args:
+        session (Session): database session
+        table (Table): target table
+        columns (list[str]): columns to insert
+        units (Iterable[list[dict]]): rows, grouped by progress unit
+        length (int): number of units, for the progress bar
+        chunk_size (int): rows per insert
+
+    Returns:
+        int: inserted rows
+    """
+    inserted = 0
+    started = time.perf_counter()
+    chunk: list[dict] = []
+    with click.progressbar(length=length, label=f"{table.name:<10}") as progress:
+        for rows in units:
+            chunk.extend(rows)
+            progress.update(1)
+            if len(chunk) >= chunk_size:
+                inserted += insert_rows(session, table, columns, chunk, chunk_size)
+                session.commit()
+                chunk = []
+        inserted += insert_rows(session, table, columns, chunk, chunk_size)
+        session.commit()
+    elapsed = time.perf_counter() - started
+    click.echo(f"{table.name}: {inserted} rows, {inserted / max(elapsed, 1e-9):.0f}/s")
+    return inserted
+
+
+def _reset_sequences(session: Session, tables: Iterable[Table]) -> None:
+    """Move Postgres id sequences past the explicitly inserted ids."""
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    for table in tables:
+        session.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+            )
+        )
+    session.commit()
+
+
+def seed_catalogue(
+    session: Session,
+    stores: int,
+    items_per_store: int,
+    tags_per_store: int,
+    tags_per_item: float,
+    fanout: str = "poisson",
+    tag_skew: float = 1.0,
+    users: int = 0,
+    password_hash: str = "",
+    seed: int = 0,
+    chunk_size: int = 10000,
+) -> dict[str, int]:
+    """Generate a deterministic synthetic catalogue with bulk inserts.
+
+    Ids are assigned after the current maximum of each table, so rows can
+    reference each other without reading generated keys back. The same
+    arguments on the same starting database always produce the same rows.
+
+    Args:
+        session (Session): database session
+        stores (int): stores to create
+        items_per_store (int): items per store
+        tags_per_store (int): tags per store
+        tags_per_item (float): mean number of tags linked to an item
+        fanout (str, optional): distribution of tags per item, one of FANOUTS.
+            Defaults to "poisson".
+        tag_skew (float, optional): zipf exponent of tag popularity, 0 for
+            uniform. Defaults to 1.0.
+        users (int, optional): users to create. Defaults to 0.
+        password_hash (str, optional): password hash shared by the users.
+            Defaults to "".
+        seed (int, optional): random seed. Defaults to 0.
+        chunk_size (int, optional): rows per insert. Defaults to 10000.
+
+    Returns:
+        dict[str, int]: inserted rows per table
+    """
+    rng = random.Random(seed)
+    first_user = _next_id(session, UserModel)
+    first_store = _next_id(session, StoreModel)
+    first_tag = _next_id(session, TagModel)
+    first_item = _next_id(session, ItemModel)
+    tables = {
+        model.__table__.name: model.__table__
+        for model in (UserModel, StoreModel, TagModel, ItemModel, ItemTags)
+    }
+    counts = {}
+
+    def user_rows() -> Iterator[list[dict]]:
+        for user_id in range(first_user, first_user + users):
+            yield [
+                {
+                    "id": user_id,
+                    "username": f"seed-user-{user_id}",
+                    "email": f"seed-user-{user_id}@example.com",
+                    "password": password_hash,
+                }
+            ]
+
+    def store_rows() -> Iterator[list[dict]]:
+        for store_id in range(first_store, first_store + stores):
+            yield [{"id": store_id, "name": f"seed store {store_id}"}]
+
+    def tag_rows() -> Iterator[list[dict]]:
+        for store in range(stores):
+            first = first_tag + store * tags_per_store
+            yield [
+                {
+                    "id": first + rank,
+                    "name": f"tag {rank}",
+                    "store_id": first_store + store,
+                }
+                for rank in range(tags_per_store)
+            ]
+
+    def item_row(item_id: int, number: int, store_id: int) -> dict:
+        noun = rng.choice(NOUNS)
+        return {
+            "id": item_id,
+            "name": f"{rng.choice(ADJECTIVES)} {noun} {number}",
+            "price": round(rng.uniform(0.5, 500), 2),
+            "description": f"{rng.choice(MATERIALS)} {noun}",
+            "store_id": store_id,
+        }
+
+    def item_rows() -> Iterator[list[dict]]:
+        for store in range(stores):
+            first = first_item + store * items_per_store
+            yield [
+                item_row(first + number, number, first_store + store)
+                for number in range(items_per_store)
+            ]
+
+    def link_rows() -> Iterator[list[dict]]:
+        sample = fanout_sampler(fanout, tags_per_item, tags_per_store, rng)
+        pick = tag_picker(tags_per_store, tag_skew, rng)
+        for store in range(stores):
+            first_store_tag = first_tag + store * tags_per_store
+            first = first_item + store * items_per_store
+            yield [
+                {"item_id": item_id, "tag_id": first_store_tag + rank}
+                for item_id in range(first, first + items_per_store)
+                for rank in pick(sample())
+            ]
+
+    plan = (
+        ("users", ["id", "username", "email", "password"], user_rows, users),
+        ("stores", ["id", "name"], store_rows, stores),
+        ("tags", ["id", "name", "store_id"], tag_rows, stores),
+        (
+            "items",
+            ["id", "name", "price", "description", "store_id"],
+            item_rows,
+            stores,
+        ),
+        ("item_tags", ["item_id", "tag_id"], link_rows, stores),
+    )
+    for name, columns, rows, length in plan:
+        counts[name] = _load(session, tables[name], columns, rows(), length, chunk_size)
+    _reset_sequences(session, [tables[name] for name in tables])
+    return counts
+
+
+@click.command("seed")
+@click.option("--stores", default=100, show_default=True)
+@click.option("--items-per-store", default=1000, show_default=True)
+@click.option("--tags-per-store", default=50, show_default=True)
+@click.option("--tags-per-item", default=3.0, show_default=True)
+@click.option(
+    "--fanout", type=click.Choice(FANOUTS), default="poisson", show_default=True
+)
+@click.option(
+    "--tag-skew",
+    default=1.0,
+    show_default=True,
+    help="Zipf exponent of tag popularity, 0 for uniform.",
+)
+@click.option("--users", default=100, show_default=True)
+@click.option("--password", default="password", show_default=True)
+@click.option("--seed", "seed_value", default=0, show_default=True)
+@click.option("--chunk-size", default=10000, show_default=True)
+@with_appcontext
+def seed_command(
+    stores: int,
+    items_per_store: int,
+    tags_per_store: int,
+    tags_per_item: float,
+    fanout: str,
+    tag_skew: float,
+    users: int,
+    password: str,
+    seed_value: int,
+    chunk_size: int,
+) -> None:
+    """Fill the database with a synthetic catalogue."""
+    counts = seed_catalogue(
+        db.session,
+        stores=stores,
+        items_per_store=items_per_store,
+        tags_per_store=tags_per_store,
+        tags_per_item=tags_per_item,
+        fanout=fanout,
+        tag_skew=tag_skew,
+        users=users,
+        password_hash=current_app.password_hasher.hash(password),  # type: ignore
+        seed=seed_value,
+        chunk_size=chunk_size,
+    )
+    if rollup_enabled():
+        rebuild_summaries(db.session)
+        db.session.commit()
+    click.echo(", ".join(f"{name}: {count}" for name, count in counts.items()))
@@ -0,0 +1,99 @@
+""" serializers compiled from marshmallow schemas """
+from collections.abc import Callable
+
+from flask import current_app, has_app_context
+from marshmallow import Schema, fields, missing
+
+Serializer = Callable[[object], dict]
+
+_CONVERTERS: dict[type, Callable] = {
+    fields.Integer: int,
+    fields.Float: float,
+    fields.String: str,
+}
+
+
+def fast_serialization_enabled() -> bool:
+    """Tell whether the app opted in to compiled serializers.
+
+    Returns:
+        bool: True if FAST_SERIALIZATION_ENABLED is set
+    """
+    return has_app_context() and current_app.config.get(
+        "FAST_SERIALIZATION_ENABLED", False
+    )
+
+
+def _fallback(schema: Schema) -> Serializer:
+    """Serialize one object with marshmallow."""
+    return lambda obj: Schema.dump(schema, obj, many=False)
+
+
+def compile_serializer(schema: Schema) -> Serializer:
+    """Generate a function serializing one object like ``schema.dump``.
+
+    The function is generated once from the schema's dump fields: values
+    are read with ``getattr`` and converted inline instead of going through
+    marshmallow's per-field dispatch, so its output is identical to
+    ``schema.dump(obj, many=False)``. Fields it does not know how to inline
+    (custom types, defaults, ``as_string``) are serialized by marshmallow,
+    and schemas with dump hooks are not compiled at all.
+
+    Args:
+        schema (Schema): schema instance, honoring its only/exclude
+
+    Returns:
+        Serializer: function dumping a single object to a dict
+    """
+    if any(schema._hooks.values()):  # pylint: disable=protected-access
+        return _fallback(schema)
+
+    namespace: dict = {"missing": missing, "fallback": _fallback(schema)}
+    lines = [
+        "def serialize(obj):",
+        "    if hasattr(type(obj), '__getitem__'):",
+        "        return fallback(obj)",
+        "    result = {}",
+    ]
+    for index, (name, field) in enumerate(schema.dump_fields.items()):
+        key = field.data_key if field.data_key is not None else name
+        attribute = field.attribute or name
+        value = _compile_value(field, index, namespace)
+        if value is None or "." in attribute or field.dump_default is not missing:
+            namespace[f"field_{index}"] = field
+            lines.append(f"    value = field_{index}.serialize({name!r}, obj)")
+            lines.append("    if value is not missing:")
+            lines.append(f"        result[{key!r}] = value")
+            continue
+        lines.append(f"    value = getattr(obj, {attribute!r}, missing)")
+        lines.append("    if value is not missing:")
+        lines.append(f"        result[{key!r}] = None if value is None else {value}")
+    lines.append("    return result")
+    exec("\n".join(lines), namespace)  # pylint: disable=exec-used
+    return namespace["serialize"]
+
+
+def _compile_value(field: fields.Field, index: int, namespace: dict) -> str | None:
+    """Return the expression converting a non None ``value`` of a field.
+
+    Args:
+        field (fields.Field): marshmallow field
+        index (int): position of the field, used to name helpers
+        namespace (dict): namespace of the generated function
+
+    Returns:
+        str | None: python expression, None if the field cannot be inlined
+    """
+    if type(field) in _CONVERTERS and not getattr(field, "as_string", False):
+        namespace[f"convert_{index}"] = _CONVERTERS[type(field)]
+        return f"convert_{index}(value)"
+    if type(field) is fields.Nested and not field.many and not field.schema.many:
+        namespace[f"nested_{index}"] = compile_serializer(field.schema)
+        return f"nested_{index}(value)"
+    if type(field) is fields.List and type(field.inner) is fields.Nested:
+        inner = field.inner
+        if inner.many or inner.schema.many:
+            return None
+        namespace[f"nested_{index}"] = compile_serializer(inner.schema)
+        return f"[None if each is None else nested_{index}(each) for each in value]"
+    return None
@@ -0,0 +1,78 @@
+""" clients created on first use, once per process """
+import os
+import threading
+from collections.abc import Callable
+
+
+class LazyService:
+    """Proxy creating a client on its first use in each process.
+
+    Nothing is imported or connected while the app starts, and a client
+    created before a fork, like under ``gunicorn --preload``, is replaced
+    by a new one in the child instead of sharing its sockets.
+    """
+
+    def __init__(self, factory: Callable[[], object]) -> None:
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        self._instance: object = None
+
+    def resolve(self) -> object:
+        """Return the client of this process, creating it if needed.
+
+        Returns:
+            object: client built by the factory
+        """
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._instance = self._factory()
+                    self._pid = pid
+        return self._instance
+
+    @property
+    def created(self) -> bool:
+        """Whether this process already created its client."""
+        return self._pid == os.getpid()
+
+    def __getattr__(self, name: str):
+        return getattr(self.resolve(), name)
+
+
+def redis_service(url: str) -> LazyService:
+    """Build a lazy redis connection.
+
+    Args:
+        url (str): redis URL
+
+    Returns:
+        LazyService: proxy of the redis client
+    """
+
+    def connect():
+        import redis  # pylint: disable=import-outside-toplevel
+
+        return redis.from_url(url)
+
+    return LazyService(connect)
+
+
+def queue_service(name: str, connection: LazyService) -> LazyService:
+    """Build a lazy RQ queue.
+
+    Args:
+        name (str): queue name
+        connection (LazyService): lazy redis connection of the queue
+
+    Returns:
+        LazyService: proxy of the queue
+    """
+
+    def create():
+        from rq import Queue  # pylint: disable=import-outside-toplevel
+
+        return Queue(name, connection=connection.resolve())
+
+    return LazyService(create)
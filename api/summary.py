@@ -0,0 +1,183 @@
+""" store summaries: item and tag counts, price statistics and most used tags """
+from collections import defaultdict
+from collections.abc import Sequence
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Query, Session
+
+from api.db import db
+from api.models import (
+    ItemModel,
+    ItemTags,
+    StoreModel,
+    StoreSummaryModel,
+    TagModel,
+    TagUsageModel,
+    rollup_enabled,
+)
+
+
+def _tag_count():
+    """Count the tags of the store of the enclosing query."""
+    return (
+        select(func.count(TagModel.id))
+        .where(TagModel.store_id == StoreModel.id)
+        .scalar_subquery()
+    )
+
+
+def summary_query() -> Query:
+    """Query the id, name and statistics of stores, one row per store.
+
+    With STORE_SUMMARY_ROLLUP the statistics are read from the rollup row
+    of each store, otherwise items are grouped by store. Filters on the
+    stores apply before the grouping, so a page of stores only aggregates
+    the items of that page.
+
+    Returns:
+        Query: summary rows, filtered and paginated by the caller
+    """
+    if rollup_enabled():
+        summary = StoreSummaryModel
+        return db.session.query(
+            StoreModel.id,
+            StoreModel.name,
+            func.coalesce(summary.item_count, 0).label("item_count"),
+            func.coalesce(summary.tag_count, 0).label("tag_count"),
+            summary.min_price,
+            summary.max_price,
+            (summary.price_total / func.nullif(summary.item_count, 0)).label(
+                "avg_price"
+            ),
+        ).outerjoin(summary, summary.store_id == StoreModel.id)
+    return (
+        db.session.query(
+            StoreModel.id,
+            StoreModel.name,
+            func.count(ItemModel.id).label("item_count"),
+            _tag_count().label("tag_count"),
+            func.min(ItemModel.price).label("min_price"),
+            func.max(ItemModel.price).label("max_price"),
+            func.avg(ItemModel.price).label("avg_price"),
+        )
+        .outerjoin(ItemModel, ItemModel.store_id == StoreModel.id)
+        .group_by(StoreModel.id, StoreModel.name)
+    )
+
+
+def top_tags(store_ids: Sequence[int], limit: int) -> dict[int, list[dict]]:
+    """Find the tags linked to the most items in each store.
+
+    Tags are ranked per store with a window function, so one query serves a
+    whole page of stores. Links are counted with GROUP BY over item_tags, or
+    read from the tag usage rollup.
+
+    Args:
+        store_ids (Sequence[int]): store ids
+        limit (int): tags per store
+
+    Returns:
+        dict[int, list[dict]]: id, name and item count of the tags of each
+        store, most used first
+    """
+    if not store_ids or limit < 1:
+        return {}
+    if rollup_enabled():
+        store_id, item_count = TagUsageModel.store_id, TagUsageModel.item_count
+        statement = (
+            select(store_id, TagModel.id, TagModel.name)
+            .join(TagModel, TagModel.id == TagUsageModel.tag_id)
+            .where(store_id.in_(store_ids), item_count > 0)
+        )
+    else:
+        store_id, item_count = TagModel.store_id, func.count(ItemTags.id)
+        statement = (
+            select(store_id, TagModel.id, TagModel.name)
+            .join(ItemTags, ItemTags.tag_id == TagModel.id)
+            .where(store_id.in_(store_ids))
+            .group_by(store_id, TagModel.id, TagModel.name)
+        )
+    rank = func.row_number().over(
+        partition_by=store_id, order_by=(item_count.desc(), TagModel.id)
+    )
+    ranked = statement.add_columns(
+        item_count.label("item_count"), rank.label("rank")
+    ).subquery()
+    tags = defaultdict(list)
+    for row in db.session.execute(
+        select(ranked)
+        .where(ranked.c.rank <= limit)
+        .order_by(ranked.c.store_id, ranked.c.rank)
+    ):
+        tags[row.store_id].append(
+            {"id": row.id, "name": row.name, "item_count": row.item_count}
+        )
+    return tags
+
+
+def store_summaries(rows: Sequence, limit: int) -> list[dict]:
+    """Attach the most used tags to summary rows.
+
+    Args:
+        rows (Sequence): rows of summary_query()
+        limit (int): tags per store
+
+    Returns:
+        list[dict]: summaries, dumped by StoreSummarySchema
+    """
+    tags = top_tags([row.id for row in rows], limit)
+    return [{**row._asdict(), "top_tags": tags.get(row.id, [])} for row in rows]
+
+
+def rebuild_summaries(session: Session) -> None:
+    """Recompute every rollup row from the items, tags and links.
+
+    Needed after enabling STORE_SUMMARY_ROLLUP on a database written to
+    without it, and after loading rows behind the ORM. Nothing is committed.
+
+    Args:
+        session (Session): database session
+    """
+    session.execute(delete(StoreSummaryModel))
+    session.execute(delete(TagUsageModel))
+    session.execute(
+        insert(StoreSummaryModel).from_select(
+            [
+                "store_id",
+                "item_count",
+                "tag_count",
+                "price_total",
+                "min_price",
+                "max_price",
+            ],
+            select(
+                StoreModel.id,
+                func.count(ItemModel.id),
+                _tag_count(),
+                func.coalesce(func.sum(ItemModel.price), 0),
+                func.min(ItemModel.price),
+                func.max(ItemModel.price),
+            )
+            .outerjoin(ItemModel, ItemModel.store_id == StoreModel.id)
+            .group_by(StoreModel.id),
+        )
+    )
+    session.execute(
+        insert(TagUsageModel).from_select(
+            ["tag_id", "store_id", "item_count"],
+            select(TagModel.id, TagModel.store_id, func.count(ItemTags.id))
+            .join(ItemTags, ItemTags.tag_id == TagModel.id)
+            .group_by(TagModel.id, TagModel.store_id),
+        )
+    )
+
+
+@click.command("rebuild-summaries")
+@with_appcontext
+def rebuild_summaries_command() -> None:
+    """Recompute the store summary rollups."""
+    rebuild_summaries(db.session)
+    db.session.commit()
+    click.echo(f"Rebuilt {db.session.query(StoreSummaryModel).count()} summaries")
@@ -0,0 +1,128 @@
+""" per request timings and Server-Timing header """
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from flask import Flask, Response, current_app, g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SERVER_TIMING_HEADER = "Server-Timing"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    """Remember when a statement started, for the request being handled."""
+    if has_request_context() and "sql_statements" in g:
+        conn.info.setdefault("request_statements_started", []).append(
+            time.perf_counter()
+        )
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def end_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    """Add a finished statement to the counters of the request."""
+    finish_statement(conn)
+
+
+@event.listens_for(Engine, "handle_error")
+def fail_statement(context) -> None:
+    """Add a statement that raised to the counters of the request.
+
+    Its start time would otherwise stay on the pooled connection and be
+    paired with a statement of the next request using it.
+    """
+    if context.connection is not None:
+        finish_statement(context.connection)
+
+
+def finish_statement(conn) -> None:
+    """Pop the start time of the last statement of a connection and count it.
+
+    Args:
+        conn: connection that ran the statement
+    """
+    started = conn.info.get("request_statements_started")
+    if not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+    if has_request_context() and "sql_statements" in g:
+        g.sql_statements += 1
+        g.sql_seconds += seconds
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Add the time spent in a block to a timing of the request.
+
+    Nested blocks of the same timing are only counted once.
+
+    Args:
+        name (str): timing name
+
+    Yields:
+        None: runs the block
+    """
+    if not has_request_context() or "timings" not in g or name in g.timing_active:
+        yield
+        return
+    g.timing_active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        g.timing_active.discard(name)
+        g.timings[name] = g.timings.get(name, 0.0) + time.perf_counter() - started
+
+
+def start_request() -> None:
+    """Reset the timings and SQL counters of the request."""
+    g.request_started = time.perf_counter()
+    g.sql_statements = 0
+    g.sql_seconds = 0.0
+    g.timings = {}
+    g.timing_active = set()
+
+
+def server_timing(total: float) -> str:
+    """Format the timings of the request as a Server-Timing value.
+
+    Args:
+        total (float): seconds since the request started
+
+    Returns:
+        str: header value, durations in milliseconds
+    """
+    metrics = [
+        f"{name};dur={seconds * 1000:.2f}" for name, seconds in g.timings.items()
+    ]
+    metrics.append(
+        f'db;dur={g.sql_seconds * 1000:.2f};desc="{g.sql_statements} statements"'
+    )
+    metrics.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(metrics)
+
+
+def add_server_timing(response: Response) -> Response:
+    """Add the Server-Timing header to a response when enabled.
+
+    Args:
+        response (Response): response about to be sent
+
+    Returns:
+        Response: the same response
+    """
+    if current_app.config["SERVER_TIMING_ENABLED"] and "request_started" in g:
+        total = time.perf_counter() - g.request_started
+        response.headers[SERVER_TIMING_HEADER] = server_timing(total)
+    return response
+
+
+def init_timing(app: Flask) -> None:
+    """Time the requests of an app.
+
+    Args:
+        app (Flask): the app
+    """
+    app.before_request(start_request)
+    app.after_request(add_server_timing)
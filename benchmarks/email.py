@@ -0,0 +1,96 @@
+"""Welcome email delivery throughput benchmark.
+
+Sends welcome emails to a local fake Mailgun server and reports emails/sec
+and TCP connections used, per delivery mode:
+
+    python -m benchmarks.email --emails 2000
+"""
+import argparse
+import time
+from unittest.mock import patch
+
+import requests
+
+from api import email
+from benchmarks.fake_mailgun import FakeMailgunServer
+
+
+def per_message_post(recipients: list[tuple[str, str]]) -> None:
+    """Deliver like the original module: one new connection per email."""
+    for address, username in recipients:
+        requests.post(
+            url=f"{email.MAILGUN_API_URL}/{email.MAILGUN_DOMAIN}.mailgun.org/messages",
+            auth=("api", email.MAILGUN_TOKEN),
+            data={
+                "from": f"Rcbop <postmaster@{email.MAILGUN_DOMAIN}.mailgun.org>",
+                "to": [address],
+                "subject": email.WELCOME_SUBJECT.format(username=username),
+                "text": email.WELCOME_BODY,
+                "html": email.render_template("email/welcome.html", username=username),
+            },
+            timeout=5,
+        )
+
+
+def per_message_pooled(recipients: list[tuple[str, str]]) -> None:
+    """Deliver one email per call on the pooled client."""
+    for address, username in recipients:
+        email.send_email_from_postmaster(address, username)
+
+
+def batched(recipients: list[tuple[str, str]]) -> None:
+    """Deliver with recipient-variables batch sending."""
+    email.send_welcome_emails(recipients)
+
+
+MODES = {
+    "per_message_post": per_message_post,
+    "per_message_pooled": per_message_pooled,
+    "batched": batched,
+}
+
+
+def run(emails: int) -> dict:
+    """Run every delivery mode against a fresh fake server.
+
+    Args:
+        emails (int): number of welcome emails per mode
+
+    Returns:
+        dict: results of each mode
+    """
+    recipients = [(f"user{i}@example.com", f"user{i}") for i in range(emails)]
+    results = {}
+    for name, deliver in MODES.items():
+        server = FakeMailgunServer().start()
+        with patch.multiple(
+            email,
+            MAILGUN_DOMAIN="bench",
+            MAILGUN_TOKEN="bench",
+            MAILGUN_API_URL=server.api_url,
+        ):
+            started = time.perf_counter()
+            deliver(recipients)
+            elapsed = time.perf_counter() - started
+        server.shutdown()
+        server.server_close()
+        results[name] = {
+            "seconds": round(elapsed, 3),
+            "emails_per_sec": round(server.recipients / elapsed, 1),
+            "api_calls": server.calls,
+            "connections": server.connections,
+        }
+    return results
+
+
+def main() -> None:
+    """Parse arguments and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=2000)
+    args = parser.parse_args()
+    for mode, result in run(args.emails).items():
+        print(mode, " ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Local fake of the Mailgun messages API.
+
+Accepts every ``POST .../messages`` with a Mailgun-like JSON answer and
+counts calls and recipients, over HTTP/1.1 keep-alive connections:
+
+    python -m benchmarks.fake_mailgun --port 8025
+    MAILGUN_API_URL=http://127.0.0.1:8025/v3 rq worker emails
+"""
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class FakeMailgunHandler(BaseHTTPRequestHandler):
+    """Answers messages API calls like Mailgun does."""
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, avoid delayed ACK stalls
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """Accept a message."""
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        status, body = 200, b'{"id": "<fake@mailgun>", "message": "Queued. Thank you."}'
+        if not self.path.endswith("/messages") or "to" not in form:
+            status, body = 400, b'{"message": "to parameter is missing"}'
+        else:
+            self.server.record(len(form["to"]))  # type: ignore
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        """Keep quiet."""
+
+
+class FakeMailgunServer(ThreadingHTTPServer):
+    """Threaded fake Mailgun server counting calls and recipients."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        super().__init__((host, port), FakeMailgunHandler)
+        self.calls = 0
+        self.recipients = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def record(self, recipients: int) -> None:
+        """Count an accepted call.
+
+        Args:
+            recipients (int): number of recipients of the call
+        """
+        with self._lock:
+            self.calls += 1
+            self.recipients += recipients
+
+    def process_request(self, request, client_address) -> None:
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    @property
+    def api_url(self) -> str:
+        """Base URL to use as MAILGUN_API_URL."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v3"
+
+    def start(self) -> "FakeMailgunServer":
+        """Serve in a background thread.
+
+        Returns:
+            FakeMailgunServer: the running server
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main() -> None:
+    """Parse arguments and serve until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+    server = FakeMailgunServer(args.host, args.port)
+    print(f"MAILGUN_API_URL={server.api_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Login throughput benchmark.
+
+Runs concurrent logins against an in-process app and reports logins/sec,
+overall and per core, so hashing settings can be compared:
+
+    python -m benchmarks.login --workers 0
+    python -m benchmarks.login --workers 4 --rounds 29000
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api.app import create_app
+from api.db import db
+from api.models import UserModel
+
+
+def run(logins: int, threads: int, rounds: int, workers: int) -> dict:
+    """Run the benchmark.
+
+    Args:
+        logins (int): number of logins to perform
+        threads (int): concurrent client threads
+        rounds (int): pbkdf2_sha256 rounds
+        workers (int): password hashing processes, 0 hashes inline
+
+    Returns:
+        dict: benchmark results
+    """
+    os.environ["PASSWORD_HASH_ROUNDS"] = str(rounds)
+    os.environ["PASSWORD_HASH_WORKERS"] = str(workers)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(f"sqlite:///{tmp}/bench.db", "benchmark")
+        with app.app_context():
+            db.create_all()
+            db.session.add(
+                UserModel(
+                    username="bench",
+                    password=app.password_hasher.hash("bench"),  # type: ignore
+                    email="bench@example.com",
+                )
+            )
+            db.session.commit()
+
+        def login(_) -> int:
+            with app.test_client() as client:
+                return client.post(
+                    "/login", json={"username": "bench", "password": "bench"}
+                ).status_code
+
+        # warm up the pool so process start up is not measured
+        login(None)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            statuses = list(executor.map(login, range(logins)))
+        elapsed = time.perf_counter() - started
+        app.password_hasher.shutdown()  # type: ignore
+
+    cores = os.cpu_count() or 1
+    return {
+        "logins": logins,
+        "errors": sum(status != 200 for status in statuses),
+        "seconds": round(elapsed, 3),
+        "logins_per_sec": round(logins / elapsed, 1),
+        "logins_per_sec_per_core": round(logins / elapsed / cores, 1),
+        "cores": cores,
+    }
+
+
+def main() -> None:
+    """Parse arguments and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rounds", type=int, default=29000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    for key, value in run(args.logins, args.threads, args.rounds, args.workers).items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
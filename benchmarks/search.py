@@ -0,0 +1,122 @@
+"""Item search benchmark.
+
+Seeds a synthetic catalogue, then times the first page of ``/item/search``
+queries on the full-text index against an unindexed LIKE scan over name
+and description:
+
+    python -m benchmarks.search --stores 100 --items-per-store 1000
+    python -m benchmarks.search --database-url postgresql://... --no-seed
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import and_, or_, select
+
+from api.app import create_app
+from api.db import db
+from api.models import ItemModel
+from api.search import search_items, search_terms
+from api.seed import seed_catalogue
+
+QUERIES = ("chair", "wal", "modern lamp", "steel ket", "oak table 12", "sofa")
+
+
+def like_scan(text: str, limit: int) -> list:
+    """Find items containing every word of the query, without an index.
+
+    Args:
+        text (str): search query
+        limit (int): page size
+
+    Returns:
+        list: first page of matching items, by id
+    """
+    conditions = [
+        or_(ItemModel.name.ilike(f"%{term}%"), ItemModel.description.ilike(f"%{term}%"))
+        for term in search_terms(text)
+    ]
+    return db.session.scalars(
+        select(ItemModel).where(and_(*conditions)).order_by(ItemModel.id).limit(limit)
+    ).all()
+
+
+def best_of(repeat: int, func) -> tuple[float, int]:
+    """Time a query, keeping the fastest run.
+
+    Args:
+        repeat (int): number of runs
+        func: query returning a list of rows
+
+    Returns:
+        tuple[float, int]: best time in seconds and the number of rows
+    """
+    best, rows = float("inf"), 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = len(func())
+        best = min(best, time.perf_counter() - started)
+        db.session.expunge_all()
+    return best, rows
+
+
+def run(
+    database_url: str, stores: int, items_per_store: int, seed: bool, repeat: int
+) -> dict:
+    """Run the benchmark.
+
+    Args:
+        database_url (str): database to search, created when seeding
+        stores (int): stores to seed
+        items_per_store (int): items per store to seed
+        seed (bool): whether to create and seed the database first
+        repeat (int): runs per query
+
+    Returns:
+        dict: timings of each query
+    """
+    app = create_app(database_url, "benchmark")
+    results = {}
+    with app.app_context():
+        if seed:
+            db.create_all()
+            seed_catalogue(db.session, stores, items_per_store, 10, 2.0)
+        limit = app.config["PAGINATION_DEFAULT_PAGE_SIZE"]
+        for text in QUERIES:
+            indexed_time, indexed_rows = best_of(
+                repeat, lambda: search_items(text, {"limit": limit})[0]
+            )
+            scan_time, scan_rows = best_of(repeat, lambda: like_scan(text, limit))
+            results[text] = {
+                "index_ms": round(indexed_time * 1000, 2),
+                "like_scan_ms": round(scan_time * 1000, 2),
+                "speedup": round(scan_time / indexed_time, 1),
+                "rows": indexed_rows,
+                "scan_rows": scan_rows,
+            }
+    return results
+
+
+def main() -> None:
+    """Parse arguments and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url")
+    parser.add_argument("--no-seed", dest="seed", action="store_false")
+    parser.add_argument("--stores", type=int, default=100)
+    parser.add_argument("--items-per-store", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = args.database_url or "sqlite:///" + os.path.join(
+            directory, "search.db"
+        )
+        results = run(
+            database_url, args.stores, args.items_per_store, args.seed, args.repeat
+        )
+    for text, result in results.items():
+        print(f"{text!r}", " ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
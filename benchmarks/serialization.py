@@ -0,0 +1,118 @@
+"""List response serialization benchmark.
+
+Serializes a payload of items the way ``/item`` does, with marshmallow and
+the default JSON provider, then with the compiled serializers and the
+orjson provider, and checks both produce the same document:
+
+    python -m benchmarks.serialization --items 10000
+"""
+import argparse
+import json
+import time
+from collections.abc import Callable
+
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import Schema
+
+from api.app import create_app
+from api.json_provider import OrjsonProvider
+from api.models import ItemModel, StoreModel, TagModel
+from api.schemas import ItemSchema, StoreSchema
+from api.serializers import compile_serializer
+
+
+def build_store(items: int, tags: int = 5) -> StoreModel:
+    """Build a transient store with tagged items.
+
+    Args:
+        items (int): number of items
+        tags (int, optional): number of tags of the store. Defaults to 5.
+
+    Returns:
+        StoreModel: store with its items and tags
+    """
+    store = StoreModel(id=1, name="Benchmark Store")
+    store_tags = [TagModel(id=i, name=f"tag {i}", store=store) for i in range(tags)]
+    for i in range(items):
+        ItemModel(
+            id=i,
+            name=f"item {i}",
+            price=i / 100,
+            store=store,
+            tags=store_tags[: i % (tags + 1)],
+        )
+    return store
+
+
+def best_of(repeat: int, func: Callable[[], bytes]) -> tuple[float, bytes]:
+    """Time a function, keeping the fastest run.
+
+    Args:
+        repeat (int): number of runs
+        func (Callable[[], bytes]): function to time
+
+    Returns:
+        tuple[float, bytes]: best time in seconds and the last output
+    """
+    best, output = float("inf"), b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = func()
+        best = min(best, time.perf_counter() - started)
+    return best, output
+
+
+def run(items: int, repeat: int) -> dict:
+    """Run the benchmark.
+
+    Args:
+        items (int): number of items in the payload
+        repeat (int): runs per path
+
+    Returns:
+        dict: timings of each path and payload
+    """
+    app = create_app("sqlite://", "benchmark")
+    store = build_store(items)
+    results = {}
+    with app.app_context():
+        default, fast = DefaultJSONProvider(app), OrjsonProvider(app)
+        payloads = {
+            "items": (ItemSchema(many=True), store.items),
+            "store": (StoreSchema(), store),
+        }
+        for name, (schema, obj) in payloads.items():
+            serialize = compile_serializer(schema)
+            objects = obj if schema.many else [obj]
+
+            def marshmallow_path() -> bytes:
+                return default.response(Schema.dump(schema, obj)).data
+
+            def compiled_path() -> bytes:
+                data = [serialize(each) for each in objects]
+                return fast.response(data if schema.many else data[0]).data
+
+            slow_time, slow_output = best_of(repeat, marshmallow_path)
+            fast_time, fast_output = best_of(repeat, compiled_path)
+            assert json.loads(slow_output) == json.loads(fast_output)
+            results[name] = {
+                "marshmallow_ms": round(slow_time * 1000, 1),
+                "compiled_orjson_ms": round(fast_time * 1000, 1),
+                "speedup": round(slow_time / fast_time, 1),
+                "bytes": len(fast_output),
+            }
+    return results
+
+
+def main() -> None:
+    """Parse arguments and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for name, result in run(args.items, args.repeat).items():
+        print(name, " ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Startup benchmark.
+
+Times fresh interpreters importing the app and answering their first
+request, with the OpenAPI document built from the schemas and read from a
+precomputed file, and lists the slowest imports of ``python -X importtime``:
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --slowest 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# clients imported on first use only, never by ``import api.app``
+DEFERRED_MODULES = ("alembic", "flask_migrate", "passlib", "redis", "requests", "rq")
+
+FIRST_REQUEST = """
+import json, sys, time
+started = time.perf_counter()
+from api.app import create_app
+imported = time.perf_counter()
+app = create_app("sqlite://", "benchmark")
+created = time.perf_counter()
+status = app.test_client().get("/healthcheck").status_code
+answered = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": (answered - created) * 1000,
+    "status": status,
+    "deferred_imported": [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def import_times(module: str = "api.app") -> dict[str, int]:
+    """Import a module in a fresh interpreter with ``-X importtime``.
+
+    Args:
+        module (str, optional): module to import. Defaults to "api.app".
+
+    Returns:
+        dict[str, int]: cumulative import time of each imported module, in
+        microseconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        _, _, row = line.partition("import time:")
+        parts = row.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        times[name] = max(times.get(name, 0), int(parts[1]))
+    return times
+
+
+def first_request(spec_file: str | None = None) -> dict:
+    """Start a fresh interpreter, create the app and send it a request.
+
+    Args:
+        spec_file (str | None, optional): precomputed OpenAPI document.
+            Defaults to None, building it from the schemas.
+
+    Returns:
+        dict: import, app creation, first request and whole process times
+        in milliseconds, the response status and the deferred modules
+        imported anyway
+    """
+    env = {**os.environ, "METRICS_ENABLED": "false"}
+    env.pop("OPENAPI_SPEC_FILE", None)
+    if spec_file is not None:
+        env["OPENAPI_SPEC_FILE"] = spec_file
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_REQUEST % (DEFERRED_MODULES,)],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = json.loads(result.stdout.splitlines()[-1])
+    timings["process_ms"] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def write_spec(path: str) -> None:
+    """Write the OpenAPI document built from the schemas, like ``flask openapi write``.
+
+    Args:
+        path (str): output file
+    """
+    # pylint: disable=import-outside-toplevel
+    from api.app import create_app
+
+    app = create_app("sqlite://", "benchmark")
+    Path(path).write_bytes(app.test_client().get("/openapi.json").data)
+
+
+def run(runs: int) -> dict[str, dict]:
+    """Run the benchmark.
+
+    Args:
+        runs (int): interpreters started per variant, medians are reported
+
+    Returns:
+        dict[str, dict]: median timings of each variant
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        spec_file = os.path.join(directory, "openapi.json")
+        write_spec(spec_file)
+        for variant, path in (("built spec", None), ("precomputed spec", spec_file)):
+            samples = [first_request(path) for _ in range(runs)]
+            results[variant] = {
+                key: round(statistics.median(sample[key] for sample in samples), 1)
+                for key in (
+                    "import_ms",
+                    "create_app_ms",
+                    "first_request_ms",
+                    "process_ms",
+                )
+            }
+            results[variant]["errors"] = sum(
+                sample["status"] != 200 for sample in samples
+            )
+    return results
+
+
+def main() -> None:
+    """Parse arguments and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--slowest", type=int, default=10)
+    args = parser.parse_args()
+    for variant, result in run(args.runs).items():
+        print(variant, " ".join(f"{key}={value}" for key, value in result.items()))
+    times = import_times()
+    packages = {name: micros for name, micros in times.items() if "." not in name}
+    print("slowest top level imports of api.app:")
+    for name, micros in sorted(packages.items(), key=lambda item: -item[1])[
+        : args.slowest
+    ]:
+        print(f"  {name}: {micros / 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+""" gunicorn settings, read from ./gunicorn.conf.py or with ``gunicorn -c``
+
+    gunicorn "api.app:create_app()"
+    GUNICORN_WORKER_CLASS=gevent gunicorn "api.app:create_app()"
+
+``gthread`` workers serve requests on a few threads each, password hashing
+runs in a process pool so a login only holds one of them. ``gevent``
+workers serve many concurrent requests on greenlets, bounded by the
+database pool of each worker. The app is loaded once in the master and
+forked, each worker then drops the inherited database connections and
+creates its own redis clients on first use.
+
+Every worker holds up to DATABASE_POOL_SIZE + DATABASE_MAX_OVERFLOW
+database connections, 15 by default: 17 gthread workers on 8 cores may
+open 255, above the 100 max_connections of a default Postgres. Lower
+GUNICORN_WORKERS or the pool sizes, or put pgbouncer in front.
+"""
+import os
+import shutil
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+if worker_class not in ("gthread", "gevent"):
+    raise ValueError(f"Unsupported gunicorn worker class: {worker_class}")
+
+if worker_class == "gevent":
+    # patched before the app is preloaded, so its locks and sockets cooperate
+    from gevent import monkey
+    from psycogreen.gevent import patch_psycopg
+
+    monkey.patch_all()
+    patch_psycopg()
+
+# cores available to this process, which honors cpusets of containers
+if hasattr(os, "sched_getaffinity"):
+    cores = len(os.sched_getaffinity(0))
+else:
+    cores = os.cpu_count() or 1
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:3000")
+workers = int(
+    os.getenv(
+        "GUNICORN_WORKERS", str(2 * cores + 1 if worker_class == "gthread" else cores)
+    )
+)
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+# each worker starts its own password hash pool, the cores are shared between
+# the pools. Every worker needs at least one process, so the 2 * cores + 1
+# gthread workers run about two hash processes per core: hashes of
+# concurrent logins then share the cores instead of running in parallel
+password_hash_workers = os.getenv("PASSWORD_HASH_WORKERS") or str(
+    max(1, round(cores / workers))
+)
+os.environ["PASSWORD_HASH_WORKERS"] = password_hash_workers
+# greenlets beyond the database pool of the worker wait for a connection
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "100"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+# workers are recycled at different times, never all at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+
+
+def on_starting(server) -> None:
+    """Empty the Prometheus directory, metrics of a previous run would be summed.
+
+    Args:
+        server (Arbiter): gunicorn master
+    """
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+def post_fork(server, worker) -> None:
+    """Drop the database connections a worker inherits from the master.
+
+    Args:
+        server (Arbiter): gunicorn master
+        worker (Worker): forked worker
+    """
+    if not server.cfg.preload_app:
+        return
+    # pylint: disable=import-outside-toplevel
+    from api.pool import dispose_engines
+
+    dispose_engines(server.app.wsgi())
+
+
+def child_exit(server, worker) -> None:
+    """Remove the live gauge files of an exited worker.
+
+    Args:
+        server (Arbiter): gunicorn master
+        worker (Worker): exited worker
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # pylint: disable=import-outside-toplevel
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
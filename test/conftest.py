@@ -1,5 +1,6 @@
 import pytest
 from flask_jwt_extended import create_access_token
+from sqlalchemy import event
 
 from api.app import create_app
 from api.db import db
@@ -34,3 +35,16 @@ def auth_header() -> dict:
     access_token = create_access_token(identity=1, fresh=True)
     headers = {"Authorization": "Bearer " + access_token}
     return headers
+
+
+@pytest.fixture
+def statements(db_fixture) -> list:
+    """Collect the SQL statements executed while the test runs."""
+    executed: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db_fixture.engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(db_fixture.engine, "before_cursor_execute", record)
@@ -1,4 +1,5 @@
 from api.app import create_app
+from api.db import db
 
 
 def test_create_app():
@@ -11,6 +12,22 @@ def test_create_app_with_db_url():
     assert_configs(app, "sqlite:///test.db")
 
 
+def test_create_app_with_precomputed_openapi_document(tmp_path, monkeypatch):
+    document = create_app("sqlite://").test_client().get("/openapi.json").data
+    spec_file = tmp_path / "openapi.json"
+    spec_file.write_bytes(document)
+    monkeypatch.setenv("OPENAPI_SPEC_FILE", str(spec_file))
+
+    app = create_app("sqlite://")
+
+    assert app.extensions["flask-smorest"]["ext_obj"].spec.to_dict()["paths"] == {}
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        assert client.get("/openapi.json").data == document
+        assert client.get("/healthcheck").status_code == 200
+
+
 def assert_configs(app, db_url="sqlite:///data.db"):
     assert app is not None
     assert app.config["PROPAGATE_EXCEPTIONS"] is True
@@ -23,5 +40,20 @@ def assert_configs(app, db_url="sqlite:///data.db"):
         app.config["OPENAPI_SWAGGER_UI_URL"]
         == "https://cdn.jsdelivr.net/npm/swagger-ui-dist/"
     )
+    assert app.config["OPENAPI_SPEC_FILE"] is None
     assert app.config["SQLALCHEMY_DATABASE_URI"] == db_url
     assert app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] is False
+    assert app.config["ASYNC_DATABASE_URL"] is None
+    assert app.config["PAGINATION_DEFAULT_PAGE_SIZE"] == 50
+    assert app.config["PAGINATION_MAX_PAGE_SIZE"] == 500
+    assert app.config["JWT_BLOCKLIST_BACKEND"] == "memory"
+    assert app.config["BULK_INSERT_CHUNK_SIZE"] == 1000
+    assert app.config["STORE_DELETE_ASYNC_THRESHOLD"] == 10000
+    assert app.config["STORE_DELETE_CHUNK_SIZE"] == 5000
+    assert app.config["STORE_SUMMARY_ROLLUP"] is False
+    assert app.config["STORE_SUMMARY_TOP_TAGS"] == 5
+    assert app.config["METRICS_ENABLED"] is True
+    assert app.config["SERVER_TIMING_ENABLED"] is False
+    assert app.config["FAST_SERIALIZATION_ENABLED"] is False
+    assert app.config["RESPONSE_CACHE_ENABLED"] is False
+    assert app.config["PASSWORD_HASH_ROUNDS"] == 29000
@@ -0,0 +1,205 @@
+import asyncio
+import json
+
+import pytest
+from flask_jwt_extended import create_access_token
+from starlette.requests import Request
+from starlette.testclient import TestClient
+
+from api import asgi
+from api.app import create_app
+from api.asgi import create_asgi_app, wsgi_environ
+from api.db import db
+from api.models import ItemModel, StoreModel, TagModel
+from api.pagination import PAGINATION_HEADER
+
+JWT_KEY = "test_jwt_key"
+
+
+@pytest.fixture(scope="module")
+def flask_app(tmp_path_factory):
+    path = tmp_path_factory.mktemp("asgi") / "asgi.db"
+    app = create_app(f"sqlite:///{path}", JWT_KEY)
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+        store = StoreModel(name="Async Store")
+        tags = [TagModel(name=f"tag {n}", store=store) for n in range(3)]
+        db.session.add_all(
+            ItemModel(name=f"item {n}", price=n + 0.5, store=store, tags=tags[:n])
+            for n in range(4)
+        )
+        db.session.add(StoreModel(name="Hidden Store", hidden=True))
+        db.session.commit()
+    yield app
+
+
+@pytest.fixture(scope="module")
+def ids(flask_app) -> dict:
+    with flask_app.app_context():
+        return {
+            "item": db.session.query(ItemModel.id).order_by(ItemModel.id).first()[0],
+            "store": db.session.query(StoreModel.id).filter_by(hidden=False).scalar(),
+            "hidden": db.session.query(StoreModel.id).filter_by(hidden=True).scalar(),
+            "tag": db.session.query(TagModel.id).order_by(TagModel.id).first()[0],
+        }
+
+
+@pytest.fixture(scope="module")
+def headers(flask_app) -> dict:
+    with flask_app.app_context():
+        token = create_access_token(identity=1, fresh=True)
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="module")
+def asgi_client(flask_app):
+    with TestClient(create_asgi_app(flask_app)) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def wsgi_client(flask_app):
+    return flask_app.test_client()
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/item/{item}",
+        "/item/0{item}",
+        "/item/{item}?fields=name,tags.name",
+        "/item",
+        "/item?limit=2&sort=-price",
+        "/item?store_id={store}&min_price=1&tag_id={tag}",
+        "/store/{store}",
+        "/store/0{store}",
+        "/store/{store}?fields=name,items.name",
+        "/store/{store}?min_price=1&sort=-name",
+        "/store?limit=1",
+        "/store?fields=id",
+        "/stores/{store}/tag",
+        "/stores/{store}/tag?limit=1&fields=name",
+        "/tag/{tag}",
+        "/tag/0{tag}",
+        "/tag/{tag}?fields=id,items.name",
+    ],
+)
+def test_reads_match_wsgi_mode(asgi_client, wsgi_client, headers, ids, path):
+    path = path.format(**ids)
+    expected = wsgi_client.get(path, headers=headers)
+    response = asgi_client.get(path, headers=headers)
+    assert expected.status_code == 200
+    assert response.status_code == 200
+    assert response.json() == expected.json
+    assert response.headers.get("ETag") == expected.headers.get("ETag")
+    assert response.headers.get(PAGINATION_HEADER) == expected.headers.get(
+        PAGINATION_HEADER
+    )
+
+
+def test_read_follows_the_pagination_cursor(asgi_client, headers):
+    first = asgi_client.get("/item?limit=2", headers=headers)
+    next_cursor = json.loads(first.headers[PAGINATION_HEADER])["next"]
+    second = asgi_client.get(f"/item?limit=2&after={next_cursor}", headers=headers)
+    assert [item["name"] for item in second.json()] == ["item 2", "item 3"]
+
+
+def test_detail_bypasses_the_cache(asgi_client, headers, ids):
+    response = asgi_client.get(f"/item/{ids['item']}", headers=headers)
+    assert response.headers["X-Cache"] == "BYPASS"
+
+
+def test_detail_not_modified(asgi_client, headers, ids):
+    etag = asgi_client.get(f"/tag/{ids['tag']}", headers=headers).headers["ETag"]
+    response = asgi_client.get(
+        f"/tag/{ids['tag']}", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/item/999",
+        "/store/999",
+        "/store/{hidden}",
+        "/stores/999/tag",
+        "/stores/{hidden}/tag",
+        "/tag/999",
+    ],
+)
+def test_not_found_matches_wsgi_mode(asgi_client, wsgi_client, headers, ids, path):
+    path = path.format(**ids)
+    expected = wsgi_client.get(path, headers=headers)
+    response = asgi_client.get(path, headers=headers)
+    assert response.status_code == expected.status_code == 404
+    assert response.json() == expected.json
+
+
+@pytest.mark.parametrize(
+    "path", ["/item?fields=nope", "/store?after=!!", "/item?min_price=2&max_price=1"]
+)
+def test_invalid_arguments_match_wsgi_mode(asgi_client, wsgi_client, headers, path):
+    expected = wsgi_client.get(path, headers=headers)
+    response = asgi_client.get(path, headers=headers)
+    assert response.status_code == expected.status_code
+    assert response.status_code in (400, 422)
+    assert response.json() == expected.json
+
+
+def test_auth_and_hooks_run_off_the_event_loop(mocker, asgi_client, headers, ids):
+    loops = []
+
+    def record(original):
+        def wrapper(*args, **kwargs):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return original(*args, **kwargs)
+
+        return wrapper
+
+    for name in ("verify_jwt_in_request", "before_view", "finish_response"):
+        mocker.patch(f"api.asgi.{name}", record(getattr(asgi, name)))
+    response = asgi_client.get(f"/item/{ids['item']}", headers=headers)
+    assert response.status_code == 200
+    assert loops == [None, None, None]
+
+
+def test_missing_token_matches_wsgi_mode(asgi_client, wsgi_client, ids):
+    expected = wsgi_client.get(f"/store/{ids['store']}")
+    response = asgi_client.get(f"/store/{ids['store']}")
+    assert response.status_code == expected.status_code == 401
+    assert response.json() == expected.json
+
+
+def test_other_requests_go_to_flask(asgi_client, headers):
+    response = asgi_client.post("/store", json={"name": "Posted"}, headers=headers)
+    assert response.status_code == 201
+    assert response.json()["name"] == "Posted"
+    assert asgi_client.get("/healthcheck").status_code == 200
+
+
+def test_wsgi_environ_joins_repeated_headers():
+    request = Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/item",
+            "query_string": b"limit=1",
+            "server": ("api", 3000),
+            "headers": [
+                (b"accept", b"text/html"),
+                (b"accept", b"application/json"),
+                (b"content-type", b"application/json"),
+            ],
+        }
+    )
+    environ = wsgi_environ(request)
+    assert environ["HTTP_ACCEPT"] == "text/html,application/json"
+    assert environ["CONTENT_TYPE"] == "application/json"
+    assert environ["QUERY_STRING"] == "limit=1"
+    assert environ["SERVER_PORT"] == "3000"
@@ -0,0 +1,107 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from api.auth.blocklist import (
+    InMemoryBlocklist,
+    NegativeCache,
+    RedisBlocklist,
+    create_blocklist,
+)
+
+
+def test_in_memory_blocklist_expires_tokens():
+    blocklist = InMemoryBlocklist()
+    blocklist.add("revoked", int(time.time()) + 60)
+    blocklist.add("expired", int(time.time()) - 1)
+    assert "revoked" in blocklist
+    assert "expired" not in blocklist
+    assert "unknown" not in blocklist
+
+
+def test_redis_blocklist_sets_key_expiring_with_token():
+    connection = MagicMock()
+    blocklist = RedisBlocklist(connection)
+    exp = int(time.time()) + 60
+    blocklist.add("jti", exp)
+    connection.set.assert_called_once_with("jwt:blocklist:jti", 1, exat=exp)
+
+
+def test_redis_blocklist_skips_expired_tokens():
+    connection = MagicMock()
+    RedisBlocklist(connection).add("jti", int(time.time()) - 1)
+    connection.set.assert_not_called()
+
+
+def test_redis_blocklist_negative_cache():
+    connection = MagicMock()
+    connection.exists.return_value = 0
+    blocklist = RedisBlocklist(connection)
+    assert "jti" not in blocklist
+    assert "jti" not in blocklist
+    connection.exists.assert_called_once_with("jwt:blocklist:jti")
+
+    connection.exists.return_value = 1
+    blocklist.add("jti", int(time.time()) + 60)
+    assert "jti" in blocklist
+
+
+def test_redis_blocklist_without_negative_cache():
+    connection = MagicMock()
+    connection.exists.return_value = 0
+    blocklist = RedisBlocklist(connection, negative_cache_ttl=0)
+    assert "jti" not in blocklist
+    assert "jti" not in blocklist
+    assert connection.exists.call_count == 2
+
+
+def test_negative_cache_evicts_oldest_entries():
+    cache = NegativeCache(ttl=60, maxsize=2)
+    for jti in ("a", "b", "c"):
+        cache.add(jti)
+    assert "a" not in cache
+    assert "b" in cache
+    assert "c" in cache
+
+
+def test_in_memory_blocklist_prunes_in_place():
+    blocklist = InMemoryBlocklist()
+    revoked = blocklist._revoked
+    blocklist.add("expired", int(time.time()) - 1)
+    blocklist.add("revoked", int(time.time()) + 60)
+    assert blocklist._revoked is revoked
+    assert list(revoked) == ["revoked"]
+
+
+def test_negative_cache_shared_between_threads():
+    cache = NegativeCache(ttl=60, maxsize=50)
+    errors = []
+
+    def hammer(number: int) -> None:
+        try:
+            for i in range(2000):
+                jti = f"{number}-{i % 200}"
+                cache.add(jti)
+                _ = jti in cache
+                cache.discard(f"{number}-{(i + 7) % 200}")
+        except Exception as error:  # pylint: disable=broad-except
+            errors.append(error)
+
+    threads = [threading.Thread(target=hammer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(cache._entries) <= 50
+
+
+def test_create_blocklist():
+    assert isinstance(create_blocklist("memory"), InMemoryBlocklist)
+    assert isinstance(create_blocklist("redis", MagicMock()), RedisBlocklist)
+    with pytest.raises(ValueError):
+        create_blocklist("redis")
+    with pytest.raises(ValueError):
+        create_blocklist("unknown")
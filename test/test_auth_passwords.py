@@ -0,0 +1,29 @@
+from passlib.hash import pbkdf2_sha256
+
+from api.auth.passwords import PasswordHasher
+
+
+def test_password_hasher_inline():
+    hasher = PasswordHasher(rounds=1000, workers=0)
+    password_hash = hasher.hash("secret")
+    assert pbkdf2_sha256.from_string(password_hash).rounds == 1000
+    assert hasher.verify_and_update("secret", password_hash) == (True, None)
+    assert hasher.verify_and_update("wrong", password_hash) == (False, None)
+
+
+def test_password_hasher_process_pool():
+    hasher = PasswordHasher(rounds=1000, workers=1)
+    try:
+        password_hash = hasher.hash("secret")
+        assert hasher.verify_and_update("secret", password_hash) == (True, None)
+    finally:
+        hasher.shutdown()
+
+
+def test_password_hasher_upgrades_outdated_rounds():
+    outdated = pbkdf2_sha256.using(rounds=500).hash("secret")
+    valid, new_hash = PasswordHasher(rounds=1000, workers=0).verify_and_update(
+        "secret", outdated
+    )
+    assert valid
+    assert pbkdf2_sha256.from_string(new_hash).rounds == 1000
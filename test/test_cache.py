@@ -0,0 +1,184 @@
+from unittest.mock import MagicMock
+
+import pytest
+from redis import RedisError
+
+from api.cache import ResponseCache
+from api.models import ItemModel, StoreModel, TagModel
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@pytest.fixture
+def cache(app_fixture):
+    disabled = app_fixture.cache
+    app_fixture.cache = ResponseCache(FakeRedis())
+    yield app_fixture.cache
+    app_fixture.cache = disabled
+
+
+@pytest.fixture
+def tagged_item(db_fixture):
+    store = StoreModel(name=f"Cached Store {StoreModel.query.count()}")
+    tag = TagModel(name="cached tag", store=store)
+    item = ItemModel(name="cached item", price=1, store=store, tags=[tag])
+    db_fixture.session.add(item)
+    db_fixture.session.commit()
+    return item
+
+
+def test_response_cache_disabled():
+    cache = ResponseCache(None)
+    assert cache.get("items", 1) is None
+    assert cache.set("items", 1, 1, {"id": 1}) == {"version": 1, "data": {"id": 1}}
+    assert cache.stats()["enabled"] is False
+
+
+def test_response_cache_normalizes_keys():
+    cache = ResponseCache(FakeRedis())
+    cache.set("items", "07", 1, {"id": 7})
+    assert cache.get("items", 7) == {"version": 1, "data": {"id": 7}}
+    cache.invalidate([("items", 7)])
+    assert cache.get("items", "07") is None
+    assert cache.key("items", "abc") is None
+
+
+def test_response_cache_counts_redis_errors():
+    connection = MagicMock()
+    connection.get.side_effect = RedisError
+    cache = ResponseCache(connection)
+    assert cache.get("items", 1) is None
+    assert cache.stats()["errors"] == 1
+
+
+def test_get_item_read_through(
+    test_client, cache, tagged_item, auth_header, statements
+):
+    url = f"/item/{tagged_item.id}"
+    response = test_client.get(url, headers=auth_header)
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "MISS"
+
+    statements.clear()
+    cached = test_client.get(url, headers=auth_header)
+    assert cached.headers["X-Cache"] == "HIT"
+    assert cached.json == response.json
+    assert cached.headers["ETag"] == response.headers["ETag"]
+    assert statements == []
+    assert cache.stats()["hits"] == 1
+
+    bypassed = test_client.get(
+        url, headers={**auth_header, "Cache-Control": "no-cache"}
+    )
+    assert bypassed.headers["X-Cache"] == "BYPASS"
+
+
+def test_cached_not_modified(test_client, cache, tagged_item, auth_header, statements):
+    url = f"/store/{tagged_item.store_id}"
+    etag = test_client.get(url, headers=auth_header).headers["ETag"]
+
+    statements.clear()
+    response = test_client.get(url, headers={**auth_header, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert statements == []
+
+
+def test_put_item_invalidates_embedding_entries(
+    test_client, cache, tagged_item, auth_header
+):
+    urls = [
+        f"/item/{tagged_item.id}",
+        f"/store/{tagged_item.store_id}",
+        f"/tag/{tagged_item.tags[0].id}",
+    ]
+    for url in urls:
+        test_client.get(url, headers=auth_header)
+
+    response = test_client.put(
+        urls[0], json={"name": "renamed cached item", "price": 2}, headers=auth_header
+    )
+    assert response.status_code == 200
+
+    for url in urls:
+        response = test_client.get(url, headers=auth_header)
+        assert response.headers["X-Cache"] == "MISS"
+    assert test_client.get(urls[1], headers=auth_header).json["items"][0]["name"] == (
+        "renamed cached item"
+    )
+
+
+def test_unlink_tag_invalidates_entries(test_client, cache, tagged_item, auth_header):
+    tag_id = tagged_item.tags[0].id
+    urls = [f"/item/{tagged_item.id}", f"/tag/{tag_id}"]
+    for url in urls:
+        test_client.get(url, headers=auth_header)
+
+    response = test_client.delete(
+        f"/item/{tagged_item.id}/tag/{tag_id}", headers=auth_header
+    )
+    assert response.status_code == 202
+
+    for url in urls:
+        response = test_client.get(url, headers=auth_header)
+        assert response.headers["X-Cache"] == "MISS"
+    assert response.json["items"] == []
+
+
+def test_bulk_insert_invalidates_store(test_client, cache, tagged_item, auth_header):
+    store_id = tagged_item.store_id
+    test_client.get(f"/store/{store_id}", headers=auth_header)
+
+    response = test_client.post(
+        "/item/bulk",
+        json=[{"name": "bulk cached item", "price": 1, "store_id": store_id}],
+        headers=auth_header,
+    )
+    assert response.status_code == 201
+
+    response = test_client.get(f"/store/{store_id}", headers=auth_header)
+    assert response.headers["X-Cache"] == "MISS"
+    assert len(response.json["items"]) == 2
+
+
+def test_write_between_load_and_set_is_not_cached(
+    test_client, db_fixture, cache, tagged_item, auth_header, mocker
+):
+    url = f"/item/{tagged_item.id}"
+    store_entry = cache.set
+    writes = []
+
+    def write_then_set(*args):
+        if not writes:
+            writer = db_fixture.session.session_factory()
+            writer.get(ItemModel, tagged_item.id).name = "written meanwhile"
+            writer.commit()
+            writer.close()
+            writes.append(True)
+        return store_entry(*args)
+
+    mocker.patch.object(cache, "set", side_effect=write_then_set)
+    stale = test_client.get(url, headers=auth_header)
+    assert stale.headers["X-Cache"] == "MISS"
+    assert stale.json["name"] == "cached item"
+    assert cache.get("items", tagged_item.id) is None
+
+    # requests share the session of the test app context, unlike in production
+    db_fixture.session.expire_all()
+    fresh = test_client.get(url, headers=auth_header)
+    assert fresh.headers["X-Cache"] == "MISS"
+    assert fresh.json["name"] == "written meanwhile"
+    assert fresh.headers["ETag"] != stale.headers["ETag"]
+    assert test_client.get(url, headers=auth_header).headers["X-Cache"] == "HIT"
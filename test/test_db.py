@@ -1,5 +1,77 @@
+from sqlalchemy import event
+
 from api import db
+from api.app import create_app
+from api.models import ItemModel, StoreModel, TagModel
 
 
 def test_db():
     assert db.db is not None
+
+
+def test_concurrent_writers_bump_the_version_twice(tmp_path):
+    app = create_app(f"sqlite:///{tmp_path}/versions.db", "test_jwt_key")
+    with app.app_context():
+        db.db.create_all()
+        db.db.session.add(StoreModel(name="Concurrent Store"))
+        db.db.session.commit()
+        factory = db.db.session.session_factory
+        first, second = factory(), factory()
+        stores = [session.get(StoreModel, 1) for session in (first, second)]
+        assert [store.version for store in stores] == [1, 1]
+
+        for number, (session, store) in enumerate(zip((first, second), stores)):
+            session.add(ItemModel(name=f"item {number}", price=1, store=store))
+            session.commit()
+        first.close()
+        second.close()
+
+        assert db.db.session.get(StoreModel, 1).version == 3
+
+
+def test_rename_store_bumps_its_rows_without_loading_them(tmp_path):
+    app = create_app(f"sqlite:///{tmp_path}/rename.db", "test_jwt_key")
+    with app.app_context():
+        db.db.create_all()
+        store = StoreModel(name="Renamed Store")
+        item = ItemModel(name="item", price=1, store=store)
+        tag = TagModel(name="tag", store=store, items=[item])
+        db.db.session.add_all([store, item, tag])
+        db.db.session.commit()
+        store_id, item_id, tag_id = store.id, item.id, tag.id
+        db.db.session.expunge_all()
+
+        store = db.db.session.get(StoreModel, store_id)
+        statements = []
+        event.listen(
+            db.db.engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+        store.name = "Store Renamed"
+        db.db.session.flush()
+        keys = set(db.db.session.info["touched_keys"])
+        db.db.session.commit()
+
+        # one UPDATE for the items, one for the tags and one for the store
+        assert len(statements) == 3
+        assert keys >= {("items", item_id), ("tags", tag_id), ("stores", store_id)}
+        assert db.db.session.get(ItemModel, item_id).version == 2
+        assert db.db.session.get(TagModel, tag_id).version == 2
+
+
+def test_rename_item_bumps_its_store_and_tags(tmp_path):
+    app = create_app(f"sqlite:///{tmp_path}/rename.db", "test_jwt_key")
+    with app.app_context():
+        db.db.create_all()
+        store = StoreModel(name="Item Store")
+        items = [ItemModel(name=f"item {n}", price=1, store=store) for n in range(2)]
+        tag = TagModel(name="tag", store=store, items=items[:1])
+        db.db.session.add_all([store, *items, tag])
+        db.db.session.commit()
+
+        items[0].name = "renamed"
+        db.db.session.commit()
+
+        assert [store.version, items[0].version, tag.version] == [2, 2, 2]
+        assert items[1].version == 1
@@ -1,8 +1,23 @@
-from unittest.mock import Mock, patch
+import json
+from unittest.mock import MagicMock, Mock, patch
 
 import pytest
+import requests
+from rq import Queue
+from rq.exceptions import NoSuchJobError
 
-from api.email import render_template, send_email_from_postmaster
+from api import email
+from api.email import (
+    MAILGUN_BATCH_SIZE,
+    MailgunClient,
+    drain_welcome_jobs,
+    get_client,
+    render_template,
+    requeue_unacknowledged,
+    send_email_from_postmaster,
+    send_welcome_emails,
+)
+from benchmarks.fake_mailgun import FakeMailgunServer
 
 
 def test_send_email_from_postmaster_without_mailgun_cfg():
@@ -11,7 +26,7 @@ def test_send_email_from_postmaster_without_mailgun_cfg():
         send_email_from_postmaster(email="john@doe.com", username="john")
 
 
-@patch("api.email.requests.post")
+@patch("api.email.requests.Session.post")
 @patch("api.email.MAILGUN_DOMAIN", "test")
 @patch("api.email.MAILGUN_TOKEN", "test")
 def test_send_email_from_postmaster(request_post_mock: Mock):
@@ -31,3 +46,181 @@ def test_send_email_from_postmaster(request_post_mock: Mock):
         },
         timeout=5,
     )
+
+
+@patch("api.email.MAILGUN_DOMAIN", "test")
+@patch("api.email.MAILGUN_TOKEN", "test")
+def test_get_client_is_reused():
+    """Test that consecutive emails share the client and its connection pool."""
+    assert get_client() is get_client()
+
+
+@patch("api.email.requests.Session.post")
+@patch("api.email.MAILGUN_DOMAIN", "test")
+@patch("api.email.MAILGUN_TOKEN", "test")
+def test_send_welcome_emails_batches_recipients(request_post_mock: Mock):
+    """Test that welcome emails use recipient-variables, 1000 recipients per call."""
+    recipients = [(f"user{i}@doe.com", f"user<{i}>") for i in range(1500)]
+    responses = send_welcome_emails(recipients)
+    assert len(responses) == 2
+    first, second = (call.kwargs["data"] for call in request_post_mock.call_args_list)
+    assert len(first["to"]) == MAILGUN_BATCH_SIZE
+    assert len(second["to"]) == 500
+    assert first["subject"] == (
+        "Welcome %recipient.username%! You have successfully registered to our Stores API."
+    )
+    assert "%recipient.username_html%" in first["html"]
+    variables = json.loads(second["recipient-variables"])
+    assert variables["user1499@doe.com"] == {
+        "username": "user<1499>",
+        "username_html": "user&lt;1499&gt;",
+    }
+
+
+def test_mailgun_client_keeps_connections_alive():
+    """Test that the client reuses a single connection against a live server."""
+    server = FakeMailgunServer().start()
+    client = MailgunClient("test", "test", base_url=server.api_url)
+    try:
+        for i in range(5):
+            response = client.send("subject", "body", "from", f"user{i}@doe.com", "")
+            assert response.ok
+        client.send_batch(
+            "subject", "body", "from", {"a@doe.com": {}, "b@doe.com": {}}, ""
+        )
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+    assert server.calls == 6
+    assert server.recipients == 7
+    assert server.connections == 1
+
+
+def make_job(job_id: str, func_name: str, **kwargs) -> MagicMock:
+    return MagicMock(id=job_id, func_name=func_name, kwargs=kwargs)
+
+
+class FakeRedis:
+    """Redis lists, enough for a queue and the welcome batch list."""
+
+    def __init__(self):
+        self.lists: dict[str, list[bytes]] = {}
+
+    def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, str(value).encode())
+
+    def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(str(value).encode())
+
+    def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    def lrem(self, key, count, value):
+        self.lists.get(key, []).remove(str(value).encode())
+
+    def lmove(self, source, destination, where_from, where_to):
+        assert (where_from, where_to) == ("LEFT", "RIGHT")
+        if not self.lists.get(source):
+            return None
+        value = self.lists[source].pop(0)
+        self.lists.setdefault(destination, []).append(value)
+        return value
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self):
+        for name, args in self.calls:
+            getattr(self.redis, name)(*args)
+
+
+def queued_ids(queue: Queue) -> list[str]:
+    return [job_id.decode() for job_id in queue.connection.lrange(queue.key, 0, -1)]
+
+
+def batch_ids(queue: Queue) -> list[str]:
+    return [
+        job_id.decode()
+        for job_id in queue.connection.lrange(email.batch_key(queue), 0, -1)
+    ]
+
+
+@pytest.fixture
+def queued_jobs(mocker):
+    jobs = {
+        "1": make_job("1", email.WELCOME_JOB, email="a@doe.com", username="a"),
+        "2": make_job("2", "api.other.task"),
+        "3": make_job("3", email.WELCOME_JOB, email="b@doe.com", username="b"),
+    }
+    queue = Queue(connection=FakeRedis())
+    for job_id in [*jobs, "4"]:
+        queue.push_job_id(job_id)
+    mocker.patch(
+        "api.email.Job.fetch", side_effect=lambda job_id, connection: jobs[job_id]
+    )
+    return queue, jobs
+
+
+def test_drain_welcome_jobs(mocker, queued_jobs):
+    """Test that drained welcome jobs are sent in one call and acknowledged."""
+    queue, jobs = queued_jobs
+    send = mocker.patch("api.email.send_welcome_emails", return_value=[Mock(ok=True)])
+    assert drain_welcome_jobs(queue, max_jobs=3) == 2
+    send.assert_called_once_with([("a@doe.com", "a"), ("b@doe.com", "b")])
+    assert queued_ids(queue) == ["2", "4"]
+    assert batch_ids(queue) == []
+    jobs["1"].delete.assert_called_once()
+    jobs["3"].delete.assert_called_once()
+    jobs["2"].delete.assert_not_called()
+
+
+def test_drain_welcome_jobs_acknowledges_missing_jobs(mocker, queued_jobs):
+    """Test that the ids of deleted jobs leave the batch list."""
+    queue, _ = queued_jobs
+    mocker.patch("api.email.send_welcome_emails", return_value=[Mock(ok=True)])
+    mocker.patch("api.email.Job.fetch", side_effect=NoSuchJobError())
+    assert drain_welcome_jobs(queue) == 0
+    assert queued_ids(queue) == []
+    assert batch_ids(queue) == []
+
+
+def test_drain_welcome_jobs_requeues_on_failure(mocker, queued_jobs):
+    """Test that welcome jobs go back to the queue when the batch fails."""
+    queue, jobs = queued_jobs
+    mocker.patch(
+        "api.email.send_welcome_emails", side_effect=requests.ConnectionError()
+    )
+    assert drain_welcome_jobs(queue, max_jobs=3) == 0
+    assert queued_ids(queue) == ["2", "4", "1", "3"]
+    assert batch_ids(queue) == []
+    jobs["1"].delete.assert_not_called()
+
+
+def test_drain_welcome_jobs_keeps_the_batch_on_crash(mocker, queued_jobs):
+    """Test that a batch interrupted before its acknowledgement is requeued."""
+    queue, jobs = queued_jobs
+    mocker.patch("api.email.send_welcome_emails", side_effect=KeyboardInterrupt())
+    with pytest.raises(KeyboardInterrupt):
+        drain_welcome_jobs(queue, max_jobs=3)
+    assert queued_ids(queue) == ["2", "4"]
+    assert batch_ids(queue) == ["1", "3"]
+    assert requeue_unacknowledged(queue) == 2
+    assert queued_ids(queue) == ["1", "3", "2", "4"]
+    assert batch_ids(queue) == []
+    jobs["1"].delete.assert_not_called()
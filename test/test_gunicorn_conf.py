@@ -0,0 +1,144 @@
+import os
+import runpy
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import text
+
+from api.app import create_app
+from api.db import db
+
+CONFIG = str(Path(__file__).resolve().parent.parent / "gunicorn.conf.py")
+
+
+def load_config(monkeypatch, **env) -> dict:
+    # the config exports PASSWORD_HASH_WORKERS, restored after each test
+    monkeypatch.setenv("PASSWORD_HASH_WORKERS", "")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(CONFIG)
+
+
+def test_config_defaults(monkeypatch):
+    monkeypatch.delenv("GUNICORN_WORKER_CLASS", raising=False)
+    config = load_config(monkeypatch)
+    assert config["worker_class"] == "gthread"
+    assert config["workers"] == 2 * config["cores"] + 1
+    assert config["threads"] == 4
+    assert config["preload_app"] is True
+    assert config["max_requests"] == 1000
+    assert config["max_requests_jitter"] == 100
+    assert config["bind"] == "0.0.0.0:3000"
+    # one process per gthread worker, about two per core
+    assert config["password_hash_workers"] == "1"
+    assert os.environ["PASSWORD_HASH_WORKERS"] == config["password_hash_workers"]
+
+
+def test_config_from_env(monkeypatch):
+    config = load_config(
+        monkeypatch,
+        GUNICORN_WORKERS="3",
+        GUNICORN_THREADS="8",
+        GUNICORN_PRELOAD="false",
+        GUNICORN_MAX_REQUESTS_JITTER="50",
+    )
+    assert config["workers"] == 3
+    assert config["threads"] == 8
+    assert config["preload_app"] is False
+    assert config["max_requests_jitter"] == 50
+
+
+def test_config_password_hash_workers_split_between_workers(monkeypatch, mocker):
+    mocker.patch("os.sched_getaffinity", return_value=set(range(8)))
+    config = load_config(monkeypatch, GUNICORN_WORKERS="4")
+    assert config["password_hash_workers"] == "2"
+    config = load_config(monkeypatch, GUNICORN_WORKERS="3")
+    assert config["password_hash_workers"] == "3"
+    config = load_config(monkeypatch, GUNICORN_WORKERS="17")
+    assert config["password_hash_workers"] == "1"
+    config = load_config(monkeypatch, PASSWORD_HASH_WORKERS="3")
+    assert config["password_hash_workers"] == "3"
+    assert os.environ["PASSWORD_HASH_WORKERS"] == "3"
+
+
+def test_config_gevent_patches_before_loading_the_app(monkeypatch, mocker):
+    gevent, psycogreen = MagicMock(), MagicMock()
+    mocker.patch.dict(
+        sys.modules,
+        {
+            "gevent": gevent,
+            "gevent.monkey": gevent.monkey,
+            "psycogreen": psycogreen,
+            "psycogreen.gevent": psycogreen.gevent,
+        },
+    )
+    config = load_config(monkeypatch, GUNICORN_WORKER_CLASS="gevent")
+    gevent.monkey.patch_all.assert_called_once_with()
+    psycogreen.gevent.patch_psycopg.assert_called_once_with()
+    assert config["workers"] == config["cores"]
+    assert config["worker_connections"] == 100
+
+
+def test_config_rejects_other_worker_classes(monkeypatch):
+    with pytest.raises(ValueError):
+        load_config(monkeypatch, GUNICORN_WORKER_CLASS="sync")
+
+
+def test_on_starting_empties_prometheus_directory(monkeypatch, tmp_path):
+    directory = tmp_path / "prometheus"
+    directory.mkdir()
+    (directory / "counter_1.db").write_bytes(b"")
+    config = load_config(monkeypatch, PROMETHEUS_MULTIPROC_DIR=str(directory))
+    config["on_starting"](MagicMock())
+    assert directory.is_dir()
+    assert not list(directory.iterdir())
+
+
+def test_post_fork_disposes_preloaded_engines(monkeypatch, tmp_path):
+    config = load_config(monkeypatch)
+    app = create_app(f"sqlite:///{tmp_path}/fork.db")
+    with app.app_context():
+        db.session.execute(text("SELECT 1"))
+        db.session.remove()
+        inherited = db.engine.pool
+    server = MagicMock()
+    server.app.wsgi.return_value = app
+
+    config["post_fork"](server, MagicMock())
+
+    with app.app_context():
+        assert db.engine.pool is not inherited
+    server.cfg.preload_app = False
+    server.app.wsgi.reset_mock()
+    config["post_fork"](server, MagicMock())
+    server.app.wsgi.assert_not_called()
+
+
+def test_child_exit_marks_worker_dead(monkeypatch, mocker, tmp_path):
+    mark_process_dead = mocker.patch("prometheus_client.multiprocess.mark_process_dead")
+    config = load_config(monkeypatch, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    config["child_exit"](MagicMock(), MagicMock(pid=42))
+    mark_process_dead.assert_called_once_with(42)
+
+
+def test_sessions_are_scoped_to_app_contexts_of_threads(tmp_path):
+    app = create_app(f"sqlite:///{tmp_path}/threads.db")
+    sessions, barrier = [], threading.Barrier(4)
+
+    def handle_request():
+        with app.app_context():
+            session = db.session()
+            barrier.wait()
+            assert db.session() is session
+            sessions.append(session)
+
+    threads = [threading.Thread(target=handle_request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(session) for session in sessions}) == 4
@@ -0,0 +1,44 @@
+import random
+
+from benchmarks.loadtest import CatalogueEntry, Stats, load_catalogue, resolve
+
+
+def test_load_catalogue(app_fixture):
+    catalogue, skipped = load_catalogue(app=app_fixture)
+    names = {entry.name for entry in catalogue}
+    assert {"GET /item", "GET /item/1", "POST /store", "POST /stores/1/tag"} <= names
+    assert not any(entry.path in ("/login", "/register") for entry in catalogue)
+    assert "GET /items (rest-api.postman_collection.json)" in skipped
+    store = next(entry for entry in catalogue if entry.name == "POST /store")
+    assert store.body == {"name": "store 1"}
+    assert store.source == "Insomnia-All_2023-02-23.json"
+
+
+def test_resolve_uses_dataset_ids_and_unique_names():
+    entry = CatalogueEntry("POST", "/stores/1/tag", {"name": "tag"}, "test")
+    ids = {"store": [7], "item": [3]}
+    path, body = resolve(entry, ids, random.Random(0))
+    assert path == "/stores/7/tag"
+    assert body["name"].startswith("tag ")
+    assert entry.body == {"name": "tag"}
+    item = CatalogueEntry("PUT", "/item/1", {"price": 1, "store_id": 1}, "test")
+    assert resolve(item, ids, random.Random(0)) == (
+        "/item/3",
+        {"price": 1, "store_id": 7},
+    )
+
+
+def test_stats_summary():
+    stats = Stats()
+    for millis in range(1, 101):
+        stats.add(millis / 1000, 200)
+    stats.add(0.5, 500)
+    stats.add(0.5, 404)
+    stats.add(0.5, None)
+    summary = stats.summary(seconds=1)
+    assert summary["requests"] == 103
+    assert summary["p50_ms"] == 52
+    assert summary["max_ms"] == 500
+    assert summary["error_rate"] == round(2 / 103, 4)
+    assert summary["client_error_rate"] == round(1 / 103, 4)
+    assert summary["statuses"] == {200: 100, 404: 1, 500: 1}
@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from prometheus_client import REGISTRY
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics_record_requests(test_client, db_fixture):
+    labels = {"method": "GET", "endpoint": "healthcheck.HealthCheck"}
+    requests = sample("http_requests_total", status="200", **labels)
+    statements = sample("http_request_sql_statements_sum", **labels)
+
+    for _ in range(3):
+        assert test_client.get("/healthcheck").status_code == 200
+
+    assert sample("http_requests_total", status="200", **labels) == requests + 3
+    assert sample("http_request_duration_seconds_count", **labels) >= 3
+    assert sample("http_request_sql_statements_sum", **labels) == statements + 3
+    assert sample("http_request_sql_duration_seconds_sum", **labels) > 0
+    assert sample("http_response_size_bytes_sum", **labels) > 0
+
+
+def test_metrics_label_unmatched_routes(test_client):
+    labels = {"method": "GET", "endpoint": "unmatched", "status": "404"}
+    before = sample("http_requests_total", **labels)
+    test_client.get("/does-not-exist")
+    assert sample("http_requests_total", **labels) == before + 1
+
+
+def test_metrics_endpoint(test_client):
+    test_client.get("/healthcheck")
+    response = test_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert 'http_requests_total{endpoint="healthcheck.HealthCheck"' in body
+    assert 'endpoint="metrics"' not in body
+
+
+WORKER = textwrap.dedent(
+    """
+    from api.app import create_app
+
+    app = create_app("sqlite://", "test")
+    with app.test_client() as client:
+        for _ in range({requests}):
+            client.get("/healthcheck/cache")
+        if {scrape}:
+            print(client.get("/metrics").get_data(as_text=True))
+    """
+)
+
+
+def test_metrics_aggregate_worker_processes(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+
+    def run(requests: int, scrape: bool) -> str:
+        script = WORKER.format(requests=requests, scrape=scrape)
+        return subprocess.run(
+            [sys.executable, "-c", script],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+
+    run(2, False)
+    run(3, False)
+    body = run(0, True)
+    assert (
+        'http_requests_total{endpoint="healthcheck.CacheStats",method="GET",status="200"} 5.0'
+        in body
+    )
@@ -0,0 +1,115 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from api.app import create_app
+from api.pool import (
+    InstrumentedQueuePool,
+    async_database_url,
+    build_async_engine_options,
+    build_engine_options,
+    pool_stats,
+)
+
+POSTGRES_URL = "postgresql+psycopg2://test:test@db:5432/postgres"
+
+
+def test_build_engine_options_sqlite():
+    assert build_engine_options("sqlite:///data.db") == {}
+    assert build_engine_options("sqlite://", {"echo": True}) == {"echo": True}
+
+
+def test_build_engine_options_postgres_defaults():
+    options = build_engine_options(POSTGRES_URL)
+    assert options == {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30.0,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "connect_args": {"connect_timeout": 10},
+    }
+
+
+def test_build_engine_options_postgres_from_env(monkeypatch):
+    monkeypatch.setenv("DATABASE_POOL_SIZE", "20")
+    monkeypatch.setenv("DATABASE_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DATABASE_POOL_PRE_PING", "false")
+    monkeypatch.setenv("DATABASE_STATEMENT_TIMEOUT_MS", "5000")
+    monkeypatch.setenv(
+        "DATABASE_CONNECT_ARGS",
+        '{"keepalives_idle": 30, "options": "-c lock_timeout=1000"}',
+    )
+    options = build_engine_options(POSTGRES_URL, {"pool_recycle": 60})
+    assert options["pool_size"] == 20
+    assert options["max_overflow"] == 0
+    assert options["pool_pre_ping"] is False
+    assert options["pool_recycle"] == 60
+    assert options["connect_args"] == {
+        "connect_timeout": 10,
+        "keepalives_idle": 30,
+        "options": "-c lock_timeout=1000 -c statement_timeout=5000",
+    }
+
+
+def test_async_database_url():
+    assert async_database_url("sqlite:///data.db") == "sqlite+aiosqlite:///data.db"
+    assert (
+        async_database_url(POSTGRES_URL)
+        == "postgresql+asyncpg://test:test@db:5432/postgres"
+    )
+    with pytest.raises(ValueError):
+        async_database_url("mysql://test:test@db/test")
+
+
+def test_build_async_engine_options_postgres(monkeypatch):
+    monkeypatch.setenv("DATABASE_STATEMENT_TIMEOUT_MS", "5000")
+    options = build_async_engine_options("postgresql+asyncpg://test:test@db/test")
+    assert "poolclass" not in options
+    assert options["pool_size"] == 5
+    assert options["connect_args"] == {
+        "timeout": 10,
+        "server_settings": {"statement_timeout": "5000"},
+    }
+    assert build_async_engine_options("sqlite+aiosqlite:///data.db") == {}
+
+
+def test_create_app_engine_options():
+    app = create_app("sqlite:///test.db", engine_options={"pool_pre_ping": True})
+    assert app.config["SQLALCHEMY_ENGINE_OPTIONS"] == {"pool_pre_ping": True}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/pool.db",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_instrumented_pool_reports_usage(engine):
+    first = engine.connect()
+    first.execute(text("SELECT 1"))
+    second = engine.connect()
+    stats = pool_stats(engine)
+    assert stats["pool"] == "InstrumentedQueuePool"
+    assert stats["in_use"] == 2
+    assert stats["overflow"] == 1
+    assert stats["checkouts"] == 2
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    stats = pool_stats(engine)
+    assert stats["timeouts"] == 1
+    assert stats["wait_seconds_max"] >= 0.05
+
+    first.close()
+    second.close()
+    stats = pool_stats(engine)
+    assert stats["in_use"] == 0
+    assert stats["checked_in"] == 1
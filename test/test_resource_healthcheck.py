@@ -2,3 +2,15 @@ def test_healthcheck(test_client):
     response = test_client.get("/healthcheck")
     assert response.status_code == 200
     assert response.json["message"] == "OK"
+
+
+def test_cache_stats(test_client):
+    response = test_client.get("/healthcheck/cache")
+    assert response.status_code == 200
+    assert response.json == {"enabled": False, "hits": 0, "misses": 0, "errors": 0}
+
+
+def test_pool_stats(test_client):
+    response = test_client.get("/healthcheck/pool")
+    assert response.status_code == 200
+    assert response.json["pool"] == "StaticPool"
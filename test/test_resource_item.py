@@ -1,7 +1,20 @@
-from api.models import ItemModel
+import json
+from functools import partial
+
+import pytest
+
+from api.models import ItemModel, StoreModel, TagModel
+from api.pagination import encode_cursor
 from api.schemas import ItemSchema
 
 
+@pytest.fixture(scope="module", autouse=True)
+def default_store(db_fixture):
+    """Store 1, which items of these tests belong to; foreign keys are enforced."""
+    db_fixture.session.add(StoreModel(id=1, name="Default Store"))
+    db_fixture.session.commit()
+
+
 def test_get_item(test_client, db_fixture, auth_header):
     item = ItemModel(name="test item", price=9.99, store_id=1)
     db_fixture.session.add(item)
@@ -64,3 +77,486 @@ def test_post_item(test_client, auth_header):
     new_item = ItemModel.query.filter_by(name=new_item_data["name"]).first()
     assert new_item is not None
     assert response.json == ItemSchema().dump(new_item)
+
+
+def test_post_item_unknown_store(test_client, auth_header):
+    new_item_data = {"name": "orphan item", "price": 1, "store_id": 9999}
+
+    response = test_client.post("/item", json=new_item_data, headers=auth_header)
+
+    assert response.status_code == 404
+    assert response.json["message"] == "Store not found."
+    assert ItemModel.query.filter_by(name="orphan item").first() is None
+
+
+def test_post_item_store_deleted_meanwhile(test_client, auth_header, mocker):
+    # the store is found, then gone when the row is inserted
+    mocker.patch("api.resources.item.store_visible", side_effect=[True, False])
+    new_item_data = {"name": "late item", "price": 1, "store_id": 9999}
+
+    response = test_client.post("/item", json=new_item_data, headers=auth_header)
+
+    assert response.status_code == 404
+    assert response.json["message"] == "Store not found."
+
+
+def test_get_item_list_paginated(test_client, db_fixture, auth_header):
+    db_fixture.session.query(ItemModel).delete()
+    items = [ItemModel(name=f"item {i}", price=i, store_id=1) for i in range(5)]
+    db_fixture.session.add_all(items)
+    db_fixture.session.commit()
+
+    response = test_client.get("/item?limit=2", headers=auth_header)
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json] == [items[0].id, items[1].id]
+    pagination = json.loads(response.headers["X-Pagination"])
+    assert pagination["limit"] == 2
+
+    seen = [item["id"] for item in response.json]
+    while pagination["next"]:
+        response = test_client.get(
+            f"/item?limit=2&after={pagination['next']}", headers=auth_header
+        )
+        assert response.status_code == 200
+        seen += [item["id"] for item in response.json]
+        pagination = json.loads(response.headers["X-Pagination"])
+    assert seen == [item.id for item in items]
+
+
+def test_get_item_list_page_size_capped(test_client, app_fixture, auth_header):
+    max_page_size = app_fixture.config["PAGINATION_MAX_PAGE_SIZE"]
+    response = test_client.get(f"/item?limit={max_page_size + 1}", headers=auth_header)
+    assert response.status_code == 200
+    assert json.loads(response.headers["X-Pagination"])["limit"] == max_page_size
+
+
+def test_get_item_list_invalid_cursor(test_client, auth_header):
+    response = test_client.get("/item?after=not-a-cursor", headers=auth_header)
+    assert response.status_code == 400
+
+
+def test_get_item_list_cursor_of_another_sort(test_client, db_fixture, auth_header):
+    _add_tagged_items(db_fixture, "Resorted Store", 3)
+    response = test_client.get("/item?sort=name&limit=1", headers=auth_header)
+    cursor = json.loads(response.headers["X-Pagination"])["next"]
+
+    response = test_client.get(f"/item?sort=name&after={cursor}", headers=auth_header)
+    assert response.status_code == 200
+    response = test_client.get(f"/item?sort=price&after={cursor}", headers=auth_header)
+    assert response.status_code == 400
+    assert response.json["message"] == "Invalid pagination cursor."
+    # a name where a price is expected, even when the cursor says price
+    forged = encode_cursor({"sort": "price", "key": "Resorted", "id": 1})
+    response = test_client.get(f"/item?sort=price&after={forged}", headers=auth_header)
+    assert response.status_code == 400
+
+
+def _add_tagged_items(db_fixture, name: str, count: int) -> list[int]:
+    store = StoreModel(name=name)
+    tags = [TagModel(name=f"{name} tag {i}") for i in range(2)]
+    store.tags = tags
+    items = [
+        ItemModel(name=f"{name} item {i}", price=i, tags=list(tags))
+        for i in range(count)
+    ]
+    store.items = items
+    db_fixture.session.add(store)
+    db_fixture.session.commit()
+    return [item.id for item in items]
+
+
+def test_get_item_list_statement_count(
+    test_client, db_fixture, auth_header, statements
+):
+    item_ids = set(_add_tagged_items(db_fixture, "Counted Store", 10))
+    statements.clear()
+    response = test_client.get("/item", headers=auth_header)
+
+    assert response.status_code == 200
+    tagged = [item for item in response.json if item["id"] in item_ids]
+    assert len(tagged) == 10
+    assert all(len(item["tags"]) == 2 for item in tagged)
+    # items joined with their store, then one selectin query for the tags
+    assert len(statements) == 2
+
+
+def test_get_item_statement_count(test_client, db_fixture, auth_header, statements):
+    item_id = _add_tagged_items(db_fixture, "Counted Store 2", 1)[0]
+    statements.clear()
+    response = test_client.get(f"/item/{item_id}", headers=auth_header)
+
+    assert response.status_code == 200
+    assert response.json["store"]["name"] == "Counted Store 2"
+    # version lookup for the ETag, item joined with its store, tags
+    assert len(statements) == 3
+
+
+def test_post_items_bulk(test_client, app_fixture, db_fixture, auth_header):
+    app_fixture.config["BULK_INSERT_CHUNK_SIZE"] = 2
+    store = StoreModel(name="Bulk Store")
+    db_fixture.session.add(store)
+    db_fixture.session.commit()
+    payload = [
+        {"name": f"bulk item {i}", "price": i, "store_id": store.id} for i in range(5)
+    ]
+
+    response = test_client.post("/item/bulk", json=payload, headers=auth_header)
+
+    assert response.status_code == 201
+    assert response.json == {"created": 5, "errors": {}}
+    names = [
+        name
+        for (name,) in db_fixture.session.query(ItemModel.name).filter_by(
+            store_id=store.id
+        )
+    ]
+    assert sorted(names) == [item["name"] for item in payload]
+
+
+def test_post_items_bulk_atomic_rejects_batch(test_client, db_fixture, auth_header):
+    store = StoreModel(name="Bulk Store 2")
+    db_fixture.session.add(store)
+    db_fixture.session.commit()
+    payload = [
+        {"name": "valid bulk item", "price": 1, "store_id": store.id},
+        {"name": "bulk item without price", "store_id": store.id},
+        {"name": "bulk item without store", "price": 1, "store_id": store.id + 99},
+    ]
+
+    response = test_client.post("/item/bulk", json=payload, headers=auth_header)
+
+    assert response.status_code == 422
+    assert set(response.json["errors"]) == {"1", "2"}
+    assert ItemModel.query.filter_by(store_id=store.id).count() == 0
+
+
+def test_post_items_bulk_partial(test_client, db_fixture, auth_header):
+    store = StoreModel(name="Bulk Store 3")
+    db_fixture.session.add(store)
+    db_fixture.session.commit()
+    payload = [
+        {"name": "partial bulk item", "price": 1, "store_id": store.id},
+        {"name": "partial bulk item without price", "store_id": store.id},
+        "not an item",
+    ]
+
+    response = test_client.post(
+        "/item/bulk?atomic=false", json=payload, headers=auth_header
+    )
+
+    assert response.status_code == 201
+    assert response.json["created"] == 1
+    assert response.json["errors"]["1"] == {
+        "price": ["Missing data for required field."]
+    }
+    assert "2" in response.json["errors"]
+    assert ItemModel.query.filter_by(store_id=store.id).count() == 1
+
+
+def test_post_items_bulk_requires_list(test_client, auth_header):
+    response = test_client.post("/item/bulk", json={}, headers=auth_header)
+    assert response.status_code == 400
+
+
+def test_export_items(test_client, app_fixture, db_fixture, auth_header):
+    app_fixture.config["EXPORT_YIELD_PER"] = 2
+    _add_tagged_items(db_fixture, "Export Store", 3)
+    expected = ItemSchema(many=True).dump(ItemModel.query.order_by(ItemModel.id))
+
+    response = test_client.get(
+        "/item/export",
+        headers={**auth_header, "Accept": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == expected
+
+
+def test_export_items_not_acceptable(test_client, auth_header):
+    response = test_client.get(
+        "/item/export", headers={**auth_header, "Accept": "application/xml"}
+    )
+    assert response.status_code == 406
+
+
+def test_get_item_not_modified(test_client, db_fixture, auth_header, statements):
+    item_id = _add_tagged_items(db_fixture, "ETag Store", 1)[0]
+    response = test_client.get(f"/item/{item_id}", headers=auth_header)
+    etag = response.headers["ETag"]
+
+    statements.clear()
+    response = test_client.get(
+        f"/item/{item_id}", headers={**auth_header, "If-None-Match": etag}
+    )
+
+    assert response.status_code == 304
+    assert len(statements) == 1
+
+
+def test_put_item_changes_item_and_store_etags(test_client, db_fixture, auth_header):
+    item_id = _add_tagged_items(db_fixture, "ETag Store 2", 1)[0]
+    item = db_fixture.session.get(ItemModel, item_id)
+    urls = [f"/item/{item_id}", f"/store/{item.store_id}", f"/tag/{item.tags[0].id}"]
+    etags = [test_client.get(url, headers=auth_header).headers["ETag"] for url in urls]
+
+    response = test_client.put(
+        f"/item/{item_id}", json={"name": "renamed", "price": 1}, headers=auth_header
+    )
+    assert response.status_code == 200
+
+    for url, etag in zip(urls, etags):
+        response = test_client.get(url, headers={**auth_header, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+
+def search(test_client, auth_header, **params):
+    response = test_client.get("/item/search", query_string=params, headers=auth_header)
+    if response.status_code != 200:
+        return response, None
+    return response, [item["name"] for item in response.json]
+
+
+def test_search_items(test_client, db_fixture, auth_header):
+    db_fixture.session.query(ItemModel).delete()
+    db_fixture.session.add_all(
+        [
+            ItemModel(name="Red Chair", price=1, store_id=1),
+            ItemModel(name="Blue chair", price=1, store_id=1, description="chair"),
+            ItemModel(name="Oak table", price=1, store_id=1, description="Red wood"),
+            ItemModel(name="Lamp", price=1, store_id=1),
+        ]
+    )
+    db_fixture.session.commit()
+
+    response, names = search(test_client, auth_header, q="chair")
+    assert response.status_code == 200
+    # the name and the description both match the best result
+    assert names == ["Blue chair", "Red Chair"]
+    assert search(test_client, auth_header, q="RE")[1] == ["Red Chair", "Oak table"]
+    assert search(test_client, auth_header, q="red cha")[1] == ["Red Chair"]
+    assert search(test_client, auth_header, q="sofa")[1] == []
+
+
+def test_search_items_follows_writes(test_client, db_fixture, auth_header):
+    item = ItemModel(name="searchable sofa", price=1, store_id=1)
+    db_fixture.session.add(item)
+    db_fixture.session.commit()
+    assert search(test_client, auth_header, q="sofa")[1] == ["searchable sofa"]
+
+    item.name = "searchable couch"
+    db_fixture.session.commit()
+    assert search(test_client, auth_header, q="sofa")[1] == []
+    assert search(test_client, auth_header, q="couch")[1] == ["searchable couch"]
+
+    db_fixture.session.delete(item)
+    db_fixture.session.commit()
+    assert search(test_client, auth_header, q="couch")[1] == []
+
+
+def test_search_items_paginated(test_client, db_fixture, auth_header):
+    db_fixture.session.query(ItemModel).delete()
+    db_fixture.session.add_all(
+        ItemModel(name=f"paged {'widget ' * (i % 3 + 1)}{i}", price=1, store_id=1)
+        for i in range(7)
+    )
+    db_fixture.session.commit()
+    _, expected = search(test_client, auth_header, q="widget")
+    assert len(expected) == 7
+
+    names, after = [], None
+    while True:
+        params = {"q": "widget", "limit": 3, **({"after": after} if after else {})}
+        response, page = search(test_client, auth_header, **params)
+        assert response.status_code == 200
+        names.extend(page)
+        after = json.loads(response.headers["X-Pagination"])["next"]
+        if after is None:
+            break
+    assert names == expected
+
+
+def test_search_items_invalid_query(test_client, auth_header):
+    assert search(test_client, auth_header)[0].status_code == 422
+    response, _ = search(test_client, auth_header, q="!?")
+    assert response.status_code == 400
+    assert response.json["message"] == "Search query must contain a word."
+    response, _ = search(test_client, auth_header, q="chair", after="e30")
+    assert response.status_code == 400
+
+
+def _add_catalogue(db_fixture, name: str) -> tuple[StoreModel, list[TagModel]]:
+    store = StoreModel(name=name)
+    tags = [TagModel(name=f"{name} tag {i}") for i in range(2)]
+    store.tags = tags
+    store.items = [
+        ItemModel(name="Walnut desk", price=250, tags=list(tags)),
+        ItemModel(name="walnut shelf", price=80, tags=[tags[0]]),
+        ItemModel(name="Wall clock", price=30, tags=[tags[1]]),
+        ItemModel(name="Oak desk", price=250),
+        ItemModel(name="Wa*ll art", price=30),
+    ]
+    db_fixture.session.add(store)
+    db_fixture.session.commit()
+    return store, tags
+
+
+def list_names(test_client, auth_header, url: str = "/item", **params) -> list[str]:
+    response = test_client.get(url, query_string=params, headers=auth_header)
+    assert response.status_code == 200, response.json
+    items = response.json if isinstance(response.json, list) else response.json["items"]
+    return [item["name"] for item in items]
+
+
+def test_get_item_list_filtered(test_client, db_fixture, auth_header, statements):
+    store, tags = _add_catalogue(db_fixture, "Filtered Store")
+    names = partial(list_names, test_client, auth_header, store_id=store.id)
+
+    assert names() == [
+        "Walnut desk",
+        "walnut shelf",
+        "Wall clock",
+        "Oak desk",
+        "Wa*ll art",
+    ]
+    assert names(min_price=30, max_price=80) == [
+        "walnut shelf",
+        "Wall clock",
+        "Wa*ll art",
+    ]
+    assert names(name_prefix="Wal") == ["Walnut desk", "Wall clock"]
+    assert names(name_prefix="Wa*") == ["Wa*ll art"]
+    assert names(tag_id=tags[0].id) == ["Walnut desk", "walnut shelf"]
+    assert names(tag_id=[tags[0].id, tags[1].id]) == ["Walnut desk"]
+    assert names(sort="-price", max_price=100) == [
+        "walnut shelf",
+        "Wa*ll art",
+        "Wall clock",
+    ]
+    assert names(sort="name") == [
+        "Oak desk",
+        "Wa*ll art",
+        "Wall clock",
+        "Walnut desk",
+        "walnut shelf",
+    ]
+
+    statements.clear()
+    names(tag_id=[tags[0].id, tags[1].id], min_price=1, name_prefix="W", sort="price")
+    # filtered items joined with their store, then one selectin query for the tags
+    assert len(statements) == 2
+
+
+def test_get_item_list_sorted_pages(test_client, db_fixture, auth_header):
+    store, _ = _add_catalogue(db_fixture, "Sorted Store")
+    expected = list_names(test_client, auth_header, store_id=store.id, sort="-price")
+    # ties on the price are broken by id, across pages
+    assert expected == [
+        "Oak desk",
+        "Walnut desk",
+        "walnut shelf",
+        "Wa*ll art",
+        "Wall clock",
+    ]
+
+    names, after = [], None
+    while True:
+        params = {"store_id": store.id, "sort": "-price", "limit": 2}
+        response = test_client.get(
+            "/item",
+            query_string={**params, **({"after": after} if after else {})},
+            headers=auth_header,
+        )
+        names.extend(item["name"] for item in response.json)
+        after = json.loads(response.headers["X-Pagination"])["next"]
+        if after is None:
+            break
+    assert names == expected
+
+
+def test_get_item_list_invalid_filters(test_client, auth_header):
+    for params in (
+        {"sort": "store"},
+        {"min_price": 2, "max_price": 1},
+        {"tag_id": "x"},
+    ):
+        response = test_client.get("/item", query_string=params, headers=auth_header)
+        assert response.status_code == 422
+    # an id cursor carries no sort value
+    response = test_client.get(
+        "/item?sort=price&after=eyJpZCI6MX0", headers=auth_header
+    )
+    assert response.status_code == 400
+
+
+def test_get_store_filtered_items(test_client, db_fixture, auth_header):
+    store, tags = _add_catalogue(db_fixture, "Filtered Detail Store")
+    url = f"/store/{store.id}"
+    names = partial(list_names, test_client, auth_header, url)
+
+    assert len(names()) == 5
+    assert names(tag_id=tags[1].id, sort="name") == ["Wall clock", "Walnut desk"]
+    assert names(min_price=100) == ["Walnut desk", "Oak desk"]
+
+    filtered = test_client.get(
+        url, query_string={"min_price": 100}, headers=auth_header
+    )
+    assert filtered.headers["X-Cache"] == "BYPASS"
+    full = test_client.get(url, headers=auth_header)
+    assert filtered.headers["ETag"] != full.headers["ETag"]
+    # the filtered view does not leak into the session
+    assert len(store.items) == 5
+
+
+def test_get_item_list_sparse_fields(test_client, db_fixture, auth_header, statements):
+    store_id = _add_catalogue(db_fixture, "Sparse Store")[0].id
+
+    statements.clear()
+    response = test_client.get(
+        "/item",
+        query_string={"store_id": store_id, "fields": "id,name,price", "sort": "name"},
+        headers=auth_header,
+    )
+
+    assert response.status_code == 200
+    assert [set(item) for item in response.json] == [{"id", "name", "price"}] * 5
+    # one query, neither the description nor the store or tags are loaded
+    assert len(statements) == 1
+    assert "description" not in statements[0]
+    # stores are only read by the visibility condition
+    assert "stores.name" not in statements[0]
+
+
+def test_get_item_sparse_nested_fields(test_client, db_fixture, auth_header):
+    item_id = _add_tagged_items(db_fixture, "Sparse Nested Store", 1)[0]
+    url = f"/item/{item_id}"
+
+    response = test_client.get(
+        url, query_string={"fields": "name,tags.name"}, headers=auth_header
+    )
+
+    assert response.status_code == 200
+    assert response.json == {
+        "name": "Sparse Nested Store item 0",
+        "tags": [
+            {"name": "Sparse Nested Store tag 0"},
+            {"name": "Sparse Nested Store tag 1"},
+        ],
+    }
+    assert response.headers["X-Cache"] == "BYPASS"
+    assert (
+        response.headers["ETag"]
+        != test_client.get(url, headers=auth_header).headers["ETag"]
+    )
+
+
+@pytest.mark.parametrize("fields", ["", "store_id", "description", "name.id", "tags.x"])
+def test_get_item_list_invalid_fields(test_client, auth_header, fields):
+    response = test_client.get(
+        "/item", query_string={"fields": fields}, headers=auth_header
+    )
+
+    assert response.status_code == 422
+    assert "fields" in response.json["errors"]["query"]
@@ -1,4 +1,7 @@
-from api.models import ItemModel, StoreModel, TagModel
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+from api.models import ItemModel, ItemTags, StoreModel, TagModel
 
 
 def test_link_tag_to_item(test_client, db_fixture, auth_header):
@@ -48,3 +51,159 @@ def test_link_tag_to_item_tag_not_found(test_client, db_fixture, auth_header):
 def test_unlink_tag_from_item_not_found(test_client, auth_header):
     response = test_client.delete("/item/99/tag/1", headers=auth_header)
     assert response.status_code == 404
+
+
+def test_link_tag_to_item_twice(test_client, db_fixture, auth_header):
+    store = StoreModel(name="Test Store 3")
+    db_fixture.session.add(store)
+    db_fixture.session.commit()
+    item = ItemModel(name="Test item 3", price=10.99, store_id=store.id)
+    tag = TagModel(name="Test tag 3", store_id=store.id)
+    db_fixture.session.add_all([item, tag])
+    db_fixture.session.commit()
+    for _ in range(2):
+        response = test_client.post(
+            f"/item/{item.id}/tag/{tag.id}", headers=auth_header
+        )
+        assert response.status_code == 201
+        assert [linked["id"] for linked in response.json] == [tag.id]
+    assert db_fixture.session.query(ItemTags).filter_by(item_id=item.id).count() == 1
+
+
+def test_link_tag_to_item_changes_etags(test_client, db_fixture, auth_header):
+    store = StoreModel(name="Test Store 4")
+    item = ItemModel(name="Test item 4", price=10.99, store=store)
+    tag = TagModel(name="Test tag 4", store=store)
+    db_fixture.session.add_all([store, item, tag])
+    db_fixture.session.commit()
+    urls = [f"/item/{item.id}", f"/tag/{tag.id}"]
+    etags = [test_client.get(url, headers=auth_header).headers["ETag"] for url in urls]
+
+    response = test_client.post(f"/item/{item.id}/tag/{tag.id}", headers=auth_header)
+    assert response.status_code == 201
+
+    for url, etag in zip(urls, etags):
+        response = test_client.get(url, headers={**auth_header, "If-None-Match": etag})
+        assert response.status_code == 200
+
+
+def _add_store_tags(db_fixture, name: str, count: int) -> tuple[ItemModel, list[int]]:
+    store = StoreModel(name=name)
+    item = ItemModel(name=f"{name} item", price=1, store=store)
+    tags = [TagModel(name=f"{name} tag {i}", store=store) for i in range(count)]
+    db_fixture.session.add_all([store, item, *tags])
+    db_fixture.session.commit()
+    return item, [tag.id for tag in tags]
+
+
+def test_put_item_tags(test_client, db_fixture, auth_header, statements):
+    item, tag_ids = _add_store_tags(db_fixture, "Retag Store", 30)
+    url = f"/item/{item.id}/tags"
+
+    statements.clear()
+    response = test_client.put(url, json={"tag_ids": tag_ids}, headers=auth_header)
+    assert response.status_code == 200
+    assert [tag["id"] for tag in response.json] == tag_ids
+    # check, insert, delete, two version bumps and the resulting tags
+    assert len(statements) == 6
+
+    response = test_client.put(
+        url, json={"tag_ids": tag_ids[5:10] + [tag_ids[5]]}, headers=auth_header
+    )
+    assert response.status_code == 200
+    assert [tag["id"] for tag in response.json] == tag_ids[5:10]
+    assert db_fixture.session.query(ItemTags).filter_by(item_id=item.id).count() == 5
+
+    response = test_client.put(url, json={"tag_ids": []}, headers=auth_header)
+    assert response.json == []
+
+
+def test_patch_item_tags(test_client, db_fixture, auth_header):
+    item, tag_ids = _add_store_tags(db_fixture, "Patch Tags Store", 4)
+    url = f"/item/{item.id}/tags"
+    etag = test_client.get(f"/item/{item.id}", headers=auth_header).headers["ETag"]
+
+    response = test_client.patch(url, json={"link": tag_ids[:3]}, headers=auth_header)
+    assert [tag["id"] for tag in response.json] == tag_ids[:3]
+    response = test_client.patch(
+        url, json={"link": [tag_ids[3]], "unlink": tag_ids[:2]}, headers=auth_header
+    )
+    assert response.status_code == 200
+    assert [tag["id"] for tag in response.json] == tag_ids[2:]
+
+    response = test_client.get(
+        f"/item/{item.id}", headers={**auth_header, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert [tag["id"] for tag in response.json["tags"]] == tag_ids[2:]
+    tag = test_client.get(f"/tag/{tag_ids[3]}", headers=auth_header).json
+    assert [linked["id"] for linked in tag["items"]] == [item.id]
+
+
+def test_item_tags_rejects_other_store_tags(test_client, db_fixture, auth_header):
+    item, tag_ids = _add_store_tags(db_fixture, "Own Tags Store", 2)
+    _, other_tag_ids = _add_store_tags(db_fixture, "Other Tags Store", 1)
+    url = f"/item/{item.id}/tags"
+
+    for method, body in (
+        (test_client.put, {"tag_ids": tag_ids + other_tag_ids + [9999]}),
+        (test_client.patch, {"link": other_tag_ids}),
+    ):
+        response = method(url, json=body, headers=auth_header)
+        assert response.status_code == 422
+        assert response.json["message"] == "Tags not found in the store of the item."
+    assert response.json["errors"] == {"tag_ids": other_tag_ids}
+    assert db_fixture.session.query(ItemTags).filter_by(item_id=item.id).count() == 0
+
+
+def test_item_tags_invalid(test_client, auth_header):
+    response = test_client.put(
+        "/item/9999/tags", json={"tag_ids": []}, headers=auth_header
+    )
+    assert response.status_code == 404
+    response = test_client.patch(
+        "/item/9999/tags", json={"link": [1], "unlink": [1]}, headers=auth_header
+    )
+    assert response.status_code == 422
+
+
+def _item_and_tag(db_fixture, name: str) -> tuple[int, int]:
+    store = StoreModel(name=name)
+    item = ItemModel(name=f"{name} item", price=1, store=store)
+    tag = TagModel(name=f"{name} tag", store=store)
+    db_fixture.session.add_all([item, tag])
+    db_fixture.session.commit()
+    return item.id, tag.id
+
+
+def test_link_tag_to_item_deleted_meanwhile(
+    test_client, db_fixture, auth_header, mocker
+):
+    item_id, tag_id = _item_and_tag(db_fixture, "Link Store 1")
+    error = IntegrityError("INSERT", {}, Exception("FOREIGN KEY constraint failed"))
+
+    def delete_tag_then_fail():
+        writer = db_fixture.session.session_factory()
+        writer.execute(delete(TagModel).where(TagModel.id == tag_id))
+        writer.commit()
+        writer.close()
+        raise error
+
+    mocker.patch.object(db_fixture.session, "commit", side_effect=delete_tag_then_fail)
+    response = test_client.post(f"/item/{item_id}/tag/{tag_id}", headers=auth_header)
+
+    assert response.status_code == 404
+    assert response.json["message"] == "Item or tag not found."
+
+
+def test_link_tag_to_item_other_integrity_error(
+    test_client, db_fixture, auth_header, mocker
+):
+    item_id, tag_id = _item_and_tag(db_fixture, "Link Store 2")
+    error = IntegrityError("INSERT", {}, Exception("CHECK constraint failed"))
+    mocker.patch.object(db_fixture.session, "commit", side_effect=error)
+
+    response = test_client.post(f"/item/{item_id}/tag/{tag_id}", headers=auth_header)
+
+    assert response.status_code == 500
+    assert response.json["message"].startswith("Database error")
@@ -0,0 +1,61 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from rq.exceptions import NoSuchJobError
+from rq.results import Result
+
+
+def fetched_job(mocker, status: str, result: MagicMock | None) -> MagicMock:
+    job = MagicMock(id="job-1", meta={"items": 3, "tags": 0})
+    job.get_status.return_value = status
+    job.latest_result.return_value = result
+    job.enqueued_at = datetime(2026, 10, 17, 18, 0, 0)
+    job.ended_at = datetime(2026, 10, 17, 18, 0, 5) if result else None
+    return mocker.patch("rq.job.Job.fetch", return_value=job)
+
+
+def test_get_running_job(test_client, auth_header, mocker):
+    fetch = fetched_job(mocker, "started", None)
+
+    response = test_client.get("/job/job-1", headers=auth_header)
+
+    assert response.status_code == 200
+    assert response.json == {
+        "id": "job-1",
+        "status": "started",
+        "progress": {"items": 3, "tags": 0},
+        "result": None,
+        "error": None,
+        "enqueued_at": "2026-10-17T18:00:00",
+        "ended_at": None,
+    }
+    assert fetch.call_args.args == ("job-1",)
+
+
+def test_get_finished_job(test_client, auth_header, mocker):
+    result = MagicMock(type=Result.Type.SUCCESSFUL, return_value={"items": 3})
+    fetched_job(mocker, "finished", result)
+
+    response = test_client.get("/job/job-1", headers=auth_header)
+
+    assert response.json["result"] == {"items": 3}
+    assert response.json["ended_at"] == "2026-10-17T18:00:05"
+
+
+def test_get_failed_job(test_client, auth_header, mocker):
+    result = MagicMock(
+        type=Result.Type.FAILED,
+        exc_string="Traceback (most recent call last):\n  ...\nValueError: boom\n",
+    )
+    fetched_job(mocker, "failed", result)
+
+    response = test_client.get("/job/job-1", headers=auth_header)
+
+    assert response.json["status"] == "failed"
+    assert response.json["error"] == "ValueError: boom"
+
+
+def test_get_job_not_found(test_client, auth_header, mocker):
+    mocker.patch("rq.job.Job.fetch", side_effect=NoSuchJobError)
+    response = test_client.get("/job/missing", headers=auth_header)
+    assert response.status_code == 404
@@ -1,4 +1,13 @@
-from api.models import StoreModel
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from redis import RedisError
+
+from api.jobs import delete_store_job
+from api.models import ItemModel, ItemTags, StoreModel, TagModel
+from api.schemas import StoreSchema
+from api.summary import rebuild_summaries
 
 
 def test_get_store(test_client, db_fixture, auth_header):
@@ -64,3 +73,339 @@ def test_post_store_duplicate_name(test_client, db_fixture, auth_header):
     store_data = {"name": "Test Store"}
     response = test_client.post("/store", json=store_data, headers=auth_header)
     assert response.status_code == 409
+
+
+def test_get_stores_paginated(test_client, db_fixture, auth_header):
+    db_fixture.session.rollback()
+    stores = [StoreModel(name=f"Paged Store {i}") for i in range(3)]
+    db_fixture.session.add_all(stores)
+    db_fixture.session.commit()
+
+    response = test_client.get("/store?limit=2", headers=auth_header)
+    assert response.status_code == 200
+    assert len(response.json) == 2
+    seen = [store["id"] for store in response.json]
+    cursor = json.loads(response.headers["X-Pagination"])["next"]
+    while cursor:
+        response = test_client.get(
+            f"/store?limit=2&after={cursor}", headers=auth_header
+        )
+        assert response.status_code == 200
+        seen += [store["id"] for store in response.json]
+        cursor = json.loads(response.headers["X-Pagination"])["next"]
+
+    assert seen == sorted(seen)
+    assert {store.id for store in stores} <= set(seen)
+
+
+def _add_store_with_items(db_fixture, name: str) -> StoreModel:
+    store = StoreModel(name=name)
+    store.items = [ItemModel(name=f"{name} item {i}", price=i) for i in range(3)]
+    store.tags = [TagModel(name=f"{name} tag {i}") for i in range(2)]
+    store.items[0].tags = list(store.tags)
+    db_fixture.session.add(store)
+    db_fixture.session.commit()
+    return store
+
+
+def test_get_stores_statement_count(test_client, db_fixture, auth_header, statements):
+    db_fixture.session.rollback()
+    _add_store_with_items(db_fixture, "Counted Store 0")
+    statements.clear()
+    test_client.get("/store", headers=auth_header)
+    baseline = len(statements)
+
+    for i in range(1, 6):
+        _add_store_with_items(db_fixture, f"Counted Store {i}")
+    statements.clear()
+    response = test_client.get("/store", headers=auth_header)
+
+    assert response.status_code == 200
+    assert len(statements) == baseline == 3
+
+
+def test_get_store_statement_count(test_client, db_fixture, auth_header, statements):
+    url = f"/store/{_add_store_with_items(db_fixture, 'Counted Store 6').id}"
+    statements.clear()
+    response = test_client.get(url, headers=auth_header)
+
+    assert response.status_code == 200
+    assert len(response.json["items"]) == 3
+    # version lookup for the ETag, store, items, tags
+    assert len(statements) == 4
+
+
+def test_export_stores(test_client, db_fixture, auth_header):
+    _add_store_with_items(db_fixture, "Export Store")
+    expected = StoreSchema(many=True).dump(StoreModel.query.order_by(StoreModel.id))
+
+    response = test_client.get("/store/export", headers=auth_header)
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == expected
+
+
+def test_add_tag_changes_store_etag(test_client, db_fixture, auth_header):
+    store_id = _add_store_with_items(db_fixture, "ETag Store").id
+    url = f"/store/{store_id}"
+    etag = test_client.get(url, headers=auth_header).headers["ETag"]
+    response = test_client.get(url, headers={**auth_header, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    response = test_client.post(
+        f"/stores/{store_id}/tag", json={"name": "new"}, headers=auth_header
+    )
+    assert response.status_code == 201
+
+    response = test_client.get(url, headers={**auth_header, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json["tags"]) == 3
+
+
+def _rows_of_store(db_fixture, store_id: int) -> list[int]:
+    item_ids = [
+        item_id
+        for (item_id,) in db_fixture.session.query(ItemModel.id).filter_by(
+            store_id=store_id
+        )
+    ]
+    return [
+        len(item_ids),
+        db_fixture.session.query(TagModel).filter_by(store_id=store_id).count(),
+        db_fixture.session.query(ItemTags)
+        .filter(ItemTags.item_id.in_(item_ids))
+        .count(),
+    ]
+
+
+def test_delete_store_cascades(test_client, db_fixture, auth_header, statements):
+    store_id = _add_store_with_items(db_fixture, "Cascade Store").id
+    assert _rows_of_store(db_fixture, store_id) == [3, 2, 2]
+    db_fixture.session.expunge_all()
+
+    statements.clear()
+    response = test_client.delete(f"/store/{store_id}", headers=auth_header)
+
+    assert response.status_code == 202
+    assert response.json == {"message": "Store deleted"}
+    # lookup, item count, item and tag ids to invalidate, one DELETE for the store
+    assert len(statements) == 5
+    assert _rows_of_store(db_fixture, store_id) == [0, 0, 0]
+
+
+@pytest.fixture
+def jobs_fixture(app_fixture, mocker) -> MagicMock:
+    mocker.patch.dict(app_fixture.config, {"STORE_DELETE_ASYNC_THRESHOLD": 3})
+    jobs = mocker.patch.object(app_fixture, "jobs", MagicMock())
+    jobs.enqueue.return_value.id = "job-1"
+    return jobs
+
+
+def test_delete_large_store_in_background(
+    test_client, db_fixture, auth_header, jobs_fixture
+):
+    store = _add_store_with_items(db_fixture, "Large Store")
+    store_id, item_id, tag_id = store.id, store.items[0].id, store.tags[0].id
+    url = f"/store/{store_id}"
+
+    response = test_client.delete(url, headers=auth_header)
+
+    assert response.status_code == 202
+    assert response.json == {"message": "Store deletion started", "job_id": "job-1"}
+    assert response.headers["Location"].endswith("/job/job-1")
+    jobs_fixture.enqueue.assert_called_once_with(
+        delete_store_job, store_id, 5000, job_timeout=3600
+    )
+    # hidden right away, until the job runs
+    assert test_client.get(url, headers=auth_header).status_code == 404
+    assert test_client.delete(url, headers=auth_header).status_code == 404
+    tags = test_client.get(f"/stores/{store_id}/tag", headers=auth_header)
+    assert tags.status_code == 404
+    assert tags.json["message"] == "Store not found."
+    stores = test_client.get("/store?limit=500", headers=auth_header).json
+    assert store_id not in [store["id"] for store in stores]
+    # with its items and tags, from reads and writes
+    for path in (f"/item/{item_id}", f"/tag/{tag_id}"):
+        assert test_client.get(path, headers=auth_header).status_code == 404
+    for path in ("/item?limit=500", "/item/search?q=Large", "/item/export"):
+        response = test_client.get(path, headers=auth_header)
+        assert response.status_code == 200
+        assert "Large Store" not in response.get_data(as_text=True)
+    assert "Large Store" not in test_client.get(
+        "/tag/export", headers=auth_header
+    ).get_data(as_text=True)
+    item = {"name": "late item", "price": 1, "store_id": store_id}
+    bulk = test_client.post("/item/bulk", json=[item], headers=auth_header)
+    assert bulk.status_code == 422
+    assert bulk.json["errors"] == {"0": {"store_id": ["Store not found."]}}
+    for method, path, payload in (
+        ("post", f"/stores/{store_id}/tag", {"name": "late tag"}),
+        ("post", f"/item/{item_id}/tag/{tag_id}", None),
+        ("put", f"/item/{item_id}/tags", {"tag_ids": [tag_id]}),
+        ("patch", f"/item/{item_id}/tags", {"link": [tag_id], "unlink": []}),
+    ):
+        response = getattr(test_client, method)(path, json=payload, headers=auth_header)
+        assert response.status_code == 404, path
+
+    assert delete_store_job(store_id, 2) == {"items": 3, "tags": 2}
+    assert _rows_of_store(db_fixture, store_id) == [0, 0, 0]
+    assert db_fixture.session.get(StoreModel, store_id) is None
+
+
+def test_delete_large_store_without_redis(
+    test_client, db_fixture, auth_header, jobs_fixture
+):
+    jobs_fixture.enqueue.side_effect = RedisError
+    store_id = _add_store_with_items(db_fixture, "Unreachable Store").id
+
+    response = test_client.delete(f"/store/{store_id}", headers=auth_header)
+
+    assert response.status_code == 503
+    response = test_client.get(f"/store/{store_id}", headers=auth_header)
+    assert response.status_code == 200
+
+
+def test_get_store_sparse_fields(test_client, db_fixture, auth_header, statements):
+    store_id = _add_store_with_items(db_fixture, "Sparse Store").id
+    statements.clear()
+    response = test_client.get(
+        f"/store/{store_id}", query_string={"fields": "id,name"}, headers=auth_header
+    )
+
+    assert response.status_code == 200
+    assert response.json == {"id": store_id, "name": "Sparse Store"}
+    # version lookup for the ETag and the store, items and tags are not queried
+    assert len(statements) == 2
+
+
+def test_get_stores_sparse_fields(test_client, db_fixture, auth_header, statements):
+    _add_store_with_items(db_fixture, "Sparse Store List")
+    statements.clear()
+    response = test_client.get(
+        "/store",
+        query_string={"fields": "name,items.price", "limit": 100},
+        headers=auth_header,
+    )
+
+    assert response.status_code == 200
+    listed = {each["name"]: each for each in response.json}
+    assert listed["Sparse Store List"] == {
+        "name": "Sparse Store List",
+        "items": [{"price": 0.0}, {"price": 1.0}, {"price": 2.0}],
+    }
+    # stores, then one selectin query for the items
+    assert len(statements) == 2
+
+
+def test_get_store_summary(test_client, db_fixture, auth_header, statements):
+    store_id = _add_store_with_items(db_fixture, "Summary Store").id
+    tag_ids = [
+        tag_id
+        for (tag_id,) in db_fixture.session.query(TagModel.id).filter_by(
+            store_id=store_id
+        )
+    ]
+    statements.clear()
+    response = test_client.get(f"/store/{store_id}/summary", headers=auth_header)
+
+    assert response.status_code == 200
+    assert response.json == {
+        "id": store_id,
+        "name": "Summary Store",
+        "item_count": 3,
+        "tag_count": 2,
+        "min_price": 0.0,
+        "max_price": 2.0,
+        "avg_price": 1.0,
+        "top_tags": [
+            {"id": tag_ids[0], "name": "Summary Store tag 0", "item_count": 1},
+            {"id": tag_ids[1], "name": "Summary Store tag 1", "item_count": 1},
+        ],
+    }
+    # aggregates of the store, then its ranked tags
+    assert len(statements) == 2
+
+
+def test_get_store_summary_not_found(test_client, auth_header):
+    response = test_client.get("/store/999999/summary", headers=auth_header)
+
+    assert response.status_code == 404
+
+
+def test_get_store_summaries_statement_count(
+    test_client, db_fixture, auth_header, statements
+):
+    for i in range(3):
+        _add_store_with_items(db_fixture, f"Summary Page Store {i}")
+    statements.clear()
+    response = test_client.get(
+        "/store/summary", query_string={"limit": 100}, headers=auth_header
+    )
+
+    assert response.status_code == 200
+    summaries = {summary["name"]: summary for summary in response.json}
+    assert summaries["Summary Page Store 2"]["item_count"] == 3
+    assert len(statements) == 2
+
+
+@pytest.fixture
+def rollup(app_fixture, db_fixture, mocker) -> None:
+    mocker.patch.dict(app_fixture.config, {"STORE_SUMMARY_ROLLUP": True})
+    rebuild_summaries(db_fixture.session)
+    db_fixture.session.commit()
+
+
+def _summaries(test_client, app_fixture, auth_header, rollup: bool) -> list[dict]:
+    app_fixture.config["STORE_SUMMARY_ROLLUP"] = rollup
+    try:
+        response = test_client.get(
+            "/store/summary", query_string={"limit": 500}, headers=auth_header
+        )
+    finally:
+        app_fixture.config["STORE_SUMMARY_ROLLUP"] = True
+    assert response.status_code == 200
+    for summary in response.json:
+        if summary["avg_price"] is not None:
+            summary["avg_price"] = round(summary["avg_price"], 6)
+    return response.json
+
+
+def test_store_summary_rollup_follows_writes(
+    test_client, app_fixture, db_fixture, auth_header, rollup
+):
+    store_id = _add_store_with_items(db_fixture, "Rollup Store").id
+    other_id = _add_store_with_items(db_fixture, "Other Rollup Store").id
+    item_ids = [
+        item_id
+        for (item_id,) in db_fixture.session.query(ItemModel.id).filter_by(
+            store_id=store_id
+        )
+    ]
+    tag_ids = [
+        tag_id
+        for (tag_id,) in db_fixture.session.query(TagModel.id).filter_by(
+            store_id=store_id
+        )
+    ]
+    writes = [
+        ("post", "/item", {"name": "Rollup item", "price": 50, "store_id": store_id}),
+        ("put", f"/item/{item_ids[2]}", {"name": "Cheaper", "price": 0.5}),
+        ("delete", f"/item/{item_ids[0]}", None),
+        ("post", f"/stores/{store_id}/tag", {"name": "Rollup tag"}),
+        ("post", f"/item/{item_ids[1]}/tag/{tag_ids[1]}", None),
+        ("put", f"/item/{item_ids[2]}/tags", {"tag_ids": tag_ids}),
+        ("patch", f"/item/{item_ids[2]}/tags", {"link": [], "unlink": [tag_ids[0]]}),
+        ("delete", f"/item/{item_ids[1]}/tag/{tag_ids[1]}", None),
+        ("post", "/item/bulk", [{"name": "Bulk", "price": 99, "store_id": other_id}]),
+        ("delete", f"/tag/{tag_ids[0]}", None),
+        ("delete", f"/store/{other_id}", None),
+    ]
+    for method, url, payload in writes:
+        response = getattr(test_client, method)(url, json=payload, headers=auth_header)
+        assert response.status_code < 300, (url, response.json)
+
+        assert _summaries(test_client, app_fixture, auth_header, True) == _summaries(
+            test_client, app_fixture, auth_header, False
+        ), url
@@ -1,4 +1,7 @@
-from api.models import StoreModel, TagModel
+import json
+
+from api.models import ItemModel, StoreModel, TagModel
+from api.schemas import TagSchema
 
 
 def test_get_tag_without_store(test_client, db_fixture, auth_header):
@@ -120,3 +123,86 @@ def test_add_tag_without_name_to_store(test_client, db_fixture, auth_header):
         f"/stores/{store.id}/tag", json=new_tag, headers=auth_header
     )
     assert response.status_code == 400
+
+
+def test_get_tags_in_store_paginated(test_client, db_fixture, auth_header):
+    store = StoreModel(name="Test Store 7")
+    db_fixture.session.add(store)
+    db_fixture.session.commit()
+    db_fixture.session.add_all(
+        [TagModel(name=f"Paged Tag {i}", store_id=store.id) for i in range(3)]
+    )
+    db_fixture.session.commit()
+
+    response = test_client.get(f"/stores/{store.id}/tag?limit=2", headers=auth_header)
+    assert response.status_code == 200
+    assert [tag["name"] for tag in response.json] == ["Paged Tag 0", "Paged Tag 1"]
+    cursor = json.loads(response.headers["X-Pagination"])["next"]
+
+    response = test_client.get(
+        f"/stores/{store.id}/tag?limit=2&after={cursor}", headers=auth_header
+    )
+    assert response.status_code == 200
+    assert [tag["name"] for tag in response.json] == ["Paged Tag 2"]
+
+
+def _add_tags_with_items(db_fixture, name: str) -> StoreModel:
+    store = StoreModel(name=name)
+    store.tags = [TagModel(name=f"{name} tag {i}") for i in range(5)]
+    store.items = [
+        ItemModel(name=f"{name} item {i}", price=i, tags=list(store.tags))
+        for i in range(3)
+    ]
+    db_fixture.session.add(store)
+    db_fixture.session.commit()
+    return store
+
+
+def test_get_tags_in_store_statement_count(
+    test_client, db_fixture, auth_header, statements
+):
+    url = f"/stores/{_add_tags_with_items(db_fixture, 'Counted Store').id}/tag"
+    statements.clear()
+    response = test_client.get(url, headers=auth_header)
+
+    assert response.status_code == 200
+    assert all(len(tag["items"]) == 3 for tag in response.json)
+    # store lookup, tags joined with their store, selectin query for the items
+    assert len(statements) == 3
+
+
+def test_get_tag_statement_count(test_client, db_fixture, auth_header, statements):
+    url = f"/tag/{_add_tags_with_items(db_fixture, 'Counted Store 2').tags[0].id}"
+    statements.clear()
+    response = test_client.get(url, headers=auth_header)
+
+    assert response.status_code == 200
+    assert len(response.json["items"]) == 3
+    # version lookup for the ETag, tag joined with its store, items
+    assert len(statements) == 3
+
+
+def test_export_tags(test_client, db_fixture, auth_header):
+    _add_tags_with_items(db_fixture, "Export Store")
+    expected = TagSchema(many=True).dump(TagModel.query.order_by(TagModel.id))
+
+    response = test_client.get("/tag/export", headers=auth_header)
+
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == expected
+
+
+def test_get_tags_in_store_sparse_fields(
+    test_client, db_fixture, auth_header, statements
+):
+    url = f"/stores/{_add_tags_with_items(db_fixture, 'Sparse Store').id}/tag"
+    statements.clear()
+    response = test_client.get(
+        url, query_string={"fields": "name"}, headers=auth_header
+    )
+
+    assert response.status_code == 200
+    assert all(set(tag) == {"name"} for tag in response.json)
+    # store lookup and tags, neither their store nor their items
+    assert len(statements) == 2
@@ -7,6 +7,12 @@ import api.resources.user
 from api.models import UserModel
 
 
+def delete_users(db_fixture):
+    db_fixture.session.query(UserModel).delete()
+    # ids are reused once the table is empty, drop the stale identities
+    db_fixture.session.expunge_all()
+
+
 @pytest.fixture
 def queue_fixture(mocker) -> MagicMock:
     return mocker.patch("api.resources.user.current_app.queue", MagicMock())
@@ -20,7 +26,7 @@ def user_fixture(db_fixture):
     db_fixture.session.add(user)
     db_fixture.session.commit()
     yield user
-    db_fixture.session.query(UserModel).delete()
+    delete_users(db_fixture)
 
 
 def test_register_user(test_client, db_fixture, queue_fixture):
@@ -29,7 +35,7 @@ def test_register_user(test_client, db_fixture, queue_fixture):
     assert response.status_code == 201
     assert response.json["message"] == "User registered!"
     assert db_fixture.session.query(UserModel).count() == 1
-    db_fixture.session.query(UserModel).delete()
+    delete_users(db_fixture)
 
 
 def test_register_user_with_error(test_client, db_fixture, queue_fixture):
@@ -38,7 +44,7 @@ def test_register_user_with_error(test_client, db_fixture, queue_fixture):
     response = test_client.post("/register", json=user_data)
     assert response.status_code == 500
     assert response.json["message"] == "Internal server error"
-    db_fixture.session.query(UserModel).delete()
+    delete_users(db_fixture)
 
 
 def test_register_user_invalid_request(test_client, db_fixture):
@@ -126,3 +132,24 @@ def test_refresh_token(test_client, tokens):
     )
     assert response.status_code == 200
     assert "access_token" in response.json
+
+
+def test_login_upgrades_outdated_hash(test_client, db_fixture):
+    user = UserModel(
+        username="outdated",
+        password=pbkdf2_sha256.using(rounds=1000).hash("test"),
+        email="outdated@doe.com",
+    )
+    db_fixture.session.add(user)
+    db_fixture.session.commit()
+
+    response = test_client.post(
+        "/login", json={"username": "outdated", "password": "test"}
+    )
+
+    assert response.status_code == 200
+    db_fixture.session.refresh(user)
+    assert pbkdf2_sha256.from_string(user.password).rounds == 29000
+    assert pbkdf2_sha256.verify("test", user.password)
+    db_fixture.session.delete(user)
+    db_fixture.session.commit()
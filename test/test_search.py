@@ -0,0 +1,24 @@
+from sqlalchemy.dialects import postgresql
+
+from api.search import _postgres_ranking, search_terms
+
+
+def test_search_terms():
+    assert search_terms(' Red "chair"* -OR (tablé) ') == ["red", "chair", "or", "tablé"]
+    assert search_terms("?!") == []
+
+
+def test_postgres_ranking_uses_indexed_expressions():
+    compiled = _postgres_ranking(["red", "cha"], "red cha_").compile(
+        dialect=postgresql.dialect()
+    )
+    sql = str(compiled)
+    assert (
+        "to_tsvector('simple'::regconfig, "
+        "coalesce(name, '') || ' ' || coalesce(description, '')) @@ "
+        "to_tsquery('simple'::regconfig, %(to_tsquery_1)s)"
+    ) in sql
+    assert "items.name ILIKE %(name_1)s" in sql
+    assert compiled.params["to_tsquery_1"] == "red:* & cha:*"
+    assert compiled.params["name_1"] == "%red cha\\_%"
+    assert compiled.params["similarity_1"] == "red cha_"
@@ -0,0 +1,76 @@
+import random
+import statistics
+
+import pytest
+from sqlalchemy import func, select
+
+from api.app import create_app
+from api.db import db
+from api.models import ItemModel, ItemTags, StoreModel, TagModel, UserModel
+from api.seed import FANOUTS, fanout_sampler, seed_catalogue, tag_picker
+
+
+def test_seed_command(app_fixture, db_fixture):
+    stores_before = StoreModel.query.count()
+    result = app_fixture.test_cli_runner().invoke(
+        args=[
+            "seed",
+            "--stores", "3",
+            "--items-per-store", "20",
+            "--tags-per-store", "4",
+            "--tags-per-item", "2",
+            "--users", "2",
+            "--chunk-size", "7",
+        ]
+    )  # fmt: skip
+    assert result.exit_code == 0, result.output
+    assert "items: 60" in result.output
+    assert StoreModel.query.count() == stores_before + 3
+    assert UserModel.query.filter(UserModel.username.like("seed-user-%")).count() == 2
+
+    # every link stays within the store of its item
+    mismatched = (
+        db_fixture.session.query(ItemTags)
+        .join(ItemModel, ItemModel.id == ItemTags.item_id)
+        .join(TagModel, TagModel.id == ItemTags.tag_id)
+        .filter(ItemModel.store_id != TagModel.store_id)
+        .count()
+    )
+    assert mismatched == 0
+    store = StoreModel.query.order_by(StoreModel.id.desc()).first()
+    assert len(store.items) == 20
+    assert len(store.tags) == 4
+
+
+def dump_catalogue(seed: int) -> list:
+    app = create_app("sqlite://", "test")
+    with app.app_context():
+        db.create_all()
+        seed_catalogue(db.session, 2, 10, 5, 2.0, "zipf", 1.2, seed=seed)
+        return [
+            db.session.execute(select(ItemModel.id, ItemModel.price)).all(),
+            db.session.execute(select(ItemTags.item_id, ItemTags.tag_id)).all(),
+        ]
+
+
+def test_seed_catalogue_is_deterministic():
+    assert dump_catalogue(1) == dump_catalogue(1)
+    assert dump_catalogue(1) != dump_catalogue(2)
+
+
+@pytest.mark.parametrize("distribution", FANOUTS)
+def test_fanout_sampler_mean(distribution):
+    sample = fanout_sampler(distribution, 3, 50, random.Random(0))
+    values = [sample() for _ in range(20000)]
+    assert min(values) >= 0 and max(values) <= 50
+    assert statistics.mean(values) == pytest.approx(3, rel=0.2)
+
+
+def test_tag_picker_skew():
+    pick = tag_picker(10, 1.5, random.Random(0))
+    picks = [pick(3) for _ in range(2000)]
+    assert all(len(set(ranks)) == 3 for ranks in picks)
+    first = sum(0 in ranks for ranks in picks)
+    last = sum(9 in ranks for ranks in picks)
+    assert first > 3 * last
+    assert pick(10) == list(range(10))
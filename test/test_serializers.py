@@ -0,0 +1,141 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import Schema, fields, post_dump
+
+from api.json_provider import OrjsonProvider
+from api.models import ItemModel, StoreModel, TagModel
+from api.schemas import (
+    ItemSchema,
+    PlainItemSchema,
+    StoreSchema,
+    TagAndItemSchema,
+    TagSchema,
+)
+from api.serializers import compile_serializer
+
+
+@pytest.fixture
+def fast_serialization(app_fixture):
+    default_json = app_fixture.json
+    app_fixture.config["FAST_SERIALIZATION_ENABLED"] = True
+    app_fixture.json = OrjsonProvider(app_fixture)
+    yield
+    app_fixture.config["FAST_SERIALIZATION_ENABLED"] = False
+    app_fixture.json = default_json
+
+
+@pytest.fixture
+def store(db_fixture):
+    store = StoreModel(name=f"Serialized Store {StoreModel.query.count()}")
+    tags = [TagModel(name=f"tag {i}", store=store) for i in range(3)]
+    for i in range(5):
+        db_fixture.session.add(
+            ItemModel(name=f"item é {i}", price=i + 0.1, store=store, tags=tags[:i])
+        )
+    db_fixture.session.add(ItemModel(name="no tags", price=3, store=store))
+    db_fixture.session.commit()
+    return store
+
+
+@pytest.mark.parametrize(
+    "schema, objects",
+    [
+        (ItemSchema(), lambda store: store.items),
+        (StoreSchema(), lambda store: [store]),
+        (TagSchema(), lambda store: store.tags),
+        (ItemSchema(only=("id", "tags")), lambda store: store.items),
+        (StoreSchema(exclude=("items",)), lambda store: [store]),
+    ],
+)
+def test_compiled_serializer_is_byte_identical(store, schema, objects):
+    serialize = compile_serializer(schema)
+    for obj in objects(store):
+        expected = Schema.dump(schema, obj)
+        compiled = serialize(obj)
+        assert json.dumps(compiled) == json.dumps(expected)
+        assert list(compiled) == list(expected)
+
+
+def test_compiled_serializer_omits_missing_and_keeps_none():
+    class Partial:
+        id = 1
+        name = None
+
+    assert compile_serializer(PlainItemSchema())(Partial()) == {"id": 1, "name": None}
+
+
+def test_compiled_serializer_handles_dicts_and_unknown_fields():
+    class CustomSchema(Schema):
+        created = fields.DateTime()
+        count = fields.Int(dump_default=0)
+        item = fields.Nested(PlainItemSchema())
+
+    schema = CustomSchema()
+    obj = {"created": datetime(2023, 1, 1), "item": {"id": 1, "name": "a"}}
+    assert compile_serializer(schema)(obj) == Schema.dump(schema, obj)
+
+
+def test_compiled_serializer_keeps_dump_hooks():
+    class HookedSchema(Schema):
+        name = fields.Str()
+
+        @post_dump
+        def upper(self, data, **kwargs):
+            return {"name": data["name"].upper()}
+
+    assert compile_serializer(HookedSchema())({"name": "a"}) == {"name": "A"}
+
+
+def test_schema_dump_uses_compiled_serializer(app_fixture, store, fast_serialization):
+    schema = ItemSchema(many=True)
+    assert schema.dump(store.items) == Schema.dump(schema, store.items)
+    assert schema._serializer is not None
+    pair = {"item": store.items[0], "tag": store.tags[0]}
+    assert TagAndItemSchema().dump(pair) == Schema.dump(TagAndItemSchema(), pair)
+
+
+def test_orjson_provider_matches_default_provider(app_fixture):
+    payload = {
+        "b": [1, 2.5, None, True],
+        "a": {"nested": "é"},
+        "price": Decimal("1.10"),
+        "when": datetime(2023, 1, 1),
+    }
+    fast, default = OrjsonProvider(app_fixture), DefaultJSONProvider(app_fixture)
+    assert json.loads(fast.dumps(payload)) == json.loads(default.dumps(payload))
+    compact = {"b": 1, "a": [1, "x"]}
+    assert fast.response(compact).data == default.response(compact).data
+    assert fast.loads(b'{"a": 1}') == {"a": 1}
+
+
+@pytest.mark.parametrize(
+    "url", ["/item", "/store", "/store/{store_id}", "/stores/{store_id}/tag"]
+)
+def test_fast_responses_match(test_client, auth_header, store, url, request):
+    url = url.format(store_id=store.id)
+    expected = test_client.get(url, headers=auth_header)
+    request.getfixturevalue("fast_serialization")
+    response = test_client.get(url, headers=auth_header)
+    assert response.status_code == expected.status_code == 200
+    assert response.json == expected.json
+    assert response.headers.get("X-Pagination") == expected.headers.get("X-Pagination")
+
+
+def test_serializer_compiled_once_per_fieldset(
+    mocker, test_client, auth_header, store, fast_serialization
+):
+    compile_spy = mocker.patch(
+        "api.schemas.compile_serializer", side_effect=compile_serializer
+    )
+    urls = ("/item", "/item?fields=id,name", f"/stores/{store.id}/tag")
+    for url in urls:
+        assert test_client.get(url, headers=auth_header).status_code == 200
+    compiled = compile_spy.call_count
+
+    for url in urls * 3:
+        assert test_client.get(url, headers=auth_header).status_code == 200
+    assert compile_spy.call_count == compiled
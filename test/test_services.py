@@ -0,0 +1,56 @@
+import threading
+from unittest.mock import MagicMock
+
+from api.services import LazyService, queue_service
+
+
+def test_lazy_service_creates_client_on_first_use():
+    factory = MagicMock()
+    service = LazyService(factory)
+    assert not service.created
+    factory.assert_not_called()
+
+    service.ping()
+    service.ping()
+
+    factory.assert_called_once_with()
+    assert factory.return_value.ping.call_count == 2
+    assert service.created
+
+
+def test_lazy_service_creates_new_client_after_fork(mocker):
+    service = LazyService(MagicMock(side_effect=lambda: object()))
+    parent = service.resolve()
+
+    mocker.patch("api.services.os.getpid", return_value=-1)
+
+    assert service.resolve() is not parent
+    assert service.resolve() is service.resolve()
+
+
+def test_queue_service_uses_client_of_connection():
+    connection = LazyService(MagicMock)
+    queue = queue_service("emails", connection)
+
+    assert queue.name == "emails"
+    assert queue.connection is connection.resolve()
+
+
+def test_lazy_service_creates_one_client_for_concurrent_threads():
+    factory = MagicMock(side_effect=lambda: object())
+    service = LazyService(factory)
+    barrier = threading.Barrier(8)
+    clients = []
+
+    def use():
+        barrier.wait()
+        clients.append(service.resolve())
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    factory.assert_called_once_with()
+    assert len({id(client) for client in clients}) == 1
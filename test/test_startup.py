@@ -0,0 +1,17 @@
+from benchmarks.startup import DEFERRED_MODULES, first_request, import_times
+
+# generous, the interpreter starts cold and CI runners are shared
+STARTUP_BUDGET_MS = 5000
+
+
+def test_app_import_defers_heavy_modules():
+    times = import_times()
+    assert "api.app" in times
+    assert [name for name in DEFERRED_MODULES if name in times] == []
+
+
+def test_time_to_first_request():
+    timings = first_request()
+    assert timings["status"] == 200
+    assert timings["deferred_imported"] == []
+    assert timings["process_ms"] < STARTUP_BUDGET_MS
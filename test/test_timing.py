@@ -0,0 +1,78 @@
+import re
+
+import pytest
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from api.models import ItemModel, StoreModel
+from api.timing import SERVER_TIMING_HEADER, start_request, timed
+
+
+@pytest.fixture
+def server_timing(app_fixture):
+    app_fixture.config["SERVER_TIMING_ENABLED"] = True
+    yield
+    app_fixture.config["SERVER_TIMING_ENABLED"] = False
+
+
+@pytest.fixture
+def item(db_fixture):
+    store = StoreModel(name=f"Timed Store {StoreModel.query.count()}")
+    item = ItemModel(name="timed item", price=1, store=store)
+    db_fixture.session.add(item)
+    db_fixture.session.commit()
+    return item
+
+
+def timings(response) -> dict[str, str]:
+    return {
+        metric.split(";")[0]: metric
+        for metric in response.headers[SERVER_TIMING_HEADER].split(", ")
+    }
+
+
+def test_server_timing_disabled(test_client, item, auth_header):
+    response = test_client.get(f"/item/{item.id}", headers=auth_header)
+    assert response.status_code == 200
+    assert SERVER_TIMING_HEADER not in response.headers
+
+
+def test_server_timing(test_client, item, auth_header, server_timing):
+    response = test_client.get(f"/item/{item.id}", headers=auth_header)
+    assert response.status_code == 200
+    metrics = timings(response)
+    assert set(metrics) == {"auth", "serialize", "db", "total"}
+    assert re.fullmatch(r'db;dur=\d+\.\d\d;desc="3 statements"', metrics["db"])
+    assert re.fullmatch(r"total;dur=\d+\.\d\d", metrics["total"])
+
+
+def test_server_timing_without_auth(test_client, server_timing):
+    response = test_client.get("/item")
+    assert response.status_code == 401
+    assert set(timings(response)) == {"auth", "db", "total"}
+
+
+def test_timed_counts_nested_blocks_once(app_fixture):
+    with app_fixture.test_request_context():
+        start_request()
+        with timed("serialize"):
+            with timed("serialize"):
+                pass
+        with timed("serialize"):
+            pass
+        assert list(g.timings) == ["serialize"]
+        assert g.timing_active == set()
+
+
+def test_failed_statement_is_counted_and_forgotten(app_fixture, db_fixture):
+    with app_fixture.test_request_context(), db_fixture.engine.connect() as conn:
+        start_request()
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing_table"))
+        assert conn.info["request_statements_started"] == []
+        assert g.sql_statements == 1
+
+        conn.execute(text("SELECT 1"))
+        assert conn.info["request_statements_started"] == []
+        assert g.sql_statements == 2